@@ -1,40 +1,71 @@
-import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from geopy.distance import geodesic
-from streamlit_js_eval import get_geolocation
-import time
-from datetime import datetime, timedelta
-import pytz
-from modules import *
-from io import BytesIO
-from openpyxl.styles import Alignment, Border, Side, PatternFill
-
-LAB_LAT = 37.456461 
-LAB_LON = 126.952096 
-ALLOWED_RADIUS_M = 100 
+from instrumentation import mark_once, profile_imports
+
+# ATTENDANCE_STARTUP_PROFILE=1 이면 첫 실행 때 import별 시간을 기록
+# pandas(pd), openpyxl, geopy는 modules/geofence에서 필요할 때 불러옴
+with profile_imports():
+    import streamlit as st
+    from streamlit_js_eval import get_geolocation
+    from datetime import datetime
+    import pytz
+    import calendar
+    from geofence import approx_distance_m
+    from modules import *
 
 st.set_page_config(page_title="출결 체크", page_icon="📍", initial_sidebar_state="collapsed")
 if 'current_view' not in st.session_state:
     st.session_state['current_view'] = 'main'
-if 'show_late_dialog' not in st.session_state:
-    st.session_state['show_late_dialog'] = False
-if 'show_early_leave_dialog' not in st.session_state:
-    st.session_state['show_early_leave_dialog'] = False
-if 'show_absent_dialog' not in st.session_state:
-    st.session_state['show_absent_dialog'] = False
+# 연구실은 주소의 ?lab=<연구실 ID>로도 지정할 수 있음 (연구실별 바로가기)
+if 'lab' not in st.session_state:
+    lab_param = st.query_params.get("lab")
+    st.session_state['lab'] = lab_param if lab_param in get_labs() else current_lab()
 
 def set_view(view_name):
     st.session_state['current_view'] = view_name
     st.rerun()
 
+def set_lab(lab):
+    """ 연구실 변경: 선택한 사용자와 위치 판정은 연구실마다 다르므로 초기화 """
+    st.session_state['lab'] = lab
+    st.query_params["lab"] = lab
+    for key in ('selected_name_radio', 'location', 'map_location'):
+        st.session_state.pop(key, None)
+    st.rerun()
+
+def render_lab_selector():
+    labs = list(get_labs())
+    if len(labs) < 2:
+        return
+    lab = current_lab()
+    selected = st.selectbox("연구실", labs, index=labs.index(lab), format_func=lab_title)
+    if selected != lab:
+        set_lab(selected)
+
+def finish_record(name, now, label, recorded):
+    """ 기록 결과를 다음 실행에서 보여주도록 남기고 바로 다시 그림 (이미 있는 기록이면 안내만) """
+    if recorded:
+        st.session_state['flash'] = ("success", f"{name}님 {now} {label} 기록 완료!")
+    else:
+        st.session_state['flash'] = ("info", f"{name}님은 이미 오늘 {label} 기록이 있습니다.")
+    st.rerun()
+
+def show_flash():
+    """ 직전 실행에서 남긴 기록 결과 표시 """
+    flash = st.session_state.pop('flash', None)
+    if not flash:
+        return
+    kind, message = flash
+    if kind == "success":
+        st.success(message)
+        st.balloons()
+    else:
+        st.info(message)
+
 # --- 다이얼로그 및 헬퍼 함수 ---
 if hasattr(st, "dialog"): dlg = st.dialog
 else: dlg = st.experimental_dialog
 
 @dlg("조퇴 확인")
-def show_early_leave_dialog(name, user_lat, user_lon, distance):
+def show_early_leave_dialog(name, location):
     st.warning("⚠️ 현재 오후 6시 이전입니다. 조퇴하시겠습니까?")
     # 조퇴 사유 입력
     reason = st.text_area(
@@ -53,23 +84,17 @@ def show_early_leave_dialog(name, user_lat, user_lon, distance):
                 kst = pytz.timezone('Asia/Seoul')
                 now = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
                 # 조퇴 사유는 기존대로. (스키마상 6번째 컬럼 추정)
-                sheet.append_row([now, name, "조퇴", f"{user_lat},{user_lon}", f"{distance:.1f}m", reason.strip()])
-                clear_attendance_cache()
-                st.success(f"{name}님 {now} 조퇴 기록 완료!")
-                st.balloons()
-                st.session_state['show_early_leave_dialog'] = False
-                time.sleep(1.5)
-                st.rerun()
+                recorded = record_event(sheet, [now, name, "조퇴", location_cell(location), f"{location['distance']:.1f}m", reason.strip()])
+                finish_record(name, now, "조퇴", recorded)
             except Exception as e:
-                import traceback
-                st.code(traceback.format_exc())
+                print(f"Error recording event: {e}")
+                st.error(error_message(e))
     with col_n:
         if st.button("아니오"):
-            st.session_state['show_early_leave_dialog'] = False
             st.rerun()
 
 @dlg("지각 확인")
-def show_late_dialog(name, user_lat, user_lon, distance):
+def show_late_dialog(name, location):
     st.warning("⚠️ 현재 오전 10시 이후입니다. 지각 사유를 작성해주세요.")
     # 지각 사유 입력
     reason = st.text_area(
@@ -89,19 +114,13 @@ def show_late_dialog(name, user_lat, user_lon, distance):
                 now = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
                 # 스키마: 날짜, 이름, 상태, 위치, 거리, 조퇴사유, 지각사유, 결근사유
                 # 지각사유는 7번째(index 6)이므로 앞의 조퇴사유(index 5)는 빈값 처리
-                sheet.append_row([now, name, "지각", f"{user_lat},{user_lon}", f"{distance:.1f}m", "", reason.strip()])
-                clear_attendance_cache()
-                st.success(f"{name}님 {now} 지각 기록 완료!")
-                st.balloons()
-                st.session_state['show_late_dialog'] = False
-                time.sleep(1.5)
-                st.rerun()
+                recorded = record_event(sheet, [now, name, "지각", location_cell(location), f"{location['distance']:.1f}m", "", reason.strip()])
+                finish_record(name, now, "지각", recorded)
             except Exception as e:
-                import traceback
-                st.code(traceback.format_exc())
+                print(f"Error recording event: {e}")
+                st.error(error_message(e))
     with col_n:
         if st.button("아니오"):
-            st.session_state['show_late_dialog'] = False
             st.rerun()
 
 @dlg("결근 확인")
@@ -124,19 +143,13 @@ def show_absent_dialog(name):
                 now = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
                 # 스키마: 날짜, 이름, 상태, 위치, 거리, 조퇴사유, 지각사유, 결근사유
                 # 결근사유는 8번째(index 7)
-                sheet.append_row([now, name, "결근", "", "", "", "", reason.strip()])
-                clear_attendance_cache()
-                st.success(f"{name}님 {now} 결근 기록 완료!")
-                st.balloons()
-                st.session_state['show_absent_dialog'] = False
-                time.sleep(1.5)
-                st.rerun()
+                recorded = record_event(sheet, [now, name, "결근", "", "", "", "", reason.strip()])
+                finish_record(name, now, "결근", recorded)
             except Exception as e:
-                import traceback
-                st.code(traceback.format_exc())
+                print(f"Error recording event: {e}")
+                st.error(error_message(e))
     with col_n:
         if st.button("취소"):
-            st.session_state['show_absent_dialog'] = False
             st.rerun()
 
 @dlg("출결 인원 선택")
@@ -150,70 +163,96 @@ def show_name_selection_dialog(user_list):
                 st.session_state["selected_name_radio"] = user 
                 st.rerun()
 
-def process_nn_records(sheet):
-    kst = pytz.timezone('Asia/Seoul')
-    now_kst = datetime.now(kst)
-    today = now_kst.date()
-    current_hour = now_kst.hour
-    data = get_cached_records(sheet)
-    if not data or len(data) < 2:
-        return
-    headers = data[0]
-    df = pd.DataFrame(data[1:], columns=headers)
-    col_ts = headers[0]
-    col_name = headers[1]
-    col_type = headers[2]
-    df['dt'] = pd.to_datetime(df[col_ts], errors='coerce')
-    df = df.dropna(subset=['dt'])
-    if "user_names" in st.secrets:
-        all_users = st.secrets["user_names"]
-    else:
+# --- 관리자 진단 패널 ---
+# 이름 선택은 누구나 할 수 있으므로 관리자 기능은 연구실 관리자 비밀번호로 로그인한 세션에만 보여줌
+def is_admin():
+    return current_lab() in st.session_state.get('admin_labs', ())
+
+def render_admin_login():
+    if not admin_login_enabled():
         return
-    nn_records = []
-    for user in all_users:
-        user_df = df[df[col_name] == user].copy()
-        user_df['date_obj'] = user_df['dt'].dt.date
-        for check_date in pd.date_range(start=today - timedelta(days=30), end=today - timedelta(days=1)):
-            date_obj = check_date.date()
-            if date_obj.weekday() >= 5:
-                continue
-            day_records = user_df[user_df['date_obj'] == date_obj]
-            if day_records.empty:
-                continue
-            types = day_records[col_type].unique()
-            has_in = "\ucd9c\uadfc" in types or "\uc9c0\uac01" in types
-            has_out = "\ud1f4\uadfc" in types or "\uc870\ud1f4" in types
-            has_absent = "\uacb0\uadfc" in types
-            has_in_nn = "\ucd9c\uadfcNN" in types
-            has_out_nn = "\ud1f4\uadfcNN" in types
-            if has_absent:
-                continue
-            if has_in and not has_out and not has_out_nn:
-                ts = datetime.combine(date_obj, datetime.min.time().replace(hour=23, minute=59))
-                nn_records.append([ts.strftime('%Y-%m-%d %H:%M:%S'), user, "\ud1f4\uadfcNN", "", "", "\uc0ac\uc720\uc5c6\uc74c", "", ""])
-            elif not has_in and has_out and not has_in_nn:
-                ts = datetime.combine(date_obj, datetime.min.time().replace(hour=18, minute=0))
-                nn_records.append([ts.strftime('%Y-%m-%d %H:%M:%S'), user, "\ucd9c\uadfcNN", "", "", "", "\uc0ac\uc720\uc5c6\uc74c", ""])
-            elif not has_in and not has_out and not has_in_nn and not has_out_nn:
-                ts_in = datetime.combine(date_obj, datetime.min.time().replace(hour=18, minute=0))
-                ts_out = datetime.combine(date_obj, datetime.min.time().replace(hour=23, minute=59))
-                nn_records.append([ts_in.strftime('%Y-%m-%d %H:%M:%S'), user, "\ucd9c\uadfcNN", "", "", "", "\uc0ac\uc720\uc5c6\uc74c", ""])
-                nn_records.append([ts_out.strftime('%Y-%m-%d %H:%M:%S'), user, "\ud1f4\uadfcNN", "", "", "\uc0ac\uc720\uc5c6\uc74c", "", ""])
-        if today.weekday() < 5:
-            day_records = user_df[user_df['date_obj'] == today]
-            if not day_records.empty:
-                types = day_records[col_type].unique()
-                has_in = "\ucd9c\uadfc" in types or "\uc9c0\uac01" in types
-                has_out = "\ud1f4\uadfc" in types or "\uc870\ud1f4" in types
-                has_absent = "\uacb0\uadfc" in types
-                has_in_nn = "\ucd9c\uadfcNN" in types
-                if not has_absent and not has_in and has_out and current_hour >= 18 and not has_in_nn:
-                    ts = datetime.combine(today, datetime.min.time().replace(hour=18, minute=0))
-                    nn_records.append([ts.strftime('%Y-%m-%d %H:%M:%S'), user, "\ucd9c\uadfcNN", "", "", "", "\uc0ac\uc720\uc5c6\uc74c", ""])
-    if nn_records:
-        for record in nn_records:
-            sheet.append_row(record)
-        clear_attendance_cache()
+    with st.expander("🔐 관리자 로그인"):
+        password = st.text_input("관리자 비밀번호", type="password")
+        if st.button("로그인"):
+            if check_admin_password(password):
+                st.session_state['admin_labs'] = set(st.session_state.get('admin_labs', ())) | {current_lab()}
+                st.rerun()
+            else:
+                st.error("비밀번호가 올바르지 않습니다.")
+
+def render_admin_tools():
+    with st.expander("🧾 NN 기록 보충 (관리자)"):
+        st.caption(f"최근 {NN_WINDOW_DAYS}일(평일) 중 출근/퇴근 기록이 빠진 날에 출근NN/퇴근NN 기록을 지금 추가합니다.")
+        if st.button("🧾 NN 갱신"):
+            try:
+                added = run_nn_backfill(get_sheet(), get_user_names(), force=True)
+            except Exception as e:
+                print(f"Error in NN backfill: {e}")
+                st.error(error_message(e))
+            else:
+                if added is None:
+                    st.toast("다른 곳에서 NN 기록을 보충하는 중입니다.")
+                else:
+                    st.toast(f"NN 기록 {added}건 추가")
+                    if added:
+                        st.rerun()
+    with st.expander("🗄️ 지난 달 보관 (관리자)"):
+        st.caption(f"최근 {NN_WINDOW_DAYS}일 이전에 끝난 달의 기록을 월별 보관 시트로 옮겨 원본 시트를 작게 유지합니다.")
+        try:
+            archived = list_archived_months(get_sheet())
+            if archived:
+                st.write("보관된 달: " + ", ".join(f"{y}-{m:02d}" for y, m in sorted(archived)))
+            if st.button("닫힌 달 보관하기"):
+                moved = archive_closed_months(get_sheet())
+                if moved:
+                    st.success("보관 완료: " + ", ".join(f"{k} ({v}건)" for k, v in moved.items()))
+                else:
+                    st.info("보관할 달이 없습니다.")
+        except Exception as e:
+            print(f"Error archiving months: {e}")
+            st.error(error_message(e))
+
+def render_lab_overview():
+    with st.expander("🏢 연구실별 오늘 현황 (관리자)"):
+        st.dataframe(pd.DataFrame(lab_overview()), use_container_width=True, hide_index=True)
+
+def render_diagnostics():
+    with st.expander("🩺 성능 진단 (관리자)"):
+        snap = METRICS.snapshot()
+        counters = snap["counters"]
+        hits, refreshes, misses, coalesced = (
+            counters.get(f"records.{k}", 0) for k in ("hit", "refresh", "miss", "coalesced")
+        )
+        total = hits + refreshes + misses
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("캐시 적중", hits, f"{hits / total:.0%}" if total else None)
+        c2.metric("증분 동기화", refreshes)
+        c3.metric("전체 다운로드", misses)
+        c4.metric("병합된 조회", coalesced)
+        # 할당량: 저널/append 대기열 길이, 토큰 버킷에서 기다린 시간, 429 재시도 횟수
+        throttle_ms = sum(t["count"] * t["mean_ms"] for name, t in snap["timings"].items()
+                          if name.startswith("sheets.throttle."))
+        q1, q2, q3, q4 = st.columns(4)
+        q1.metric("반영 대기 이벤트", get_journal().pending_count())
+        q2.metric("append 대기열", counters.get("sheets.append_queue_depth", 0))
+        q3.metric("한도 대기(초)", f"{throttle_ms / 1000:.1f}")
+        q4.metric("429 재시도", counters.get("sheets.retries.429", 0))
+        # 시트가 거부해서(권한/시트 삭제 등) 반영하지 못하고 보류한 이벤트
+        dead = get_journal().dead_letters()
+        if dead:
+            st.warning(f"시트에 반영하지 못하고 보류된 이벤트 {get_journal().dead_count()}건이 있습니다. 오류를 확인한 뒤 시트에 직접 추가해주세요.")
+            st.dataframe(pd.DataFrame(
+                [{"id": i, "시트": key, "기록": ", ".join(row[:3]), "오류": error} for i, key, row, error, _ in dead]
+            ), use_container_width=True, hide_index=True)
+        st.caption("시트 API 호출 / 단계별 시간 (ms)")
+        if snap["timings"]:
+            timing_df = pd.DataFrame.from_dict(snap["timings"], orient="index")
+            timing_df["bytes"] = [counters.get(f"{name}.bytes", "") for name in timing_df.index]
+            st.dataframe(timing_df, use_container_width=True)
+        st.json(counters, expanded=False)
+        if st.button("측정값 초기화"):
+            METRICS.reset()
+            st.rerun()
 
 # --- 출결 기록 확인 페이지 ---
 def view_records_page():
@@ -230,37 +269,34 @@ def view_records_page():
     </style>
     """, unsafe_allow_html=True)
     
-    st.title("📋 출결 현황")
+    st.title(f"📋 {lab_title()} 출결 현황" if len(get_labs()) > 1 else "📋 출결 현황")
 
     try:
         sheet = get_sheet()
-        process_nn_records(sheet)
-        data = get_cached_records(sheet)
+        kst = pytz.timezone('Asia/Seoul')
+        now_kst = datetime.now(kst)
+        today = now_kst.date()
+        # 조회 기간 선택 (기본: 이번 달). 한 달 또는 학기처럼 여러 달을 선택할 수 있음
+        month_options = [f"{y:04d}-{m:02d}" for y, m in available_months(sheet, today)]
+        current = month_options[-1]
+        if len(month_options) > 1:
+            start_label, end_label = st.select_slider("조회 기간", options=month_options, value=(current, current))
+        else:
+            start_label = end_label = current
+        start_ym = tuple(int(x) for x in start_label.split("-"))
+        end_ym = tuple(int(x) for x in end_label.split("-"))
+        _, last_day = calendar.monthrange(*end_ym)
+
+        # 선택한 기간의 기록만 캐시된 기록 프레임(보관 월 포함)에서 골라옴 (다시 파싱하지 않음)
+        with timed("records.load"):
+            df = load_records_frame(sheet, start=f"{start_label}-01", end=f"{end_label}-{last_day:02d}")
         
-        if data and len(data) > 1:
-            headers = data[0]
-            df = pd.DataFrame(data[1:], columns=headers)
-            
-            # 컬럼 인덱스 매핑 (헤더 이름이 바뀔 수도 있으므로 위치 기반 추정 혹은 이름 확인)
-            # 0:timestamp, 1:name, 2:type, 3:loc, 4:dist, 5:early_reason, 6:late_reason, 7:absent_reason
-            col_ts = headers[0] 
-            col_name = headers[1] 
-            col_type = headers[2] 
-            
-            df['dt'] = pd.to_datetime(df[col_ts], errors='coerce')
-            df = df.dropna(subset=['dt'])
-            
-            kst = pytz.timezone('Asia/Seoul')
-            now_kst = datetime.now(kst)
-            today = now_kst.date()
-            
-            mask_month = (df['dt'].dt.year == today.year) & (df['dt'].dt.month == today.month)
-            month_df = df[mask_month].copy().sort_values('dt')
-            
-            all_users = sorted(month_df[col_name].unique())
+        if not df.empty:
+            month_df = df.sort_values('dt')
+            all_users = sorted(month_df['name'].astype(str).unique())
 
             # --- Container 1: 개인별 현황 리스트 ---
-            with st.container(border=True):
+            with timed("records.detail"), st.container(border=True):
                 st.subheader("👤 개인별 현황 상세")
                 
                 # 기본 선택값 설정
@@ -270,193 +306,45 @@ def view_records_page():
                 selected_user = st.selectbox("이름을 선택하세요", all_users, index=default_idx)
                 
                 if selected_user:
-                    user_df = month_df[month_df[col_name] == selected_user].copy()
-                    # 보여줄 데이터 가공
-                    display_list = []
-                    for _, row in user_df.iterrows():
-                        r_type = row[col_type]
-                        r_dt = row['dt']
-                        
-                        reason = ""
-                        vals = row.values
-                        if r_type == "조퇴" and len(vals) > 5:
-                            reason = str(vals[5])
-                        elif r_type == "지각" and len(vals) > 6:
-                            reason = str(vals[6])
-                        elif r_type == "결근" and len(vals) > 7:
-                            reason = str(vals[7])
-                            
-                        display_list.append({
-                            "날짜": r_dt.strftime("%Y-%m-%d"),
-                            "시간": r_dt.strftime("%H:%M:%S"),
-                            "구분": r_type,
-                            "내용/사유": reason
-                        })
+                    user_df = month_df[month_df['name'] == selected_user]
+                    # 보여줄 데이터 가공 (구분에 맞는 사유 컬럼 선택)
+                    r_type = user_df['type'].astype(str)
+                    reason = (user_df['early_reason'].where(r_type == "조퇴")
+                              .fillna(user_df['late_reason'].where(r_type == "지각"))
+                              .fillna(user_df['absent_reason'].where(r_type == "결근"))
+                              .fillna(""))
+                    display_df = pd.DataFrame({
+                        "날짜": user_df['dt'].dt.strftime("%Y-%m-%d"),
+                        "시간": user_df['dt'].dt.strftime("%H:%M:%S"),
+                        "구분": r_type,
+                        "내용/사유": reason,
+                    })
                     
-                    st.dataframe(pd.DataFrame(display_list), use_container_width=True, hide_index=True)
+                    st.dataframe(display_df, use_container_width=True, hide_index=True)
 
-            # --- Container 2: 월간 현황 다운로드 ---
-            with st.container(border=True):
+            # --- Container 2: 기간 현황 다운로드 ---
+            with timed("records.download"), st.container(border=True):
                 col_h1, col_h2 = st.columns([3, 1])
                 with col_h1:
-                    st.subheader("📥 월간 전체 현황 다운로드")
+                    st.subheader("📥 기간별 전체 현황 다운로드")
                 with col_h2:
                     if st.button("🔄 새로고침"):
-                        clear_attendance_cache()
+                        clear_attendance_cache(full=True)
                         st.rerun()
-                import calendar
-                
-                _, last_day = calendar.monthrange(today.year, today.month)
-                valid_date_cols = []
-                valid_dates = []
-                
-                for d in range(1, last_day + 1):
-                    curr_date = datetime(today.year, today.month, d).date()
-                    if curr_date.weekday() < 5: # 0(월)~4(금)
-                        valid_dates.append(curr_date)
-                        valid_date_cols.append(f"{d}일")
-
-                report_data = []
-
-                for u in all_users:
-                    u_df = month_df[month_df[col_name] == u]
-                    late_cnt = early_cnt = absent_cnt = 0
-                    day_status_map = {}
-                    u_df['date_obj'] = u_df['dt'].dt.date
-                    grouped = u_df.groupby('date_obj')
-                    for d_date, grp in grouped:
-                        types = grp[col_type].unique()
-                        parts = []
-                        in_time = out_time = ""
-                        notes = []
-                        has_work = False
-                        has_in_nn = has_out_nn = False
-                        if "출근" in types:
-                            in_time = grp[grp[col_type]=="출근"]['dt'].min().strftime("%H:%M")
-                            has_work = True
-                        elif "출근NN" in types:
-                            in_time = "NN"
-                            has_in_nn = True
-                            has_work = True
-                        if "지각" in types:
-                            late_rows = grp[grp[col_type]=="지각"]
-                            is_excused = False
-                            reason_txt = ""
-                            for _, r in late_rows.iterrows():
-                                if len(r) > 6:
-                                    r_val = str(r.iloc[6]) if pd.notna(r.iloc[6]) else ""
-                                    reason_txt = r_val
-                                    if "[업무]" in r_val:
-                                        is_excused = True
-                            if not reason_txt or reason_txt.lower() in ["nan","none",""]:
-                                reason_txt = "사유없음"
-                            if not is_excused:
-                                late_cnt += 1
-                            in_time = grp[grp[col_type]=="지각"]['dt'].min().strftime("%H:%M")
-                            notes.append(f"지각({reason_txt})" if not is_excused else f"지각(업무:{reason_txt})")
-                            has_work = True
-                        if "퇴근" in types:
-                            out_time = grp[grp[col_type]=="퇴근"]['dt'].max().strftime("%H:%M")
-                        elif "퇴근NN" in types:
-                            out_time = "NN"
-                            has_out_nn = True
-                        if "조퇴" in types:
-                            early_rows = grp[grp[col_type]=="조퇴"]
-                            is_excused = False
-                            reason_txt = ""
-                            for _, r in early_rows.iterrows():
-                                if len(r) > 5:
-                                    r_val = str(r.iloc[5]) if pd.notna(r.iloc[5]) else ""
-                                    reason_txt = r_val
-                                    if "[업무]" in r_val:
-                                        is_excused = True
-                            if not reason_txt or reason_txt.lower() in ["nan","none",""]:
-                                reason_txt = "사유없음"
-                            if not is_excused:
-                                early_cnt += 1
-                            out_time = grp[grp[col_type]=="조퇴"]['dt'].max().strftime("%H:%M")
-                            notes.append(f"조퇴({reason_txt})" if not is_excused else f"조퇴(업무:{reason_txt})")
-                        if "결근" in types:
-                            absent_cnt += 1
-                            abs_rows = grp[grp[col_type]=="결근"]
-                            reason_txt = ""
-                            if not abs_rows.empty:
-                                r = abs_rows.iloc[0]
-                                if len(r) > 7:
-                                    reason_txt = str(r.iloc[7]) if pd.notna(r.iloc[7]) else ""
-                            if not reason_txt or reason_txt.lower() in ["nan","none",""]:
-                                reason_txt = "사유없음"
-                            notes.append(f"결근({reason_txt})")
-                        if has_in_nn:
-                            late_cnt += 1
-                            nn_reason = ""
-                            nn_rows = grp[grp[col_type]=="출근NN"]
-                            if not nn_rows.empty:
-                                r = nn_rows.iloc[0]
-                                if len(r) > 6:
-                                    nn_reason = str(r.iloc[6]) if pd.notna(r.iloc[6]) else "사유없음"
-                            if not nn_reason or nn_reason.lower() in ["nan","none",""]:
-                                nn_reason = "사유없음"
-                            notes.insert(0, f"지각({nn_reason})")
-                        if has_out_nn:
-                            early_cnt += 1
-                            nn_reason = ""
-                            nn_rows = grp[grp[col_type]=="퇴근NN"]
-                            if not nn_rows.empty:
-                                r = nn_rows.iloc[0]
-                                if len(r) > 5:
-                                    nn_reason = str(r.iloc[5]) if pd.notna(r.iloc[5]) else "사유없음"
-                            if not nn_reason or nn_reason.lower() in ["nan","none",""]:
-                                nn_reason = "사유없음"
-                            notes.append(f"조퇴({nn_reason})")
-                        if has_in_nn and has_out_nn:
-                            late_cnt -= 1
-                            early_cnt -= 1
-                            absent_cnt += 1
-                            notes = ["결근(사유없음)"]
-                        if in_time:
-                            parts.append(f"출근: {in_time}")
-                        if out_time:
-                            parts.append(f"퇴근: {out_time}")
-                        elif has_work and "결근" not in types and not has_out_nn:
-                            parts.append("퇴근: NN")
-                        if notes:
-                            parts.append(", ".join(notes))
-                        day_status_map[d_date] = ", ".join(parts)
-                    row = {
-                        "이름": u,
-                        "현황": f"결근:{absent_cnt}, 지각:{late_cnt}, 조퇴:{early_cnt}"
-                    }
-                    for d_date, d_col in zip(valid_dates, valid_date_cols):
-                        row[d_col] = day_status_map.get(d_date, "")
-                    
-                    report_data.append(row)
-                
-                if report_data:
-                    rep_df = pd.DataFrame(report_data)
-                    buffer = BytesIO()
-                    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                        rep_df.to_excel(writer, index=False, sheet_name='출결현황')
-                        worksheet = writer.sheets['출결현황']
-                        worksheet.column_dimensions['A'].width = 20
-                        worksheet.column_dimensions['B'].width = 25
-                        for col in range(3, len(rep_df.columns) + 1):
-                            worksheet.column_dimensions[worksheet.cell(1, col).column_letter].width = 35
-                        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-                        fill_white = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')
-                        fill_gray = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-                        for idx, row in enumerate(worksheet.iter_rows(min_row=1, max_row=len(rep_df)+1), start=1):
-                            fill = fill_white if idx % 2 == 0 else fill_gray
-                            for cell in row:
-                                cell.border = thin_border
-                                if idx > 1:
-                                    cell.alignment = Alignment(wrap_text=True, vertical='top')
-                                    cell.fill = fill
-                    buffer.seek(0)
+                if not month_df.empty:
+                    # 사용자별 기간 합계 (닫힌 달의 월별 결과는 메모이즈되어 다시 계산하지 않음)
+                    summary, _ = get_range_report(sheet, start_ym, end_ym)
+                    st.dataframe(summary, use_container_width=True, hide_index=True)
+                    # 엑셀 파일은 다운로드 버튼을 눌렀을 때만 생성 (기간, 데이터 버전별로 메모이즈)
+                    version = get_records_version(sheet)
+                    if start_ym == end_ym:
+                        file_name = f"출결현황_{start_ym[0]}_{start_ym[1]}월.xlsx"
+                    else:
+                        file_name = f"출결현황_{start_label}_{end_label}.xlsx"
                     st.download_button(
                         label="💾 Excel 파일 다운로드",
-                        data=buffer,
-                        file_name=f"출결현황_{today.year}_{today.month}월.xlsx",
+                        data=lambda: export_report(sheet, sheet_key(sheet), start_ym, end_ym, version),
+                        file_name=file_name,
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                         use_container_width=True
                     )
@@ -466,14 +354,157 @@ def view_records_page():
         else:
             st.info("데이터가 없습니다.")
     except Exception as e:
-        st.error(f"오류 발생: {e}")
-        # import traceback
-        # st.code(traceback.format_exc())
+        print(f"Error loading records: {e}")
+        st.error(error_message(e))
+
+    if is_admin():
+        render_admin_tools()
+        if len(get_labs()) > 1:
+            render_lab_overview()
+        render_diagnostics()
+    else:
+        render_admin_login()
 
     st.divider()
     if st.button("🏠 메인 화면으로 이동"):
         set_view('main')
 
+# --- 메인 화면 구역 (fragment) ---
+# get_geolocation()은 위치가 바뀔 때마다 다시 실행을 일으키므로 화면을 구역별 fragment로 나눔.
+# 위치 구역만 자주 다시 실행되고, 출결 버튼/지도 구역은 필요할 때만 다시 그림.
+if hasattr(st, "fragment"): fragment = st.fragment
+else: fragment = st.experimental_fragment
+
+MAP_REFRESH_M = 30  # 지도와 버튼 구역을 다시 그릴 만큼의 위치 변화
+
+@fragment
+def render_location():
+    """ 위치 감지 및 출결 가능 장소 판정. 현재 위치는 session_state['location'],
+    지도에 그린 위치는 session_state['map_location']에 저장 """
+    loc = get_geolocation()
+    prev = st.session_state.get('map_location')
+    if loc and 'coords' in loc:
+        user_lat = loc['coords']['latitude']
+        user_lon = loc['coords']['longitude']
+        try:
+            location = locate_user(user_lat, user_lon)
+        except ValueError as e:
+            # 장소 설정 오류: 다른 장소로 대신 판정하지 않고 출퇴근 버튼을 보이지 않음
+            print(f"Error loading sites: {e}")
+            st.session_state['location'] = st.session_state['map_location'] = None
+            if prev is not None:
+                st.rerun()
+            st.error(f"⚠️ {e}\n출퇴근을 기록할 수 없습니다. 관리자에게 문의해주세요.")
+            return
+        st.session_state['location'] = location
+
+        st.write(f"현재 위치 감지됨: {location['nearest']}과의 거리 **{location['distance']:.1f}m**")
+        if location['site']:
+            st.success(f"✅ {location['site']} 근처입니다. 출퇴근이 가능합니다.")
+        else:
+            st.error("🚫 출결 가능 장소 밖입니다. 출퇴근을 기록할 수 없습니다.")
+
+        # 처음 위치를 받았거나, 장소 안/밖이 바뀌었거나, 지도에 보일 만큼 움직였을 때만 전체 화면 갱신
+        if prev is None or prev['site'] != location['site'] \
+                or approx_distance_m(prev['lat'], prev['lon'], user_lat, user_lon) > MAP_REFRESH_M:
+            st.session_state['map_location'] = st.session_state['location']
+            st.rerun()
+    elif loc and 'error' in loc:
+        st.session_state['location'] = st.session_state['map_location'] = None
+        if prev is not None:
+            st.rerun()
+        st.error(f"⚠️ 위치 정보를 불러오지 못했습니다: {loc['error']}\n브라우저 '위치 권한'을 허용했는지 확인해주세요.")
+    else:
+        st.info("📍 위치 권한을 허용하고 잠시 기다려주세요 (브라우저 새로고침 필요할 수 있음)")
+
+@fragment
+def render_absent_action(name):
+    """ 결근 통보 버튼 (위치 무관) """
+    with timed("main.absent_check"):
+        is_absent = check_is_absent_today(get_sheet(), name)
+    if is_absent:
+        st.button("🙅 결근 통보 (위치 무관)", disabled=True, use_container_width=True)
+        st.info("이미 오늘 결근 기록이 있습니다.")
+    elif st.button("🙅 결근 통보 (위치 무관)", use_container_width=True):
+        show_absent_dialog(name)
+
+@fragment
+def render_attendance_actions(name):
+    """ 오늘 출결 상태와 출근/퇴근 버튼 """
+    location = st.session_state.get('location')
+    if not location:
+        return
+    col1, col2 = st.columns(2)
+
+    with timed("main.status_checks"):
+        is_in = check_is_clocked_in(get_sheet(), name)
+        is_out = check_is_clocked_out(get_sheet(), name)
+
+    with col1:
+        if is_in:
+            st.button("출근하기 ☀️", disabled=True, key="btn_in_disabled")
+            st.info("이미 오늘 출근 기록이 있습니다.")
+        elif is_out:
+            st.button("출근하기 ☀️", disabled=True, key="btn_in_disabled_out")
+            st.info("이미 오늘 퇴근 기록이 있습니다.")
+        else:
+            if st.button("출근하기 ☀️", key="btn_in_active"):
+                if not name:
+                    st.warning("이름을 입력해주세요.")
+                else:
+                    kst = pytz.timezone('Asia/Seoul')
+                    now_dt = datetime.now(kst)
+                    if now_dt.hour >= 10:
+                        # 10시 이후 -> 지각 다이얼로그
+                        show_late_dialog(name, location)
+                    else:
+                        # 10시 이전 -> 정상 출근 바로 기록
+                        try:
+                            sheet = get_sheet()
+                            now = now_dt.strftime('%Y-%m-%d %H:%M:%S')
+                            recorded = record_event(sheet, [now, name, "출근", location_cell(location), f"{location['distance']:.1f}m", "", "", ""])
+                            finish_record(name, now, "출근", recorded)
+                        except Exception as e:
+                            print(f"Error recording clock-in: {e}")
+                            st.error(f"출근 기록 오류: {error_message(e)}")
+
+    with col2:
+        if is_out:
+            st.button("퇴근하기 🌙", disabled=True, key="btn_out_disabled")
+            st.info("이미 오늘 퇴근 하셨습니다!")
+        else:
+            if st.button("퇴근하기 🌙"):
+                if not name:
+                    st.warning("이름을 입력해주세요.")
+                else:
+                    kst = pytz.timezone('Asia/Seoul')
+                    now_dt = datetime.now(kst)
+                    if now_dt.hour < 18:
+                        # 18시 이전 -> 조퇴 다이얼로그
+                        show_early_leave_dialog(name, location)
+                    else:
+                        # 18시 이후 -> 정상 퇴근 바로 기록
+                        try:
+                            sheet = get_sheet()
+                            now = now_dt.strftime('%Y-%m-%d %H:%M:%S')
+                            recorded = record_event(sheet, [now, name, "퇴근", location_cell(location), f"{location['distance']:.1f}m", "", "", ""])
+                            finish_record(name, now, "퇴근", recorded)
+                        except Exception as e:
+                            print(f"Error recording clock-out: {e}")
+                            st.error(f"퇴근 기록 오류: {error_message(e)}")
+
+@fragment
+def render_map():
+    """ 현재 위치와 출결 가능 장소 지도 """
+    location = st.session_state.get('map_location')
+    if not location:
+        return
+    with timed("main.map"):
+        sites = get_geofence().sites
+        df_map = pd.DataFrame({'lat': [location['lat']] + [s.lat for s in sites],
+                               'lon': [location['lon']] + [s.lon for s in sites]})
+        st.map(df_map, zoom=15)
+
 # --- 메인 출결체크 페이지 ---
 def view_main_page():
     st.markdown("""
@@ -501,18 +532,17 @@ def view_main_page():
             text-align: center !important;
         }
         </style>
-        <div class="responsive-title">📍SCP-LAB 위치 기반 출퇴근 기록</div>
         """, unsafe_allow_html=True)
+    st.markdown(f'<div class="responsive-title">📍{lab_title()} 위치 기반 출퇴근 기록</div>', unsafe_allow_html=True)
+    render_lab_selector()
+    show_flash()
 
     # 페이지 이동 버튼
     if st.button("📋 전체 기록 보기", use_container_width=True):
         set_view('records')
 
     # 사용자 정보 확인
-    if "user_names" in st.secrets:
-        user_list = st.secrets["user_names"]
-    else:
-        user_list = ["관리자에게 문의하세요"]
+    user_list = get_user_names() or ["관리자에게 문의하세요"]
     
     if "selected_name_radio" not in st.session_state:
         st.session_state["selected_name_radio"] = None
@@ -531,122 +561,39 @@ def view_main_page():
             st.success(f"**{name}**님 안녕하세요! 👋")
         
         # 결근 버튼 (위치 무관)
-        is_absent = check_is_absent_today(get_sheet(), name)
-        if is_absent:
-            st.button("🙅 결근 통보 (위치 무관)", disabled=True, use_container_width=True)
-            st.info("이미 오늘 결근 기록이 있습니다.")
-        else:
-            if st.button("🙅 결근 통보 (위치 무관)", use_container_width=True):
-                st.session_state['show_absent_dialog'] = True
-                st.rerun()
-            
-            if st.session_state.get('show_absent_dialog'):
-                show_absent_dialog(name)
-                st.session_state['show_absent_dialog'] = False
+        render_absent_action(name)
 
-    # 위치 확인 및 출결 로직
-    loc = get_geolocation()
-    if loc and 'coords' in loc:
-        user_lat = loc['coords']['latitude']
-        user_lon = loc['coords']['longitude']
-        office_point = (LAB_LAT, LAB_LON)
-        user_point = (user_lat, user_lon)
-        distance = geodesic(office_point, user_point).meters
-        
-        st.write(f"현재 위치 감지됨: 연구실과의 거리 **{distance:.1f}m**")
-        
-        if distance <= ALLOWED_RADIUS_M:
-            st.success("✅ 연구실 근처입니다. 출퇴근이 가능합니다.")
-            col1, col2 = st.columns(2)
-            
-            is_in = check_is_clocked_in(get_sheet(), name)
-            is_out = check_is_clocked_out(get_sheet(), name)
-
-            with col1:
-                if is_in:
-                    st.button("출근하기 ☀️", disabled=True, key="btn_in_disabled")
-                    st.info("이미 오늘 출근 기록이 있습니다.")
-                elif is_out:
-                    st.button("출근하기 ☀️", disabled=True, key="btn_in_disabled_out")
-                    st.info("이미 오늘 퇴근 기록이 있습니다.")
-                else:
-                    if st.button("출근하기 ☀️", key="btn_in_active"):
-                        if not name:
-                            st.warning("이름을 입력해주세요.")
-                        else:
-                            kst = pytz.timezone('Asia/Seoul')
-                            now_dt = datetime.now(kst)
-                            if now_dt.hour >= 10:
-                                # 10시 이후 -> 지각 다이얼로그
-                                st.session_state['show_late_dialog'] = True
-                                st.rerun()
-                            else:
-                                # 10시 이전 -> 정상 출근 바로 기록
-                                try:
-                                    sheet = get_sheet()
-                                    now = now_dt.strftime('%Y-%m-%d %H:%M:%S')
-                                    sheet.append_row([now, name, "출근", f"{user_lat},{user_lon}", f"{distance:.1f}m", "", "", ""])
-                                    clear_attendance_cache()
-                                    st.success(f"{name}님 {now} 출근 기록 완료!")
-                                    st.balloons()
-                                    time.sleep(1.5)
-                                    st.rerun()
-                                except Exception as e:
-                                    import traceback
-                                    st.error(f"출근 기록 오류: {e}")
-                                    st.code(traceback.format_exc())
-                    
-                    if st.session_state.get('show_late_dialog'):
-                        show_late_dialog(name, user_lat, user_lon, distance)
-                        st.session_state['show_late_dialog'] = False
-
-            with col2:
-                if is_out:
-                    st.button("퇴근하기 🌙", disabled=True, key="btn_out_disabled")
-                    st.info("이미 오늘 퇴근 하셨습니다!")
-                else:
-                    if st.button("퇴근하기 🌙"):
-                        if not name:
-                            st.warning("이름을 입력해주세요.")
-                        else:
-                            kst = pytz.timezone('Asia/Seoul')
-                            now_dt = datetime.now(kst)
-                            if now_dt.hour < 18:
-                                # 18시 이전 -> 조퇴 다이얼로그
-                                st.session_state['show_early_leave_dialog'] = True
-                                st.rerun()
-                            else:
-                                # 18시 이후 -> 정상 퇴근 바로 기록
-                                try:
-                                    sheet = get_sheet()
-                                    now = now_dt.strftime('%Y-%m-%d %H:%M:%S')
-                                    sheet.append_row([now, name, "퇴근", f"{user_lat},{user_lon}", f"{distance:.1f}m", "", "", ""])
-                                    clear_attendance_cache()
-                                    st.success(f"{name}님 {now} 퇴근 기록 완료!")
-                                    st.balloons()
-                                    time.sleep(1.5)
-                                    st.rerun()
-                                except Exception as e:
-                                    import traceback
-                                    st.error(f"퇴근 기록 오류: {e}")
-                                    st.code(traceback.format_exc())
-                    
-                    if st.session_state.get('show_early_leave_dialog'):
-                        show_early_leave_dialog(name, user_lat, user_lon, distance)
-                        st.session_state['show_early_leave_dialog'] = False
-        else:
-            st.error(f"🚫 연구실 반경 {ALLOWED_RADIUS_M}m 밖입니다. 출퇴근을 기록할 수 없습니다.")
-        
-        df_map = pd.DataFrame({'lat': [user_lat, LAB_LAT], 'lon': [user_lon, LAB_LON]})
-        st.map(df_map, zoom=15)
-    elif loc and 'error' in loc:
-        st.error(f"⚠️ 위치 정보를 불러오지 못했습니다: {loc['error']}\n브라우저 '위치 권한'을 허용했는지 확인해주세요.")
-    else:
-        st.info("📍 위치 권한을 허용하고 잠시 기다려주세요 (브라우저 새로고침 필요할 수 있음)")
+    # 위치 확인 및 출결 로직 (각 구역은 fragment라서 위치 갱신/버튼 클릭 시 해당 구역만 다시 실행됨)
+    render_location()
+    location = st.session_state.get('map_location')
+    if location:
+        if location['site']:
+            render_attendance_actions(name)
+        render_map()
+
+# --- 저널 반영 작업 재개 (재시작 전에 시트에 반영하지 못한 이벤트가 남아 있으면 바로 반영) ---
+try:
+    if get_journal().pending_count():
+        for lab_sheet in open_lab_sheets().values():
+            resume_journal_flush(lab_sheet)
+except Exception as e:
+    print(f"Error resuming journal flush: {e}")
+
+# --- NN 기록 보충 스케줄러 (연구실마다 프로세스당 1회 시작, 시트는 동시에 열기) ---
+try:
+    labs_with_users = [lab for lab in get_labs() if get_user_names(lab)]
+    for lab, lab_sheet in open_lab_sheets(labs_with_users).items():
+        start_nn_scheduler(lab_sheet, get_user_names(lab))
+except Exception as e:
+    print(f"Error starting NN scheduler: {e}")
 
 # --- 라우팅 로직 ---
 if st.session_state['current_view'] == 'records':
-    view_records_page()
+    with timed("page.records"):
+        view_records_page()
+    mark_once("first_render.records")
 else:
-    view_main_page()
+    with timed("page.main"):
+        view_main_page()
+    mark_once("first_render.main")
 
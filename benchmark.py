@@ -0,0 +1,209 @@
+"""출결 앱 주요 경로 벤치마크
+
+합성 출결 기록(사용자 수 x 개월 수 x 하루 이벤트 수)을 메모리 워크시트에 넣고
+출결 확인 함수, NN 보충, 월간 리포트, 엑셀 내보내기 시간과 로컬 사본 메모리를 측정해 JSON으로 출력한다.
+
+    python benchmark.py --users 40 --months 24 --repeat 5 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 저널/일별 상태 파일이 작업 디렉터리에 생기지 않도록 modules import 전에 지정
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("ATTENDANCE_JOURNAL_PATH", os.path.join(_tmp_dir, "bench_journal.db"))
+os.environ.setdefault("ATTENDANCE_DAILY_PATH", os.path.join(_tmp_dir, "bench_daily.db"))
+
+import modules  # noqa: E402
+import reports  # noqa: E402
+from columnar import EventColumns  # noqa: E402
+from daily import DailyTable  # noqa: E402
+from storage import HEADER  # noqa: E402
+
+REASONS = ["병원 진료", "[업무] 외근", "개인 사정", "", "[업무] 출장 복귀"]
+
+class FakeSpreadsheet:
+    """ 보관 워크시트가 없는 스프레드시트 (보관 월 조회용) """
+    def __init__(self, worksheet):
+        self._worksheets = [worksheet]
+
+    def worksheets(self):
+        return list(self._worksheets)
+
+class FakeWorksheet:
+    """ gspread Worksheet 대신 쓰는 메모리 워크시트 (앱이 사용하는 메서드만 구현) """
+    _next_id = 0
+
+    def __init__(self, rows):
+        FakeWorksheet._next_id += 1
+        self.spreadsheet_id = "benchmark"
+        self.id = FakeWorksheet._next_id
+        self.rows = [list(r) for r in rows]
+        self.calls = {}
+        self.title = "Sheet1"
+        self.spreadsheet = FakeSpreadsheet(self)
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _padded(self, rows):
+        width = max((len(r) for r in rows), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in rows]
+
+    def get_all_values(self):
+        self._count("get_all_values")
+        return self._padded(self.rows)
+
+    def get_values(self, range_name):
+        self._count("get_values")
+        start = int(re.search(r"\d+", range_name).group())
+        return self._padded(self.rows[start - 1:])
+
+    def append_row(self, row, **kwargs):
+        self._count("append_row")
+        self.rows.append(list(row))
+
+    def append_rows(self, rows, **kwargs):
+        self._count("append_rows")
+        first = len(self.rows) + 1
+        self.rows.extend(list(r) for r in rows)
+        return {"updates": {"updatedRange": f"Sheet1!A{first}:H{len(self.rows)}"}}
+
+def generate_records(users, months, events_per_day, end_date, seed=0,
+                     late_rate=0.1, early_rate=0.08, absent_rate=0.03, missing_rate=0.05):
+    """ 합성 출결 기록 (헤더 포함). 평일마다 출근/퇴근 쌍을 events_per_day개까지 만들고
+    일정 비율로 지각/조퇴/결근/기록 누락(NN 대상)을 섞음 """
+    rng = random.Random(seed)
+    names = [f"user{i:03d}" for i in range(users)]
+    start_date = end_date - timedelta(days=int(months * 30.4))
+    rows = [list(HEADER)]
+    day = start_date
+    while day <= end_date:
+        if day.weekday() < 5:
+            for name in names:
+                if rng.random() < absent_rate:
+                    rows.append([f"{day} 08:30:00", name, "결근", "", "", "", "", rng.choice(REASONS)])
+                    continue
+                for _ in range(max(1, events_per_day // 2)):
+                    if rng.random() >= missing_rate:
+                        if rng.random() < late_rate:
+                            t = f"{rng.randint(10, 12):02d}:{rng.randint(0, 59):02d}:00"
+                            rows.append([f"{day} {t}", name, "지각", "37.45,126.95", "12.0m", "", rng.choice(REASONS), ""])
+                        else:
+                            t = f"{rng.randint(8, 9):02d}:{rng.randint(0, 59):02d}:00"
+                            rows.append([f"{day} {t}", name, "출근", "37.45,126.95", "12.0m", "", "", ""])
+                    if rng.random() >= missing_rate:
+                        if rng.random() < early_rate:
+                            t = f"{rng.randint(13, 17):02d}:{rng.randint(0, 59):02d}:00"
+                            rows.append([f"{day} {t}", name, "조퇴", "37.45,126.95", "12.0m", rng.choice(REASONS), "", ""])
+                        else:
+                            t = f"{rng.randint(18, 22):02d}:{rng.randint(0, 59):02d}:00"
+                            rows.append([f"{day} {t}", name, "퇴근", "37.45,126.95", "12.0m", "", "", ""])
+                    elif day < end_date - timedelta(days=30):
+                        # 오래된 누락은 이미 NN 보충이 된 것으로 간주
+                        rows.append([f"{day} 23:59:00", name, "퇴근NN", "", "", "사유없음", "", ""])
+        day += timedelta(days=1)
+    return rows, names
+
+def timeit(fn, repeat, setup=None):
+    """ fn을 repeat번 실행한 시간(ms) 통계 """
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "repeat": repeat,
+    }
+
+def rows_size(rows):
+    """ 행 목록의 대략적인 메모리 (시트 API 응답처럼 칸마다 별도 문자열 객체라고 보고 계산) """
+    return sys.getsizeof(rows) + sum(sys.getsizeof(r) + sum(sys.getsizeof(str(c)) for c in r) for r in rows)
+
+def run(args):
+    today = datetime.now(modules.KST).date()
+    rows, names = generate_records(args.users, args.months, args.events_per_day, today, seed=args.seed)
+    results = {
+        "meta": {
+            "users": args.users, "months": args.months, "events_per_day": args.events_per_day,
+            "rows": len(rows) - 1, "seed": args.seed, "python": platform.python_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "timings": {},
+    }
+    timings = results["timings"]
+
+    def fresh_sheet(_=None):
+        return FakeWorksheet(rows)
+
+    # 첫 동기화(전체 다운로드에 해당)
+    timings["sync_full"] = timeit(lambda sheet: modules.sync_records(sheet), args.repeat, setup=fresh_sheet)
+
+    sheet = fresh_sheet()
+    modules.sync_records(sheet)
+    for fn in (modules.check_is_clocked_in, modules.check_is_clocked_out, modules.check_is_absent_today):
+        timings[fn.__name__] = timeit(lambda: [fn(sheet, n) for n in names], args.repeat)
+        timings[fn.__name__]["calls_per_run"] = len(names)
+
+    timings["process_nn_records"] = timeit(
+        lambda s: modules.process_nn_records(s, names), args.repeat, setup=fresh_sheet
+    )
+
+    df = reports.records_frame(rows)
+    timings["records_frame"] = timeit(lambda: reports.records_frame(rows), args.repeat)
+    # 로컬 사본 메모리: 시트에서 받은 문자열 행 목록 vs 열 단위 사본 (프레임은 배열을 복사하지 않는 뷰)
+    timings["event_columns_build"] = timeit(lambda: EventColumns.from_rows(rows[1:]), args.repeat)
+    columns = modules.sync_records(sheet).columns
+    timings["columns_frame"] = timeit(lambda: reports.columns_frame(columns), args.repeat)
+    results["memory"] = {
+        "rows_list_bytes": rows_size(rows),
+        "event_columns_bytes": columns.nbytes,
+        "records_frame_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+    # 일별 상태 표: 전체 기록으로 한 번 계산, 이후 월간 리포트는 그 달의 (이름, 날짜) 수에 비례
+    timings["daily_table_build"] = timeit(lambda: DailyTable().replace_from(rows[1:]), args.repeat)
+    table = DailyTable()
+    table.replace_from(rows[1:])
+
+    # 앱의 월간 리포트 경로 (get_month_result -> daily_month_result)
+    timings["monthly_report"] = timeit(
+        lambda: reports.daily_month_result(table, today.year, today.month), args.repeat
+    )
+    report = reports.daily_month_result(table, today.year, today.month)[0]
+    timings["excel_export"] = timeit(lambda: reports.report_workbook_bytes(report), args.repeat)
+    results["meta"]["excel_bytes"] = len(reports.report_workbook_bytes(report))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="출결 앱 주요 경로 벤치마크 (결과는 JSON)")
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--months", type=float, default=12)
+    parser.add_argument("--events-per-day", type=int, default=2, help="사용자별 하루 이벤트 수 (출근/퇴근 쌍 단위)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (기본: 표준 출력)")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    sys.exit(main())
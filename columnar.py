@@ -0,0 +1,256 @@
+import bisect
+import re
+
+from daily import EVENT_TYPES, parse_timestamp
+from instrumentation import lazy_import
+from storage import ROW_WIDTH
+
+# --- 열 단위(columnar) 출결 기록 ---
+# 시트 행(문자열 8칸)을 그대로 들고 있으면 이름/상태 문자열이 행마다 반복되어 워커마다 메모리를 많이 쓰므로
+# 열별 numpy 배열로 보관한다.
+#   ts       int64    KST 벽시계 시각의 epoch 초 (datetime64[s]와 같은 값, 잘못된 값은 NaT)
+#   user     int16    이름 코드 (names 목록에 한 번만 저장)
+#   type     uint8    상태 코드 (type_names 목록)
+#   lat/lon  float32  위치 좌표 (없으면 NaN)
+#   site     int16    위치 칸의 장소 이름 코드 (없으면 -1)
+#   distance float32  거리 m (없으면 NaN)
+# 사유는 대부분 비어 있으므로 (행 번호, 조퇴/지각/결근 사유) 희소 표로 따로 보관하고,
+# 표준 형식이 아닌 칸이 있는 행만 원래 값을 raw에 남긴다.
+# 배열은 뒤에 추가만 하므로 이미 만든 뷰(arr[:n])는 이후 추가와 상관없이 그대로 유효하다.
+# 다른 스레드가 extend()하는 동안 여러 열을 함께 읽을 때는 snapshot()으로 행 수를 한 번만 읽어 같은 길이로 자른다.
+
+np = lazy_import("numpy")
+
+NAT = -2 ** 63              # numpy NaT의 int64 값
+NO_CODE = -1
+NAN = float("nan")
+INITIAL_CAPACITY = 1024
+# 'lat,lon' 또는 'lat,lon (장소)'
+LOCATION_RE = re.compile(r"^(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)(?: \((.+)\))?$")
+DISTANCE_RE = re.compile(r"^(-?\d+(?:\.\d+)?)m$")
+
+def _fmt_float(value):
+    """ float32 값을 다시 읽었을 때 같은 값이 되는 가장 짧은 문자열 """
+    return np.format_float_positional(value, trim="-")
+
+def _parse_ts(values):
+    """ 타임스탬프 문자열 목록 -> epoch 초 int64 배열 (잘못된 값은 NAT) """
+    try:
+        return np.array(values, dtype="datetime64[s]").view("int64")
+    except ValueError:
+        out = np.empty(len(values), dtype="int64")
+        for i, value in enumerate(values):
+            try:
+                out[i] = np.datetime64(value, "s").view("int64")
+            except ValueError:
+                dt = parse_timestamp(value)
+                out[i] = np.datetime64(dt.replace(tzinfo=None), "s").view("int64") if dt else NAT
+        return out
+
+def _clean_reason(value):
+    return "" if value.lower() in ("nan", "none", "") else value
+
+class EventColumns:
+    """ 출결 기록의 열 단위 저장소 (행 순서 = 시트 행 순서) """
+    _fields = (("ts", "int64"), ("user", "int16"), ("type", "uint8"), ("site", "int16"),
+               ("lat", "float32"), ("lon", "float32"), ("distance", "float32"))
+
+    def __init__(self):
+        self.n = 0
+        self.capacity = 0
+        self._arrays = {name: np.empty(0, dtype=dtype) for name, dtype in self._fields}
+        self.names, self._name_codes = [], {}
+        self.type_names, self._type_codes = [], {}
+        self.site_names, self._site_codes = [], {}
+        for t in EVENT_TYPES:
+            self._code(t, self.type_names, self._type_codes)
+        self.reason_rows = []   # 사유가 있는 행 번호 (오름차순)
+        self.reasons = []       # reason_rows와 같은 순서의 (조퇴사유, 지각사유, 결근사유)
+        self.raw = {}           # 행 번호 -> 원래 행 (표준 형식으로 복원할 수 없는 행만)
+
+    @classmethod
+    def from_rows(cls, rows):
+        columns = cls()
+        columns.extend(rows)
+        return columns
+
+    def __len__(self):
+        return self.n
+
+    def __getattr__(self, name):
+        # ts, user, type, site, lat, lon, distance: 현재 행 수만큼의 읽기 전용 뷰
+        arrays = self.__dict__.get("_arrays")
+        if arrays is None or name not in arrays:
+            raise AttributeError(name)
+        view = arrays[name][:self.n]
+        view.flags.writeable = False
+        return view
+
+    @staticmethod
+    def _code(value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _reserve(self, count):
+        needed = self.n + count
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2, INITIAL_CAPACITY)
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.n] = array[:self.n]
+            self._arrays[name] = grown
+        self.capacity = capacity
+
+    def extend(self, rows):
+        """ 시트 행(문자열 목록) 목록을 뒤에 추가 (빈 행도 행 번호 유지를 위해 그대로 추가) """
+        if not rows:
+            return
+        count = len(rows)
+        pad = [""] * ROW_WIDTH
+        cells = [(list(r) + pad)[:ROW_WIDTH] for r in rows]
+        users = [self._code(c[1], self.names, self._name_codes) for c in cells]
+        types = [self._code(c[2], self.type_names, self._type_codes) for c in cells]
+        if len(self.names) > 2 ** 15 or len(self.type_names) > 2 ** 8:
+            raise ValueError(f"이름({len(self.names)}) 또는 상태({len(self.type_names)}) 종류가 너무 많습니다.")
+        ts = _parse_ts([c[0].strip() for c in cells])
+        locations, distances = {}, {}   # 같은 위치/거리 문자열은 한 번만 해석
+        lat, lon, site, dist = [], [], [], []
+        start = self.n
+        for i, c in enumerate(cells):
+            raw = len(rows[i]) > ROW_WIDTH or (ts[i] == NAT and any(c))
+            loc = locations.get(c[3])
+            if loc is None:
+                match = LOCATION_RE.match(c[3])
+                if match:
+                    name = match.group(3)
+                    code = self._code(name, self.site_names, self._site_codes) if name else NO_CODE
+                    loc = (float(match.group(1)), float(match.group(2)), code)
+                else:
+                    loc = (NAN, NAN, NO_CODE if c[3] == "" else None)
+                locations[c[3]] = loc
+            if loc[2] is None:
+                raw = True
+                lat.append(NAN), lon.append(NAN), site.append(NO_CODE)
+            else:
+                lat.append(loc[0]), lon.append(loc[1]), site.append(loc[2])
+            d = distances.get(c[4])
+            if d is None:
+                match = DISTANCE_RE.match(c[4])
+                d = distances[c[4]] = float(match.group(1)) if match else (NAN if c[4] == "" else False)
+            if d is False:
+                raw = True
+                d = NAN
+            dist.append(d)
+            if c[5] or c[6] or c[7]:
+                self.reason_rows.append(start + i)
+                self.reasons.append((c[5], c[6], c[7]))
+            if raw:
+                self.raw[start + i] = list(rows[i])
+        self._reserve(count)
+        a = self._arrays
+        end = start + count
+        a["ts"][start:end] = ts
+        a["user"][start:end] = users
+        a["type"][start:end] = types
+        a["site"][start:end] = site
+        a["lat"][start:end] = lat
+        a["lon"][start:end] = lon
+        a["distance"][start:end] = dist
+        self.n = end
+
+    def snapshot(self):
+        """ 현재 행 수 기준의 읽기 전용 스냅숏 (ColumnsSnapshot) """
+        return ColumnsSnapshot(self)
+
+    def reason_table(self):
+        """ 희소 사유 표: (행 번호 배열, 조퇴사유 목록, 지각사유 목록, 결근사유 목록). 'nan'/'none'은 빈 값 """
+        return self.snapshot().reason_table()
+
+    def row(self, i):
+        """ i번째 행을 시트 행 형식(8칸 문자열)으로 복원 """
+        if i in self.raw:
+            return list(self.raw[i])
+        a = self._arrays
+        ts = "" if a["ts"][i] == NAT else str(a["ts"][i].astype("datetime64[s]")).replace("T", " ")
+        loc = ""
+        if not np.isnan(a["lat"][i]):
+            loc = f"{_fmt_float(a['lat'][i])},{_fmt_float(a['lon'][i])}"
+            if a["site"][i] != NO_CODE:
+                loc += f" ({self.site_names[a['site'][i]]})"
+        dist = "" if np.isnan(a["distance"][i]) else f"{_fmt_float(a['distance'][i])}m"
+        row = [ts, self.names[a["user"][i]], self.type_names[a["type"][i]], loc, dist, "", "", ""]
+        k = bisect.bisect_left(self.reason_rows, i)
+        if k < len(self.reason_rows) and self.reason_rows[k] == i:
+            row[5:8] = self.reasons[k]
+        return row
+
+    def rows(self, indices=None):
+        return [self.row(int(i)) for i in (range(self.n) if indices is None else indices)]
+
+    def select(self, name=None, start=None, end=None):
+        """ 조건에 맞는 행 번호 배열 (start/end: 'YYYY-MM-DD', 양 끝 포함, 시간순 정렬) """
+        return self.snapshot().select(name, start, end)
+
+    def users(self):
+        """ 유효한 기록이 있는 이름 목록 (정렬) """
+        return self.snapshot().users()
+
+    @property
+    def nbytes(self):
+        """ 대략적인 메모리 사용량 (배열 + 이름/사유/원본 행 문자열) """
+        arrays = sum(a.nbytes for a in self._arrays.values())
+        strings = sum(len(s.encode("utf-8")) for s in self.names + self.type_names + self.site_names)
+        strings += sum(len(v.encode("utf-8")) for r in self.reasons for v in r)
+        strings += sum(len(str(v).encode("utf-8")) for r in self.raw.values() for v in r)
+        return arrays + strings + 8 * len(self.reason_rows)
+
+class ColumnsSnapshot:
+    """ EventColumns의 한 시점 뷰. 행 수(n)를 한 번만 읽어 모든 열을 같은 길이로 자르므로
+    읽는 도중 다른 스레드가 extend()해도 열 길이가 서로 어긋나지 않음 (배열은 복사하지 않음) """
+    def __init__(self, columns):
+        self.n = n = columns.n
+        # extend()는 배열에 값을 쓴 뒤 n을 늘리고, 배열을 키울 때도 기존 n개를 복사한 뒤 교체하므로
+        # 여기서 읽은 배열은 (이전 것이든 새 것이든) 앞의 n개가 항상 채워져 있음
+        for name, array in list(columns._arrays.items()):
+            view = array[:n]
+            view.flags.writeable = False
+            setattr(self, name, view)
+        self.names = list(columns.names)
+        self.type_names = list(columns.type_names)
+        self.site_names = list(columns.site_names)
+        self._name_codes = columns._name_codes
+        # reason_rows가 reasons보다 먼저 추가되므로 짧은 쪽과 n 이전 행까지만 사용
+        rows, reasons = list(columns.reason_rows), list(columns.reasons)
+        k = min(bisect.bisect_left(rows, n), len(reasons))
+        self.reason_rows, self.reasons = rows[:k], reasons[:k]
+
+    def __len__(self):
+        return self.n
+
+    def reason_table(self):
+        rows = np.array(self.reason_rows, dtype="int64")
+        columns = list(zip(*self.reasons)) if self.reasons else [(), (), ()]
+        return (rows,) + tuple([_clean_reason(v) for v in col] for col in columns)
+
+    def select(self, name=None, start=None, end=None):
+        ts = self.ts
+        mask = ts != NAT
+        if start:
+            mask &= ts >= np.datetime64(start, "s").view("int64")
+        if end:
+            mask &= ts < (np.datetime64(end, "D") + 1).astype("datetime64[s]").view("int64")
+        if name is not None:
+            code = self._name_codes.get(name)
+            if code is None:
+                return np.empty(0, dtype="int64")
+            mask &= self.user == code
+        indices = np.flatnonzero(mask)
+        return indices[np.argsort(ts[indices], kind="stable")]
+
+    def users(self):
+        codes = np.unique(self.user[self.ts != NAT])
+        return sorted(self.names[c] for c in codes)
@@ -0,0 +1,360 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, time, timedelta
+
+# --- 일별 출결 상태 (materialized) ---
+# 원본 이벤트를 (이름, 날짜)별로 미리 집계해 두는 표. 이벤트가 추가/동기화될 때마다 해당 날짜만 갱신하고
+# 출결 확인, NN 보충, 월간 리포트는 이 표만 읽는다. 행 형식은 시트와 동일
+# [timestamp, name, type, loc, distance, early_reason, late_reason, absent_reason]
+
+NO_REASON = "사유없음"
+EVENT_TYPES = ["출근", "지각", "퇴근", "조퇴", "결근", "출근NN", "퇴근NN"]
+# 상태별로 리포트에 쓰는 사유 칸 (조퇴사유=5, 지각사유=6, 결근사유=7)
+REASON_INDEX = {"지각": 6, "조퇴": 5, "결근": 7, "출근NN": 6, "퇴근NN": 5}
+EXCUSED_MARK = "[업무]"
+
+def parse_timestamp(value):
+    """ 'YYYY-MM-DD HH:MM:SS' 형식의 타임스탬프. 잘못된 값이면 None """
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+def _reason(row, idx):
+    """ 빈 값/'nan'/'none' 사유는 빈 문자열 """
+    value = str(row[idx]) if len(row) > idx and row[idx] is not None else ""
+    return "" if value.lower() in ("nan", "none", "") else value
+
+def _clean(reason):
+    return reason or NO_REASON
+
+class TypeStat:
+    """ 하루 동안 한 상태(type)의 기록 요약: 가장 이른/늦은 시각과 그때의 사유, [업무] 여부 """
+    __slots__ = ("first", "last", "first_reason", "last_reason", "excused")
+
+    def __init__(self, t, reason, excused):
+        self.first = self.last = t
+        self.first_reason = self.last_reason = reason
+        self.excused = excused
+
+    def add(self, t, reason, excused):
+        # 같은 시각이면 먼저 들어온 기록이 first, 나중에 들어온 기록이 last (시간순 안정 정렬과 동일)
+        if t < self.first:
+            self.first, self.first_reason = t, reason
+        if t >= self.last:
+            self.last, self.last_reason = t, reason
+        self.excused = self.excused or excused
+
+    def to_list(self):
+        return [self.first.isoformat(), self.last.isoformat(), self.first_reason, self.last_reason, self.excused]
+
+    @classmethod
+    def from_list(cls, data):
+        stat = cls(time.fromisoformat(data[0]), data[2], data[4])
+        stat.last, stat.last_reason = time.fromisoformat(data[1]), data[3]
+        return stat
+
+class DayStatus:
+    """ (이름, 날짜) 하루의 상태별 요약 """
+    __slots__ = ("types",)
+
+    def __init__(self):
+        self.types = {}     # type -> TypeStat
+
+    def add(self, t, event_type, row):
+        idx = REASON_INDEX.get(event_type)
+        reason = _reason(row, idx) if idx else ""
+        excused = event_type in ("지각", "조퇴") and EXCUSED_MARK in reason
+        stat = self.types.get(event_type)
+        if stat is None:
+            self.types[event_type] = TypeStat(t, reason, excused)
+        else:
+            stat.add(t, reason, excused)
+
+    def type_set(self):
+        return frozenset(self.types)
+
+    def summary(self):
+        """ 리포트 칸 문자열과 (결근, 지각, 조퇴) 건수. 알려진 상태가 없으면 None """
+        if not any(t in self.types for t in EVENT_TYPES):
+            return None
+        ty = self.types
+        has_in, has_late, has_out = "출근" in ty, "지각" in ty, "퇴근" in ty
+        has_early, has_absent = "조퇴" in ty, "결근" in ty
+        has_in_nn = not has_in and "출근NN" in ty
+        has_out_nn = not has_out and "퇴근NN" in ty
+        both_nn = has_in_nn and has_out_nn
+        has_work = has_in or "출근NN" in ty or has_late
+        late_exc = has_late and ty["지각"].excused
+        early_exc = has_early and ty["조퇴"].excused
+
+        in_time = ""
+        if "출근NN" in ty:
+            in_time = "NN"
+        if has_in:
+            in_time = ty["출근"].first.strftime("%H:%M")
+        if has_late:
+            in_time = ty["지각"].first.strftime("%H:%M")
+        out_time = ""
+        if "퇴근NN" in ty:
+            out_time = "NN"
+        if has_out:
+            out_time = ty["퇴근"].last.strftime("%H:%M")
+        if has_early:
+            out_time = ty["조퇴"].last.strftime("%H:%M")
+
+        notes = []
+        if has_in_nn:
+            notes.append(f"지각({_clean(ty['출근NN'].first_reason)})")
+        if has_late:
+            notes.append(f"지각({'업무:' if late_exc else ''}{_clean(ty['지각'].last_reason)})")
+        if has_early:
+            notes.append(f"조퇴({'업무:' if early_exc else ''}{_clean(ty['조퇴'].last_reason)})")
+        if has_absent:
+            notes.append(f"결근({_clean(ty['결근'].first_reason)})")
+        if has_out_nn:
+            notes.append(f"조퇴({_clean(ty['퇴근NN'].first_reason)})")
+        # 출근NN과 퇴근NN이 모두 있는 날은 결근으로 처리
+        note = f"결근({NO_REASON})" if both_nn else ", ".join(notes)
+
+        parts = []
+        if in_time:
+            parts.append(f"출근: {in_time}")
+        if out_time:
+            parts.append(f"퇴근: {out_time}")
+        elif has_work and not has_absent and not has_out_nn:
+            parts.append("퇴근: NN")
+        if note:
+            parts.append(note)
+        return (
+            ", ".join(parts),
+            int(has_absent) + int(both_nn),
+            int(has_late and not late_exc) + int(has_in_nn) - int(both_nn),
+            int(has_early and not early_exc) + int(has_out_nn) - int(both_nn),
+        )
+
+    def to_json(self):
+        return json.dumps({t: s.to_list() for t, s in self.types.items()}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        day = cls()
+        day.types = {t: TypeStat.from_list(v) for t, v in json.loads(text).items()}
+        return day
+
+class DailyTable:
+    """ (이름, 날짜 'YYYY-MM-DD') -> DayStatus. 바뀐 날짜는 dirty로 모아 두었다가 저장 """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.days = {}
+        self.by_month = {}          # (년, 월) -> {(이름, 날짜)}
+        self.archived = set()       # 보관 시트에서 불러온 (년, 월)
+        self.source_version = 0     # 로컬 저장소 기준으로 어디까지 반영했는지 (저장소 버전)
+        self.dirty = set()
+        self.removed = set()
+
+    def _put(self, key, day):
+        self.days[key] = day
+        self.by_month.setdefault((int(key[1][:4]), int(key[1][5:7])), set()).add(key)
+        self.dirty.add(key)
+        self.removed.discard(key)
+
+    def _drop(self, key):
+        if self.days.pop(key, None) is not None:
+            self.by_month.get((int(key[1][:4]), int(key[1][5:7])), set()).discard(key)
+            self.dirty.discard(key)
+            self.removed.add(key)
+
+    @staticmethod
+    def _aggregate(rows):
+        days = {}
+        for row in rows:
+            if len(row) < 3:
+                continue
+            dt = parse_timestamp(row[0])
+            if dt is None:
+                continue
+            key = (str(row[1]), dt.date().isoformat())
+            day = days.get(key)
+            if day is None:
+                day = days[key] = DayStatus()
+            day.add(dt.time(), str(row[2]), row)
+        return days
+
+    def add_rows(self, rows):
+        """ 새로 추가된 행 반영 (해당 날짜만 갱신) """
+        with self.lock:
+            for row in rows:
+                if len(row) < 3:
+                    continue
+                dt = parse_timestamp(row[0])
+                if dt is None:
+                    continue
+                key = (str(row[1]), dt.date().isoformat())
+                day = self.days.get(key)
+                if day is None:
+                    day = DayStatus()
+                day.add(dt.time(), str(row[2]), row)
+                self._put(key, day)
+
+    def replace_from(self, rows):
+        """ 원본 시트 전체 동기화 결과로 다시 계산. 원본에 없는 날은 삭제된 것으로 봄
+        (보관 시트에서 불러온 달(archived)은 원본에 없으므로 유지) """
+        days = self._aggregate(rows)
+        with self.lock:
+            for key in [k for k in self.days if k not in days
+                        and (int(k[1][:4]), int(k[1][5:7])) not in self.archived]:
+                self._drop(key)
+            for key, day in days.items():
+                old = self.days.get(key)
+                if old is None or old.to_json() != day.to_json():
+                    self._put(key, day)
+
+    def replace_month(self, year, month, rows, archived=False):
+        """ 한 달치 기록으로 해당 월을 다시 계산 (보관 시트에서 읽은 달) """
+        prefix = f"{year:04d}-{month:02d}"
+        days = {k: v for k, v in self._aggregate(rows).items() if k[1].startswith(prefix)}
+        with self.lock:
+            for key in list(self.by_month.get((year, month), ())):
+                if key not in days:
+                    self._drop(key)
+            for key, day in days.items():
+                self._put(key, day)
+            if archived:
+                self.archived.add((year, month))
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.days):
+                self._drop(key)
+            self.archived.clear()
+            self.source_version = 0
+
+    def types(self, name, date_str):
+        """ 해당 날짜에 사용자가 남긴 상태(type) 집합 """
+        with self.lock:
+            day = self.days.get((name, date_str))
+            return day.type_set() if day is not None else frozenset()
+
+    def months(self):
+        """ 기록이 있는 (년, 월) 목록 """
+        with self.lock:
+            return sorted(ym for ym, keys in self.by_month.items() if keys)
+
+    def month_summary(self, year, month):
+        """ 해당 월의 (사용자 목록, [(이름, 날짜, 출결 문자열, 결근, 지각, 조퇴)]) """
+        users, out = set(), []
+        with self.lock:
+            for name, date_str in self.by_month.get((year, month), ()):
+                users.add(name)
+                summary = self.days[(name, date_str)].summary()
+                if summary is not None:
+                    out.append((name, date_str, *summary))
+        return sorted(users), out
+
+    def nn_gaps(self, all_users, now, window_days, pending_rows=()):
+        """ 지난 window_days일(평일) + 오늘 중 출근/퇴근 기록이 빠진 날의 [(날짜, 이름, 출근NN/퇴근NN)]
+        pending_rows(아직 표에 반영되지 않은 기록, 예: 시트 반영 대기 중인 저널 이벤트)도 있는 기록으로 봄
+        정렬: 사용자 순서 -> 지난 날짜 먼저, 오늘 마지막 -> 날짜 -> 출근NN, 퇴근NN """
+        today = now.date()
+        pending = self._aggregate(pending_rows)
+        user_order = {u: i for i, u in enumerate(dict.fromkeys(all_users))}
+        dates = []
+        d = today - timedelta(days=window_days)
+        while d <= today:
+            if d.weekday() < 5:
+                dates.append(d.isoformat())
+            d += timedelta(days=1)
+        out = []
+        with self.lock:
+            self._collect_nn(out, user_order, dates, today, now.hour, pending)
+        return [(date_str, user, t) for *_, date_str, _, user, t in sorted(out)]
+
+    def _collect_nn(self, out, user_order, dates, today, hour, pending):
+        for user, order in user_order.items():
+            for date_str in dates:
+                day = self.days.get((user, date_str))
+                extra = pending.get((user, date_str))
+                if day is None and extra is None:
+                    continue
+                ty = day.types if day is not None else {}
+                if extra is not None:
+                    ty = set(ty) | set(extra.types)
+                if "결근" in ty:
+                    continue
+                has_in = "출근" in ty or "지각" in ty
+                has_out = "퇴근" in ty or "조퇴" in ty
+                in_nn, out_nn = "출근NN" in ty, "퇴근NN" in ty
+                if date_str < today.isoformat():
+                    if not has_in and not in_nn and (has_out or not out_nn):
+                        out.append((order, 0, date_str, 0, user, "출근NN"))
+                    if not has_out and not out_nn and (has_in or not in_nn):
+                        out.append((order, 0, date_str, 1, user, "퇴근NN"))
+                elif hour >= 18 and not has_in and has_out and not in_nn:
+                    out.append((order, 1, date_str, 0, user, "출근NN"))
+
+class DailyStatusStore:
+    """ 일별 상태 표를 워크시트(또는 저장소)별로 SQLite에 저장 """
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_status (
+                source TEXT NOT NULL,
+                name TEXT NOT NULL,
+                date TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (source, name, date)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_meta (
+                source TEXT PRIMARY KEY,
+                archived TEXT NOT NULL DEFAULT '[]',
+                source_version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    def load(self, source):
+        table = DailyTable()
+        with self._lock:
+            rows = self._conn.execute("SELECT name, date, data FROM daily_status WHERE source = ?", (source,)).fetchall()
+            meta = self._conn.execute(
+                "SELECT archived, source_version FROM daily_meta WHERE source = ?", (source,)
+            ).fetchone()
+        for name, date_str, data in rows:
+            table._put((name, date_str), DayStatus.from_json(data))
+        if meta:
+            table.archived = {tuple(ym) for ym in json.loads(meta[0])}
+            table.source_version = meta[1]
+        table.dirty.clear()
+        return table
+
+    def save(self, source, table):
+        """ 마지막 저장 이후 바뀐 날짜만 기록 """
+        with table.lock:
+            upserts = [(source, k[0], k[1], table.days[k].to_json()) for k in table.dirty if k in table.days]
+            deletes = [(source, k[0], k[1]) for k in table.removed]
+            meta = (source, json.dumps(sorted(table.archived)), table.source_version)
+            table.dirty.clear()
+            table.removed.clear()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO daily_status (source, name, date, data) VALUES (?, ?, ?, ?)", upserts
+                )
+                self._conn.executemany("DELETE FROM daily_status WHERE source = ? AND name = ? AND date = ?", deletes)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO daily_meta (source, archived, source_version) VALUES (?, ?, ?)", meta
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                # 저장하지 못한 날짜는 다음 저장 때 다시 기록
+                with table.lock:
+                    table.dirty.update((k[1], k[2]) for k in upserts if (k[1], k[2]) not in table.removed)
+                    table.removed.update((k[1], k[2]) for k in deletes if (k[1], k[2]) not in table.days)
+                raise
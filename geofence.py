@@ -0,0 +1,149 @@
+import math
+
+# --- 출결 가능 장소(지오펜스) ---
+# 장소 설정 예 (secrets.toml):
+#   [[sites]]
+#   name = "SCP-LAB"
+#   lat = 37.456461
+#   lon = 126.952096
+#   radius_m = 100
+#
+#   [[sites]]
+#   name = "301동 세미나실"
+#   polygon = [[37.4501, 126.9521], [37.4503, 126.9521], [37.4503, 126.9525], [37.4501, 126.9525]]
+#
+# 판정 순서: 격자 인덱스로 후보 장소 선택 -> 경계 상자(bbox) 비교 -> 정확한 판정(geodesic / 다각형 내부)
+
+EARTH_RADIUS_M = 6371008.8
+GRID_DEG = 0.01          # 격자 한 칸 크기 (위도 기준 약 1.1km)
+BBOX_MARGIN_M = 5        # 근사 계산 오차를 덮기 위한 경계 상자 여유
+
+def geodesic_m(a, b):
+    """ 정확한 타원체 거리(m). geopy는 실제 위치 판정 때 처음 불러옴 """
+    from geopy.distance import geodesic
+    return geodesic(a, b).meters
+
+def _meters_to_deg(meters, lat):
+    """ 위도 lat에서 meters에 해당하는 (위도 차, 경도 차) """
+    dlat = math.degrees(meters / EARTH_RADIUS_M)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return dlat, dlon
+
+def approx_distance_m(lat1, lon1, lat2, lon2):
+    """ equirectangular 근사 거리 (가까운 거리에서 후보 비교용) """
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+class Site:
+    """ 원(중심, 반경) 또는 다각형 장소 """
+    def __init__(self, name, lat=None, lon=None, radius_m=None, polygon=None):
+        self.name = name
+        if polygon:
+            self.polygon = [(float(p[0]), float(p[1])) for p in polygon]
+            if len(self.polygon) < 3:
+                raise ValueError(f"장소 '{name}'의 다각형 꼭짓점이 3개 미만입니다.")
+            self.radius_m = None
+            self.lat = sum(p[0] for p in self.polygon) / len(self.polygon)
+            self.lon = sum(p[1] for p in self.polygon) / len(self.polygon)
+            lats = [p[0] for p in self.polygon]
+            lons = [p[1] for p in self.polygon]
+            dlat, dlon = _meters_to_deg(BBOX_MARGIN_M, self.lat)
+            self.bbox = (min(lats) - dlat, max(lats) + dlat, min(lons) - dlon, max(lons) + dlon)
+        else:
+            if lat is None or lon is None or radius_m is None:
+                raise ValueError(f"장소 '{name}'에는 lat, lon, radius_m 또는 polygon이 필요합니다.")
+            self.polygon = None
+            self.lat, self.lon, self.radius_m = float(lat), float(lon), float(radius_m)
+            dlat, dlon = _meters_to_deg(self.radius_m + BBOX_MARGIN_M, self.lat)
+            self.bbox = (self.lat - dlat, self.lat + dlat, self.lon - dlon, self.lon + dlon)
+
+    def in_bbox(self, lat, lon):
+        min_lat, max_lat, min_lon, max_lon = self.bbox
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+    def contains(self, lat, lon):
+        """ 정확한 판정. (포함 여부, 중심까지의 거리 m) """
+        distance = geodesic_m((self.lat, self.lon), (lat, lon))
+        if self.polygon is None:
+            return distance <= self.radius_m, distance
+        return _point_in_polygon(lat, lon, self.polygon), distance
+
+    def __repr__(self):
+        shape = f"polygon({len(self.polygon)})" if self.polygon else f"r={self.radius_m:g}m"
+        return f"Site({self.name!r}, {self.lat:.6f}, {self.lon:.6f}, {shape})"
+
+def _point_in_polygon(lat, lon, polygon):
+    """ ray casting (건물 크기의 다각형에서는 위경도를 평면으로 봐도 충분) """
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            cross = lon_i + (lat - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if lon < cross:
+                inside = not inside
+        j = i
+    return inside
+
+def _cell(lat, lon):
+    return int(math.floor(lat / GRID_DEG)), int(math.floor(lon / GRID_DEG))
+
+class Geofence:
+    """ 여러 장소에 대한 위치 판정. 격자 칸 -> 장소 목록 인덱스를 유지 """
+    def __init__(self, sites):
+        self.sites = list(sites)
+        if not self.sites:
+            raise ValueError("출결 가능 장소가 하나 이상 필요합니다.")
+        self._grid = {}
+        for site in self.sites:
+            min_lat, max_lat, min_lon, max_lon = site.bbox
+            lo_r, lo_c = _cell(min_lat, min_lon)
+            hi_r, hi_c = _cell(max_lat, max_lon)
+            for r in range(lo_r, hi_r + 1):
+                for c in range(lo_c, hi_c + 1):
+                    self._grid.setdefault((r, c), []).append(site)
+
+    @classmethod
+    def from_config(cls, config):
+        """ [{"name", "lat", "lon", "radius_m"} 또는 {"name", "polygon"}] 목록으로 생성 """
+        sites = []
+        for i, item in enumerate(config):
+            item = dict(item)
+            sites.append(Site(
+                item.get("name") or f"site{i + 1}",
+                lat=item.get("lat"), lon=item.get("lon"),
+                radius_m=item.get("radius_m"), polygon=item.get("polygon"),
+            ))
+        return cls(sites)
+
+    def match(self, lat, lon):
+        """ 위치가 속한 장소와 그 중심까지의 거리(m). 여러 곳이면 중심이 가장 가까운 장소. 없으면 (None, None) """
+        best, best_distance = None, None
+        for site in self._grid.get(_cell(lat, lon), ()):
+            if not site.in_bbox(lat, lon):
+                continue
+            inside, distance = site.contains(lat, lon)
+            if inside and (best is None or distance < best_distance):
+                best, best_distance = site, distance
+        return best, best_distance
+
+    def nearest(self, lat, lon):
+        """ 중심이 가장 가까운 장소와 거리(m). 근사 거리로 고른 뒤 한 곳만 정확히 계산 """
+        site = min(self.sites, key=lambda s: approx_distance_m(lat, lon, s.lat, s.lon))
+        return site, geodesic_m((site.lat, site.lon), (lat, lon))
+
+    def locate(self, lat, lon):
+        """ (속한 장소 또는 None, 기준 장소, 기준 장소 중심까지의 거리 m)
+        장소 안이면 기준 장소는 속한 장소, 밖이면 가장 가까운 장소 """
+        site, distance = self.match(lat, lon)
+        if site is not None:
+            return site, site, distance
+        nearest, distance = self.nearest(lat, lon)
+        return None, nearest, distance
+
+def format_location(lat, lon, site=None):
+    """ 시트 위치 칸 값: 'lat,lon' 또는 'lat,lon (장소)' """
+    text = f"{lat},{lon}"
+    return f"{text} ({site})" if site else text
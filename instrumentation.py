@@ -0,0 +1,247 @@
+import builtins
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# --- 성능 계측 ---
+# 구글 시트 API 호출(지연 시간, 데이터 크기), 기록 캐시 적중률, 화면 단계별 시간을 모은다.
+# 모든 측정값은 프로세스 전체에서 공유되며 구조화된 로그(JSON 한 줄)로도 남긴다.
+# ATTENDANCE_METRICS_LOG: 미지정=stderr, 파일 경로=해당 파일에 추가, off=로그 끔
+# ATTENDANCE_STARTUP_PROFILE=1: 시작 시 import별 시간과 첫 화면 시간 요약을 stderr로 출력
+
+SAMPLE_LIMIT = 500
+STARTUP_PROFILE = os.environ.get("ATTENDANCE_STARTUP_PROFILE", "").lower() in ("1", "true", "on")
+# 프로세스(워커) 시작 기준 시각. 앱에서 가장 먼저 import되는 모듈이므로 거의 시작 시점
+PROCESS_START = time.perf_counter()
+
+logger = logging.getLogger("attendance.metrics")
+
+def _configure_logger():
+    target = os.environ.get("ATTENDANCE_METRICS_LOG", "")
+    if logger.handlers:
+        return
+    logger.propagate = False
+    if target.lower() == "off":
+        logger.addHandler(logging.NullHandler())
+        return
+    handler = logging.FileHandler(target, encoding="utf-8") if target else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+_configure_logger()
+
+def log_event(kind, **fields):
+    """ 구조화된 로그 한 줄 출력 """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "kind": kind, **fields}, ensure_ascii=False, default=str))
+
+class Metrics:
+    """ 카운터와 시간 측정값(최근 SAMPLE_LIMIT개)을 보관하는 스레드 안전 저장소 """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}   # 이름 -> {"count", "total_ms", "samples"}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """ 현재 값으로 덮어쓰는 카운터 (예: 대기열 길이) """
+        with self._lock:
+            self.counters[name] = value
+
+    def observe(self, name, ms):
+        with self._lock:
+            t = self.timings.get(name)
+            if t is None:
+                t = self.timings[name] = {"count": 0, "total_ms": 0.0, "samples": deque(maxlen=SAMPLE_LIMIT)}
+            t["count"] += 1
+            t["total_ms"] += ms
+            t["samples"].append(ms)
+
+    def snapshot(self):
+        """ 진단 화면/벤치마크용 요약: 카운터와 타이밍별 count, 평균, p50, p95, 최대 """
+        with self._lock:
+            counters = dict(self.counters)
+            timings = {name: (t["count"], t["total_ms"], sorted(t["samples"])) for name, t in self.timings.items()}
+        summary = {}
+        for name, (count, total, samples) in sorted(timings.items()):
+            summary[name] = {
+                "count": count,
+                "mean_ms": round(total / count, 2) if count else 0.0,
+                "p50_ms": round(_percentile(samples, 50), 2),
+                "p95_ms": round(_percentile(samples, 95), 2),
+                "max_ms": round(samples[-1], 2) if samples else 0.0,
+            }
+        return {"counters": dict(sorted(counters.items())), "timings": summary}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    idx = min(len(sorted_samples) - 1, max(0, round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[idx]
+
+METRICS = Metrics()
+
+@contextmanager
+def timed(name, **fields):
+    """ 블록 실행 시간을 기록하고 로그로 남기는 컨텍스트 매니저 (예: 화면 단계별 시간) """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        METRICS.observe(name, ms)
+        log_event("phase", name=name, ms=round(ms, 2), **fields)
+
+def _payload_size(value):
+    """ (셀 수, 대략적인 바이트 수) """
+    if isinstance(value, dict):
+        return 0, len(json.dumps(value, default=str))
+    if isinstance(value, (list, tuple)):
+        rows = value if value and isinstance(value[0], (list, tuple)) else [value]
+        cells = sum(len(r) for r in rows)
+        return cells, sum(len(str(c).encode("utf-8")) for r in rows for c in r)
+    return 0, 0
+
+class InstrumentedWorksheet:
+    """ gspread Worksheet의 API 호출 시간과 주고받은 데이터 크기를 기록하는 래퍼 """
+    # 기록할 API 호출 메서드와 (요청 데이터가 들어있는 인자 위치)
+    _calls = {
+        "get_all_values": None,
+        "get_values": None,
+        "get": None,
+        "batch_get": None,
+        "append_row": 0,
+        "append_rows": 0,
+        "update": 0,
+        "delete_rows": None,
+    }
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+
+    def __getattr__(self, name):
+        attr = getattr(self._worksheet, name)
+        if name not in self._calls:
+            return attr
+        arg_pos = self._calls[name]
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = attr(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                sent = None
+                if arg_pos is not None:
+                    sent = args[arg_pos] if len(args) > arg_pos else kwargs.get("values")
+                cells, nbytes = _payload_size(sent if sent is not None else (result if ok else None))
+                METRICS.observe(f"sheets.{name}", ms)
+                METRICS.incr(f"sheets.{name}.calls")
+                METRICS.incr(f"sheets.{name}.bytes", nbytes)
+                if not ok:
+                    METRICS.incr(f"sheets.{name}.errors")
+                log_event("sheets_api", method=name, ms=round(ms, 2), cells=cells, bytes=nbytes, ok=ok)
+        return call
+
+    def __repr__(self):
+        return f"InstrumentedWorksheet({self._worksheet!r})"
+
+# --- 시작 시간 측정 / 지연 import ---
+_import_state = threading.local()
+_once_lock = threading.Lock()
+_once_marked = set()
+_original_import = builtins.__import__
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """ 처음 불러오는 최상위 import의 시간을 기록 (중첩 import 시간은 바깥 import에 포함) """
+    if level or name in sys.modules or getattr(_import_state, "depth", 0):
+        return _original_import(name, globals, locals, fromlist, level)
+    _import_state.depth = 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _import_state.depth = 0
+        ms = (time.perf_counter() - start) * 1000
+        METRICS.observe(f"startup.import.{name}", ms)
+        log_event("import", name=name, ms=round(ms, 2))
+
+@contextmanager
+def profile_imports():
+    """ 시작 프로파일 모드일 때 블록 안의 import 시간을 기록 """
+    if not STARTUP_PROFILE or builtins.__import__ is _timed_import:
+        yield
+        return
+    builtins.__import__ = _timed_import
+    try:
+        yield
+    finally:
+        builtins.__import__ = _original_import
+
+def mark_once(name):
+    """ 프로세스 시작부터 name 시점까지의 시간을 프로세스당 한 번만 기록 (예: 첫 화면, 첫 출근 기록) """
+    with _once_lock:
+        if name in _once_marked:
+            return
+        _once_marked.add(name)
+    ms = (time.perf_counter() - PROCESS_START) * 1000
+    METRICS.observe(f"startup.{name}", ms)
+    log_event("startup", name=name, ms=round(ms, 2))
+    if STARTUP_PROFILE:
+        print_startup_profile(name)
+
+def print_startup_profile(title):
+    """ 지금까지 기록된 startup.* 시간을 긴 순서로 stderr에 출력 """
+    timings = METRICS.snapshot()["timings"]
+    rows = sorted(((k, v["max_ms"]) for k, v in timings.items() if k.startswith("startup.")), key=lambda kv: -kv[1])
+    lines = [f"[startup profile: {title}]"] + [f"  {ms:10.1f} ms  {name}" for name, ms in rows]
+    print("\n".join(lines), file=sys.stderr)
+
+class LazyModule:
+    """ 속성에 처음 접근할 때 import하는 모듈 대리 객체 (import 시간은 startup.lazy.* 로 기록) """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    fresh = self._name not in sys.modules
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if fresh:
+                        ms = (time.perf_counter() - start) * 1000
+                        METRICS.observe(f"startup.lazy.{self._name}", ms)
+                        log_event("import", name=self._name, ms=round(ms, 2), lazy=True)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_import(name):
+    return LazyModule(name)
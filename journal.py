@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import threading
+import time
+
+# --- 로컬 출결 이벤트 저널 ---
+# 구글 시트에 반영되기 전의 이벤트를 SQLite에 먼저 기록해 두고,
+# 백그라운드 작업이 모아서 시트에 추가한 뒤 flushed_at을 채운다.
+# event_key(멱등성 키)가 있는 이벤트는 시트에 반영되기 전까지 같은 시트에 같은 키로 한 번만 기록된다
+# (여러 프로세스가 저널을 함께 써도 유지). 반영된 뒤에는 키를 해제하고 중복 확인은 시트 기록에 맡긴다
+# (관리자가 잘못된 행을 지우면 다시 기록할 수 있도록).
+# 다시 보내도 성공할 수 없는 이벤트(400/403/404 등)는 dead_at을 채워 보류하고 대기 목록에서 뺀다.
+
+class EventJournal:
+    """ 시트에 반영할 출결 이벤트를 보관하는 SQLite 기반 write-ahead 로그 """
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sheet_key TEXT NOT NULL,
+                row TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                flushed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(events)")}
+        if "event_key" not in columns:
+            self._conn.execute("ALTER TABLE events ADD COLUMN event_key TEXT")
+        if "dead_at" not in columns:
+            self._conn.execute("ALTER TABLE events ADD COLUMN dead_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_events_pending ON events (sheet_key, flushed_at, id)")
+        # 이미 반영/보류된 이벤트의 키 해제 (키를 영구히 잡아 두던 이전 버전의 저널)
+        self._conn.execute(
+            "UPDATE events SET event_key = NULL WHERE event_key IS NOT NULL"
+            " AND (flushed_at IS NOT NULL OR dead_at IS NOT NULL)"
+        )
+        # NULL 키(NN 기록, 반영된 이벤트 등)는 서로 다른 값으로 취급되어 제한받지 않음
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_events_key ON events (sheet_key, event_key)")
+        # 아직 시트에 반영되지 않은 이벤트: sheet_key -> {id: row}
+        self._pending = {}
+        for event_id, key, row in self._conn.execute(
+            "SELECT id, sheet_key, row FROM events WHERE flushed_at IS NULL AND dead_at IS NULL ORDER BY id"
+        ):
+            self._pending.setdefault(key, {})[event_id] = json.loads(row)
+
+    def append(self, sheet_key, row, event_key=None):
+        """ 이벤트를 디스크에 기록(커밋)하고 id를 반환. 같은 event_key가 이미 있으면 기록하지 않고 None """
+        row = [str(v) for v in row]
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO events (sheet_key, row, created_at, event_key) VALUES (?, ?, ?, ?)",
+                (sheet_key, json.dumps(row, ensure_ascii=False), time.time(), event_key),
+            )
+            if not cur.rowcount:
+                return None
+            self._pending.setdefault(sheet_key, {})[cur.lastrowid] = row
+            return cur.lastrowid
+
+    def pending(self, sheet_key, limit=None):
+        """ 반영 대기 중인 (id, row) 목록 (기록 순서) """
+        with self._lock:
+            items = list(self._pending.get(sheet_key, {}).items())
+        return items[:limit] if limit else items
+
+    def pending_count(self, sheet_key=None):
+        with self._lock:
+            if sheet_key is None:
+                return sum(len(p) for p in self._pending.values())
+            return len(self._pending.get(sheet_key, {}))
+
+    def pending_types(self, sheet_key, date_str, name):
+        """ 반영 대기 중인 이벤트 중 해당 날짜/이름의 상태(type) 집합 """
+        with self._lock:
+            rows = list(self._pending.get(sheet_key, {}).values())
+        return {row[2] for row in rows if len(row) > 2 and row[0].startswith(date_str) and row[1] == name}
+
+    def mark_flushed(self, sheet_key, ids):
+        """ 반영 완료. 이후 중복 확인은 시트 기록으로 하므로 멱등성 키는 해제 """
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE events SET flushed_at = ?, event_key = NULL WHERE id = ?", [(time.time(), i) for i in ids]
+            )
+            pending = self._pending.get(sheet_key, {})
+            for i in ids:
+                pending.pop(i, None)
+
+    def mark_failed(self, ids, error):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE events SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(error, i) for i in ids],
+            )
+
+    def mark_dead(self, sheet_key, ids, error):
+        """ 보류: 대기 목록에서 빼고 오류를 남김. 사용자가 다시 기록할 수 있도록 멱등성 키는 해제 """
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE events SET dead_at = ?, last_error = ?, event_key = NULL WHERE id = ?",
+                [(time.time(), error, i) for i in ids],
+            )
+            pending = self._pending.get(sheet_key, {})
+            for i in ids:
+                pending.pop(i, None)
+
+    def dead_letters(self, limit=100):
+        """ 보류된 이벤트 (최근 순): [(id, sheet_key, row, 오류, 보류 시각)] """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, sheet_key, row, last_error, dead_at FROM events WHERE dead_at IS NOT NULL"
+                " ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(i, key, json.loads(row), error, dead_at) for i, key, row, error, dead_at in rows]
+
+    def dead_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events WHERE dead_at IS NOT NULL").fetchone()[0]
@@ -0,0 +1,413 @@
+"""출결 앱 동시 접속 부하 테스트 (로컬 가짜 Google Sheets API 사용)
+
+gspread가 쓰는 Sheets v4 엔드포인트(스프레드시트 메타데이터, values 조회, values append)를 흉내 내는
+로컬 HTTP 서버를 띄우고, 여러 사용자가 짧은 시간 안에 메인 화면에서 출근하는 흐름
+(이름 선택 후 화면 표시 -> 위치 확인 -> 출근 기록 -> 다시 그리기)을 동시에 실행한다.
+앱과 같은 modules 함수와 할당량 래퍼(quota.py)를 그대로 거치며, 서버에는 지연 시간과
+분당 요청 한도(429), 임의의 5xx 오류를 줄 수 있다.
+
+결과(JSON): 처리량, 단계별/전체 지연 시간 백분위(p50/p95/p99), 시트 반영까지 걸린 시간,
+출근 1회당 API 호출 수, 서버가 돌려준 오류 수, 중복/누락 행 수.
+
+    python loadtest.py --sessions 150 --window 300 --latency-ms 150
+    python loadtest.py --sessions 150 --window 30 --server-read-quota 60 --server-write-quota 60 --output load.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+# 저널/일별 상태 파일이 작업 디렉터리에 생기지 않도록 modules import 전에 지정
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("ATTENDANCE_JOURNAL_PATH", os.path.join(_tmp_dir, "load_journal.db"))
+os.environ.setdefault("ATTENDANCE_DAILY_PATH", os.path.join(_tmp_dir, "load_daily.db"))
+os.environ.setdefault("ATTENDANCE_METRICS_LOG", "off")
+
+import gspread  # noqa: E402
+from google.auth.credentials import AnonymousCredentials  # noqa: E402
+from requests.adapters import HTTPAdapter  # noqa: E402
+
+import modules  # noqa: E402
+from benchmark import generate_records  # noqa: E402
+from instrumentation import METRICS, InstrumentedWorksheet  # noqa: E402
+from quota import QuotaLimiter, QuotaWorksheet  # noqa: E402
+
+SHEETS_HOST = "https://sheets.googleapis.com"
+SPREADSHEET_ID = "loadtest"
+SHEET_TITLE = "Sheet1"
+WIDTH = 8
+
+# --- 가짜 Sheets API 서버 ---
+class FakeSheetsState:
+    """ 서버가 들고 있는 시트 내용과 호출 통계 """
+    def __init__(self, rows, latency_ms, jitter_ms, error_rate, read_quota, write_quota, seed=0):
+        self.lock = threading.Lock()
+        self.rows = [list(r) for r in rows]
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.quota = {"read": read_quota, "write": write_quota}
+        self.recent = {"read": deque(), "write": deque()}   # 최근 60초 동안 받은 요청 시각
+        self.rng = random.Random(seed)
+        self.calls = {}
+        self.errors = {}
+        self.appended_at = {}   # (타임스탬프, 이름, 상태) -> 서버에 추가된 시각(perf_counter)
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    def admit(self, kind, endpoint):
+        """ 요청을 받을지 결정. 거절하면 (상태 코드, 메시지) """
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            now = time.monotonic()
+            recent = self.recent[kind]
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            if self.quota[kind] and len(recent) >= self.quota[kind]:
+                error = (429, "Quota exceeded for quota metric 'Requests' (RESOURCE_EXHAUSTED)")
+            elif self.error_rate and self.rng.random() < self.error_rate:
+                error = (503, "The service is currently unavailable.")
+            else:
+                recent.append(now)
+                return None
+            self.errors[error[0]] = self.errors.get(error[0], 0) + 1
+            return error
+
+    def delay(self):
+        with self.lock:
+            seconds = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+_A1_RE = re.compile(r"^[A-Z]*(\d*)(?::[A-Z]*(\d*))?$")
+
+def _row_range(range_name):
+    """ "'Sheet1'!A10:H" 같은 범위의 (시작 행, 끝 행 또는 None). 시트 이름만 있으면 전체 """
+    a1 = range_name.split("!", 1)[1] if "!" in range_name else ""
+    match = _A1_RE.match(a1)
+    if not a1 or not match:
+        return 1, None
+    start = int(match.group(1) or 1)
+    end = int(match.group(2)) if match.group(2) else None
+    return start, end
+
+def _trim(row):
+    """ Sheets API처럼 뒤쪽 빈 칸은 보내지 않음 """
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+class FakeSheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        reason = {429: "RESOURCE_EXHAUSTED", 404: "NOT_FOUND", 400: "INVALID_ARGUMENT"}.get(status, "UNAVAILABLE")
+        self._send(status, {"error": {"code": status, "message": message, "status": reason}})
+
+    def _route(self):
+        """ (종류, 엔드포인트 이름, 범위) """
+        path = unquote(urlparse(self.path).path)
+        prefix = f"/v4/spreadsheets/{SPREADSHEET_ID}"
+        if not path.startswith(prefix):
+            return None, None, None
+        rest = path[len(prefix):]
+        if rest == "":
+            return "read", "metadata", None
+        if rest.startswith("/values/"):
+            range_name = rest[len("/values/"):]
+            if range_name.endswith(":append"):
+                return "write", "values.append", range_name[:-len(":append")]
+            return "read", "values.get", range_name
+        return None, None, None
+
+    def _handle(self, method):
+        state = self.state
+        kind, endpoint, range_name = self._route()
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = json.loads(self.rfile.read(length) or b"null")
+        if endpoint is None or (method == "POST") != (kind == "write"):
+            self._error(404, f"Requested entity was not found: {self.path}")
+            return
+        state.delay()
+        error = state.admit(kind, endpoint)
+        if error:
+            self._error(*error)
+            return
+        if endpoint == "metadata":
+            with state.lock:
+                row_count = max(1000, len(state.rows))
+            self._send(200, {
+                "spreadsheetId": SPREADSHEET_ID,
+                "properties": {"title": "출결 부하 테스트", "locale": "ko_KR", "timeZone": "Asia/Seoul"},
+                "sheets": [{"properties": {
+                    "sheetId": 0, "title": SHEET_TITLE, "index": 0, "sheetType": "GRID",
+                    "gridProperties": {"rowCount": row_count, "columnCount": WIDTH},
+                }}],
+            })
+        elif endpoint == "values.get":
+            start, end = _row_range(range_name)
+            with state.lock:
+                rows = state.rows[start - 1:end]
+            values = [_trim(r) for r in rows]
+            while values and not values[-1]:
+                values.pop()
+            result = {"range": range_name, "majorDimension": "ROWS"}
+            if values:
+                result["values"] = values
+            self._send(200, result)
+        else:
+            values = [["" if v is None else str(v) for v in r] for r in (body or {}).get("values", [])]
+            now = time.perf_counter()
+            with state.lock:
+                first = len(state.rows) + 1
+                state.rows.extend(values)
+                last = len(state.rows)
+                for r in values:
+                    state.appended_at.setdefault(tuple(r[:3]), now)
+            updated = f"{SHEET_TITLE}!A{first}:H{last}"
+            self._send(200, {
+                "spreadsheetId": SPREADSHEET_ID,
+                "tableRange": f"{SHEET_TITLE}!A1:H{first - 1}",
+                "updates": {
+                    "spreadsheetId": SPREADSHEET_ID, "updatedRange": updated,
+                    "updatedRows": len(values), "updatedColumns": WIDTH,
+                    "updatedCells": sum(len(r) for r in values),
+                },
+            })
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+def start_server(state):
+    """ 임의 포트에서 서버를 띄우고 (서버, 기본 URL) 반환 """
+    handler = type("Handler", (FakeSheetsHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-sheets").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class RedirectAdapter(HTTPAdapter):
+    """ sheets.googleapis.com 요청을 로컬 가짜 서버로 보내는 requests 어댑터 """
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        request.url = self.base_url + request.url[len(SHEETS_HOST):]
+        return super().send(request, **kwargs)
+
+def open_sheet(base_url, args):
+    """ 앱의 get_sheet()와 같은 구성(계측 + 할당량 래퍼)의 워크시트 """
+    client = gspread.Client(AnonymousCredentials())
+    adapter = RedirectAdapter(base_url, pool_connections=modules.HTTP_POOL_SIZE, pool_maxsize=modules.HTTP_POOL_SIZE)
+    client.http_client.session.mount(SHEETS_HOST, adapter)
+    limiter = QuotaLimiter(args.read_per_min, args.write_per_min, args.burst)
+    worksheet = limiter.call("read", lambda: client.open_by_key(SPREADSHEET_ID).sheet1)
+    return QuotaWorksheet(InstrumentedWorksheet(worksheet), limiter)
+
+# --- 사용자 세션 ---
+def run_session(sheet, name, start_at, rng, results):
+    """ 메인 화면 출근 흐름 한 번. 단계별 시간(ms)을 results에 추가 """
+    delay = start_at - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+    steps = {}
+    began = time.perf_counter()
+    try:
+        # 이름 선택 후 화면 표시: 결근/출근/퇴근 여부 확인
+        t = time.perf_counter()
+        absent = modules.check_is_absent_today(sheet, name)
+        clocked_in = modules.check_is_clocked_in(sheet, name)
+        modules.check_is_clocked_out(sheet, name)
+        steps["page"] = time.perf_counter() - t
+        # 위치 확인 (연구실 반경 안의 임의 위치)
+        t = time.perf_counter()
+        location = modules.locate_user(modules.LAB_LAT + rng.uniform(-2e-4, 2e-4),
+                                       modules.LAB_LON + rng.uniform(-2e-4, 2e-4))
+        steps["geolocate"] = time.perf_counter() - t
+        if absent or clocked_in or not location["site"]:
+            results.append({"name": name, "skipped": True})
+            return
+        # 출근하기
+        t = time.perf_counter()
+        now = datetime.now(modules.KST).strftime('%Y-%m-%d %H:%M:%S')
+        row = [now, name, "출근", modules.location_cell(location), f"{location['distance']:.1f}m", "", "", ""]
+        modules.record_event(sheet, row)
+        submitted = time.perf_counter()
+        steps["append"] = submitted - t
+        # 기록 후 다시 그리기: 출근 상태로 보여야 함
+        t = time.perf_counter()
+        visible = modules.check_is_clocked_in(sheet, name)
+        steps["rerun"] = time.perf_counter() - t
+        results.append({
+            "name": name, "key": tuple(row[:3]), "submitted": submitted, "visible": visible,
+            "total": time.perf_counter() - began, "steps": steps,
+        })
+    except Exception as e:
+        results.append({"name": name, "error": f"{type(e).__name__}: {e}"})
+
+def percentiles(samples_sec):
+    """ 초 단위 표본 -> ms 단위 p50/p95/p99/max """
+    samples = sorted(s * 1000 for s in samples_sec)
+    if not samples:
+        return {}
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, max(0, round(p / 100 * (len(samples) - 1))))], 1)
+    return {"count": len(samples), "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "max_ms": round(samples[-1], 1)}
+
+def run(args):
+    today = datetime.now(modules.KST).date()
+    rows, _ = generate_records(args.users, args.months, 2, today - timedelta(days=1), seed=args.seed)
+    names = [f"session{i:03d}" for i in range(args.sessions)]
+    state = FakeSheetsState(rows, args.latency_ms, args.jitter_ms, args.error_rate,
+                            args.server_read_quota, args.server_write_quota, seed=args.seed)
+    server, base_url = start_server(state)
+    try:
+        sheet = open_sheet(base_url, args)
+        if not args.cold:
+            # 이미 실행 중인 서버처럼 첫 동기화를 마친 상태에서 시작
+            modules.sync_records(sheet)
+        state.reset_stats()
+        METRICS.reset()
+        initial_rows = len(state.rows)
+
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        arrivals = sorted(rng.uniform(0, args.window) for _ in names)
+        results = []
+        threads = [
+            threading.Thread(target=run_session, args=(sheet, name, started + at, random.Random(i), results),
+                             daemon=True, name=f"session-{i}")
+            for i, (name, at) in enumerate(zip(names, arrivals))
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        finished = time.perf_counter()
+        # 저널에 남은 이벤트가 시트에 모두 반영될 때까지 대기
+        drain_deadline = time.monotonic() + args.drain_timeout
+        journal = modules.get_journal()
+        while journal.pending_count() and time.monotonic() < drain_deadline:
+            time.sleep(0.05)
+        drained = time.perf_counter()
+    finally:
+        server.shutdown()
+
+    done = [r for r in results if "total" in r]
+    errors = [r["error"] for r in results if "error" in r]
+    with state.lock:
+        appended = [tuple(r[:3]) for r in state.rows[initial_rows:]]
+        appended_at = dict(state.appended_at)
+        calls = dict(state.calls)
+        server_errors = dict(state.errors)
+    durable = [appended_at[r["key"]] - r["submitted"] for r in done if r["key"] in appended_at]
+    counts = {}
+    for key in appended:
+        counts[key] = counts.get(key, 0) + 1
+    api_calls = sum(calls.values())
+    snap = METRICS.snapshot()
+    return {
+        "meta": {
+            "sessions": args.sessions, "window_sec": args.window, "history_rows": initial_rows - 1,
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+            "server_quota_per_min": {"read": args.server_read_quota, "write": args.server_write_quota},
+            "client_quota_per_min": {"read": args.read_per_min, "write": args.write_per_min, "burst": args.burst},
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "clock_ins": len(done),
+        "skipped": sum(1 for r in results if r.get("skipped")),
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "not_visible_after_write": sum(1 for r in done if not r["visible"]),
+        "throughput_per_sec": round(len(done) / (finished - started), 2) if finished > started else None,
+        "latency": {
+            "total": percentiles([r["total"] for r in done]),
+            **{step: percentiles([r["steps"][step] for r in done])
+               for step in ("page", "geolocate", "append", "rerun")},
+            "durable": percentiles(durable),
+        },
+        "drain_sec": round(drained - finished, 2),
+        "rows": {
+            "appended": len(appended),
+            "duplicates": sum(c - 1 for c in counts.values() if c > 1),
+            "missing": sum(1 for r in done if r["key"] not in counts),
+        },
+        "api": {
+            "calls": calls,
+            "server_errors": server_errors,
+            "calls_per_clock_in": round(api_calls / len(done), 3) if done else None,
+            "reads_per_clock_in": round((api_calls - calls.get("values.append", 0)) / len(done), 3) if done else None,
+            "writes_per_clock_in": round(calls.get("values.append", 0) / len(done), 3) if done else None,
+        },
+        "client_metrics": {k: v for k, v in snap["counters"].items()
+                           if k.startswith(("sheets.", "records.", "journal."))},
+        "throttle": {k: v for k, v in snap["timings"].items() if k.startswith("sheets.throttle")},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="출결 앱 동시 접속 부하 테스트 (로컬 가짜 Sheets API, 결과는 JSON)")
+    parser.add_argument("--sessions", type=int, default=150, help="동시에 출근하는 사용자 수")
+    parser.add_argument("--window", type=float, default=300, help="출근 요청이 몰리는 구간 길이(초)")
+    parser.add_argument("--users", type=int, default=150, help="기존 기록을 만들 사용자 수")
+    parser.add_argument("--months", type=float, default=3, help="기존 기록 기간(개월)")
+    parser.add_argument("--latency-ms", type=float, default=150, help="가짜 API 응답 지연 평균")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="응답 지연의 ± 변동 폭")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="임의 503 오류 비율 (0~1)")
+    parser.add_argument("--server-read-quota", type=int, default=0, help="서버의 분당 읽기 한도 (0=무제한, 넘으면 429)")
+    parser.add_argument("--server-write-quota", type=int, default=0, help="서버의 분당 쓰기 한도 (0=무제한, 넘으면 429)")
+    parser.add_argument("--read-per-min", type=float, default=60, help="클라이언트 읽기 토큰 버킷 (앱 기본값과 같음)")
+    parser.add_argument("--write-per-min", type=float, default=60, help="클라이언트 쓰기 토큰 버킷")
+    parser.add_argument("--burst", type=float, default=10)
+    parser.add_argument("--cold", action="store_true", help="첫 동기화 없이 시작 (서버 재시작 직후)")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="남은 저널 반영을 기다리는 최대 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (기본: 표준 출력)")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    total = results["latency"]["total"]
+    print(f"출근 {results['clock_ins']}건, p95 {total.get('p95_ms')}ms / p99 {total.get('p99_ms')}ms, "
+          f"출근당 API 호출 {results['api']['calls_per_clock_in']}회", file=sys.stderr)
+    return 0 if not results["error_count"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
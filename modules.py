@@ -1,47 +1,814 @@
 import streamlit as st
-import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1
+from columnar import EventColumns
+from daily import DailyStatusStore, DailyTable
 from datetime import datetime
+from geofence import Geofence, Site, format_location
+from instrumentation import METRICS, InstrumentedWorksheet, lazy_import, mark_once, timed
+from journal import EventJournal
+from quota import (
+    PERMANENT, REJECTED, QuotaLimiter, QuotaWorksheet, classify_error, is_network_error, is_quota_error,
+)
+from reports import (
+    build_range_summary, columns_frame, daily_month_result, month_range, range_workbook_bytes, records_frame,
+)
+from storage import HEADER, AttendanceStore, MemoryStore, SQLiteStore
+import calendar
+import hmac
+import os
 import pytz
+import random
+import re
+import threading
+import time
+
+# pandas는 기록 표/리포트/NN 처리에서만 쓰므로 처음 사용할 때 불러옴 (출퇴근 화면 첫 표시를 빠르게)
+pd = lazy_import("pandas")
+
+KST = pytz.timezone('Asia/Seoul')
+
+# --- 연구실(테넌트) 설정 ---
+# 연구실마다 시트, 명단, 출결 가능 장소를 따로 둘 수 있음 (secrets.toml):
+#   [labs.scp]
+#   name = "SCP-LAB"
+#   private_gsheets_url = "https://docs.google.com/spreadsheets/d/..."
+#   user_names = ["홍길동", "김철수"]
+#   admin_password = "..."   (관리자 기능 로그인용. 없으면 관리자 기능을 쓰지 않음)
+#   [[labs.scp.sites]]
+#   name = "SCP-LAB"
+#   lat = 37.456461
+#   lon = 126.952096
+#   radius_m = 100
+# 연구실 설정에 없는 값(gcp_service_account 등)은 최상위 설정을 사용.
+# labs가 없으면 기존 최상위 설정을 'default' 연구실 하나로 사용.
+DEFAULT_LAB = "default"
+
+def _secret(key, default=None):
+    try:
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+def get_labs():
+    """ 연구실 ID -> 설정 dict (설정 순서 유지) """
+    labs = _secret("labs")
+    if labs:
+        return {str(lab): dict(cfg) for lab, cfg in labs.items()}
+    return {DEFAULT_LAB: {}}
+
+def lab_secret(lab, key, default=None):
+    """ 연구실 설정 값. 연구실 설정에 없으면 최상위 설정 """
+    cfg = get_labs().get(lab, {})
+    if key in cfg:
+        return cfg[key]
+    return _secret(key, default)
+
+def current_lab():
+    """ 현재 세션에서 선택한 연구실 (선택 전이면 첫 번째 연구실) """
+    labs = list(get_labs())
+    try:
+        lab = st.session_state.get("lab")
+    except Exception:
+        lab = None
+    return lab if lab in labs else labs[0]
+
+def lab_title(lab=None):
+    lab = lab or current_lab()
+    return lab_secret(lab, "name", "SCP-LAB" if lab == DEFAULT_LAB else lab)
+
+def get_user_names(lab=None):
+    return list(lab_secret(lab or current_lab(), "user_names", []))
+
+def admin_login_enabled(lab=None):
+    return bool(lab_secret(lab or current_lab(), "admin_password"))
+
+def check_admin_password(password, lab=None):
+    """ 연구실 관리자 비밀번호 확인 (secrets의 admin_password). 설정되지 않았으면 항상 False """
+    expected = lab_secret(lab or current_lab(), "admin_password")
+    if not expected or not password:
+        return False
+    return hmac.compare_digest(str(password).encode(), str(expected).encode())
 
 # --- 구글 시트 연결 함수 ---
+# 인증된 gspread 클라이언트는 서비스 계정별로 하나만 만들어 모든 세션/연구실이 같이 사용.
+# 클라이언트의 HTTP 세션에 연결 풀을 붙여 API 호출마다 TLS 연결을 새로 맺지 않도록 함 (keep-alive)
+SHEETS_SCOPE = ['https://www.googleapis.com/auth/spreadsheets']
+HTTP_POOL_SIZE = 16
+LAB_FETCH_WORKERS = 8
+
+@st.cache_resource
+def _get_client_pool():
+    return {}, threading.Lock()
+
+def get_client(account_info):
+    """ 서비스 계정 정보에 해당하는 (공유) gspread 클라이언트 """
+    account_info = dict(account_info)
+    key = account_info.get("client_email") or account_info.get("private_key_id")
+    clients, lock = _get_client_pool()
+    with lock:
+        client = clients.get(key)
+        if client is None:
+            from requests.adapters import HTTPAdapter
+            credentials = Credentials.from_service_account_info(account_info, scopes=SHEETS_SCOPE)
+            client = gspread.authorize(credentials)
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            client.http_client.session.mount("https://", adapter)
+            clients[key] = client
+            METRICS.incr("sheets.clients")
+        return client
+
+@st.cache_resource
+def _get_sheet_registry():
+    return {}, {}, threading.Lock()   # 연구실 -> 시트, 시트 키 -> 연구실, 잠금
+
+# 서비스 계정별 분당 요청 한도 (secrets의 sheets_read_per_min / sheets_write_per_min / sheets_burst)
+# 구글 기본 한도는 사용자(서비스 계정)당 분당 읽기 60회, 쓰기 60회
 @st.cache_resource
-def get_sheet():
-    scope = ['https://www.googleapis.com/auth/spreadsheets']
-    credentials = Credentials.from_service_account_info(
-        st.secrets["gcp_service_account"], scopes=scope
-    )
-    client = gspread.authorize(credentials)
-    sheet_url = st.secrets["private_gsheets_url"]
-    return client.open_by_url(sheet_url).sheet1
+def _get_limiters():
+    return {}, threading.Lock()
+
+def get_quota_limiter(account_info):
+    """ 서비스 계정의 읽기/쓰기 토큰 버킷 (모든 세션/연구실이 공유) """
+    account_info = dict(account_info or {})
+    key = account_info.get("client_email") or account_info.get("private_key_id")
+    limiters, lock = _get_limiters()
+    with lock:
+        if key not in limiters:
+            limiters[key] = QuotaLimiter(
+                read_per_min=float(_secret("sheets_read_per_min", 60)),
+                write_per_min=float(_secret("sheets_write_per_min", 60)),
+                burst=float(_secret("sheets_burst", 10)),
+            )
+        return limiters[key]
+
+def _open_sheet(lab):
+    account_info = lab_secret(lab, "gcp_service_account")
+    client = get_client(account_info)
+    limiter = get_quota_limiter(account_info)
+    sheet1 = limiter.call("read", lambda: client.open_by_url(lab_secret(lab, "private_gsheets_url")).sheet1)
+    # 모든 시트 API 호출의 지연 시간/데이터 크기를 기록하고, 한도/재시도/append 합치기를 거쳐 호출
+    return QuotaWorksheet(InstrumentedWorksheet(sheet1), limiter)
+
+def get_sheet(lab=None):
+    """ 연구실의 출결 시트 (프로세스당 한 번 열어서 공유). lab을 생략하면 현재 연구실 """
+    lab = lab or current_lab()
+    sheets, labs_by_key, lock = _get_sheet_registry()
+    sheet = sheets.get(lab)
+    if sheet is None:
+        with timed("sheets.open", lab=lab):
+            sheet = _open_sheet(lab)
+        with lock:
+            sheet = sheets.setdefault(lab, sheet)
+            labs_by_key[sheet_key(sheet)] = lab
+    return sheet
+
+def lab_of(sheet):
+    """ 시트가 속한 연구실 ID """
+    _, labs_by_key, _ = _get_sheet_registry()
+    try:
+        return labs_by_key.get(sheet_key(sheet), DEFAULT_LAB)
+    except Exception:
+        return DEFAULT_LAB
+
+def _map_labs(func, labs):
+    """ 연구실마다 func(lab)을 스레드 풀에서 동시에 실행. {lab: 결과}, 실패한 연구실은 예외 객체 """
+    from concurrent.futures import ThreadPoolExecutor
+    labs = list(labs)
+    results = {}
+    if not labs:
+        return results
+    with ThreadPoolExecutor(max_workers=min(LAB_FETCH_WORKERS, len(labs)), thread_name_prefix="lab-fetch") as pool:
+        futures = {lab: pool.submit(func, lab) for lab in labs}
+        for lab, future in futures.items():
+            try:
+                results[lab] = future.result()
+            except Exception as e:
+                print(f"Error loading lab {lab}: {e}")
+                results[lab] = e
+    return results
+
+def open_lab_sheets(labs=None):
+    """ 여러 연구실 시트를 동시에 열기. {lab: 시트}, 열지 못한 연구실은 빠짐 """
+    labs = list(labs if labs is not None else get_labs())
+    sheets, _, _ = _get_sheet_registry()
+    # 이미 열린 시트는 바로 사용하고 처음 여는 연구실만 스레드 풀에서 처리
+    opened = _map_labs(get_sheet, [lab for lab in labs if lab not in sheets])
+    result = {}
+    for lab in labs:
+        sheet = sheets.get(lab) or opened.get(lab)
+        if sheet is not None and not isinstance(sheet, Exception):
+            result[lab] = sheet
+    return result
 
 # TTL을 10초로 설정하여 API 호출 최소화
-# _sheet_obj: 인자 이름 앞에 언더바(_)를 붙이면 hash 계산에서 제외되어 캐싱 키 생성 시 무시됨
-@st.cache_data(ttl=10)
-def get_cached_records(_sheet_obj):
-    return _sheet_obj.get_all_values()
+RECORDS_TTL_SEC = 10
+# 중간 행이 수정된 경우는 증분 동기화로 감지할 수 없으므로 주기적으로 전체 동기화
+FULL_RESYNC_SEC = 300
+# TTL이 지나도 이 시간까지는 이전 사본을 바로 돌려주고 백그라운드에서 한 번만 갱신 (stale-while-revalidate)
+RECORDS_MAX_STALE_SEC = float(os.environ.get("ATTENDANCE_MAX_STALE_SEC", "60"))
+# (이름, 날짜)별 일별 상태 표를 저장하는 SQLite 파일
+DAILY_STATUS_PATH = os.environ.get("ATTENDANCE_DAILY_PATH", "attendance_daily.db")
 
-def clear_attendance_cache():
-    """출퇴근 기록이 갱신되었을 때 캐시를 강제로 비우는 함수"""
-    get_cached_records.clear()
+class RecordSync:
+    """ 워크시트 한 장의 로컬 사본과 증분 동기화 상태를 보관하는 객체 """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.columns = EventColumns()   # 헤더를 뺀 로컬 사본 (열 단위, 뒤에 추가만 함)
+        self.header = []
+        self.tail = []          # 마지막 행 원본 (증분 동기화 기준 행 비교용)
+        self.row_count = 0      # 시트 행 수 (헤더 포함, 0이면 아직 동기화 전)
+        self.fingerprint = None # 행 순서대로 이어 계산한 해시 (전체 동기화 결과가 바뀌었는지 비교)
+        self.width = 0
+        self.version = 0        # 로컬 사본이 바뀔 때마다 증가
+        self.synced_at = 0.0
+        self.full_synced_at = 0.0
+        self.stale = True
+        self.force_full = False
+        self.daily = None       # 일별 상태 표 (DailyTable). 로컬 사본과 함께 갱신
+        self.generation = 0     # 동기화를 마칠 때마다 증가 (대기 중이던 요청이 결과를 공유했는지 판단)
+        self.refreshing = False # 백그라운드 갱신 진행 여부
+        self.refresh_lock = threading.Lock()  # refreshing 플래그 전용 (동기화 중에도 바로 확인 가능)
 
-def check_is_clocked_in(sheet, name):
-    """ 특정 사용자가 오늘 날짜(KST 기준)에 '출근' 기록을 남겼는지 확인하는 함수 """
+@st.cache_resource
+def _get_sync_registry():
+    return {}
+
+@st.cache_resource
+def get_daily_store():
+    return DailyStatusStore(DAILY_STATUS_PATH)
+
+def _load_daily(source):
+    """ 저장해 둔 일별 상태 표. 읽지 못하면 빈 표 (다음 동기화 때 다시 계산) """
+    try:
+        return get_daily_store().load(source)
+    except Exception as e:
+        print(f"Error loading daily status: {e}")
+        return DailyTable()
+
+def _save_daily(source, table):
+    try:
+        get_daily_store().save(source, table)
+    except Exception as e:
+        print(f"Error saving daily status: {e}")
+
+def sheet_key(sheet):
+    """ 워크시트 식별 키 ('스프레드시트ID:시트ID') """
+    return f"{sheet.spreadsheet_id}:{sheet.id}"
+
+def _get_record_sync(sheet):
+    registry = _get_sync_registry()
+    key = sheet_key(sheet)
+    if key not in registry:
+        state = RecordSync()
+        state.daily = _load_daily(key)
+        registry.setdefault(key, state)
+    return registry[key]
+
+def _strip_row(row):
+    """ 비교용: 뒤쪽 빈 칸을 제거한 행 """
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+def _full_sync(state, sheet):
+    rows = sheet.get_all_values()
+    fingerprint = _chain_hash(None, rows)
+    if fingerprint != state.fingerprint:
+        state.daily.replace_from(rows[1:])
+        _save_daily(sheet_key(sheet), state.daily)
+        # 읽는 쪽이 들고 있는 뷰와 충돌하지 않도록 새 객체로 교체
+        state.columns = EventColumns.from_rows(rows[1:])
+        state.header = list(rows[0]) if rows else []
+        state.tail = _strip_row(rows[-1]) if rows else []
+        state.row_count = len(rows)
+        state.fingerprint = fingerprint
+        state.width = max((len(r) for r in rows), default=0)
+        state.version += 1
+    state.full_synced_at = time.monotonic()
+
+def _delta_sync(state, sheet):
+    """ 마지막으로 동기화한 행부터 끝까지만 받아와 로컬 사본 뒤에 붙이는 함수 """
+    n = state.row_count
+    last_col = re.sub(r"\d", "", rowcol_to_a1(1, state.width))
+    fetched = sheet.get_values(f"A{n}:{last_col}")
+    # 기준 행(마지막 동기화 행)이 달라졌다면 행이 삭제/수정/삽입된 것이므로 전체 동기화
+    if not fetched or _strip_row(fetched[0]) != state.tail:
+        METRICS.incr("records.resync_fallback")
+        _full_sync(state, sheet)
+        return
+    new_rows = fetched[1:]
+    if any(len(_strip_row(r)) > state.width for r in new_rows):
+        _full_sync(state, sheet)
+        return
+    if new_rows:
+        new_rows = [list(r) + [""] * (state.width - len(r)) for r in new_rows]
+        _append_synced(state, new_rows)
+        state.daily.add_rows(new_rows)
+        _save_daily(sheet_key(sheet), state.daily)
+        state.version += 1
+
+def _chain_hash(fingerprint, rows):
+    """ 이전 해시에 행들을 이어 붙여 계산 (뒤에 추가된 행만으로 전체 해시를 갱신할 수 있음) """
+    for row in rows:
+        fingerprint = hash((fingerprint, tuple(_strip_row(row))))
+    return fingerprint
+
+def _append_synced(state, new_rows):
+    """ 시트 끝에 추가된 행을 로컬 사본에 반영 """
+    state.columns.extend(new_rows)
+    state.tail = _strip_row(new_rows[-1])
+    state.row_count += len(new_rows)
+    state.fingerprint = _chain_hash(state.fingerprint, new_rows)
+
+def _refresh(state, sheet):
+    """ state.lock을 잡은 상태에서 호출. 전체 또는 증분 동기화 """
+    now = time.monotonic()
+    if (not state.row_count or state.width == 0 or state.force_full
+            or now - state.full_synced_at >= FULL_RESYNC_SEC):
+        METRICS.incr("records.miss")
+        _full_sync(state, sheet)
+    else:
+        METRICS.incr("records.refresh")
+        _delta_sync(state, sheet)
+    state.synced_at = now
+    state.stale = False
+    state.force_full = False
+    state.generation += 1
+
+def _background_refresh(state, sheet):
+    try:
+        with state.lock:
+            if time.monotonic() - state.synced_at >= RECORDS_TTL_SEC:
+                _refresh(state, sheet)
+    except Exception as e:
+        METRICS.incr("records.refresh_errors")
+        print(f"Error refreshing records: {e}")
+    finally:
+        state.refreshing = False
+
+def sync_records(sheet, force=False):
+    """ TTL이 지났거나 force인 경우 로컬 사본을 시트와 동기화하고 상태 객체를 돌려주는 함수
+    동시에 들어온 갱신 요청은 한 번의 조회로 합쳐지며(single-flight), TTL만 지난 경우에는
+    RECORDS_MAX_STALE_SEC 이내라면 이전 사본을 바로 돌려주고 백그라운드에서 갱신 """
+    state = _get_record_sync(sheet)
+    age = time.monotonic() - state.synced_at
+    if not force and not state.stale and age < RECORDS_TTL_SEC:
+        METRICS.incr("records.hit")
+        return state
+    # 쓰기 등으로 명시적으로 무효화된 경우(stale)는 최신 데이터가 필요하므로 기다려서 갱신
+    if not force and not state.stale and state.row_count and age < RECORDS_MAX_STALE_SEC:
+        with state.refresh_lock:
+            start = not state.refreshing
+            state.refreshing = True
+        if start:
+            threading.Thread(target=_background_refresh, args=(state, sheet), daemon=True,
+                             name="records-refresh").start()
+        else:
+            METRICS.incr("records.coalesced")
+        METRICS.incr("records.stale_served")
+        return state
+    generation = state.generation
+    with state.lock:
+        # 잠금을 기다리는 동안 다른 요청이 이미 갱신했다면 그 결과를 그대로 사용
+        if not force and state.generation != generation and not state.stale:
+            METRICS.incr("records.coalesced")
+            return state
+        _refresh(state, sheet)
+    return state
+
+def get_records_version(sheet):
+    """ 기본 저장소의 데이터 버전 (캐시 키로 사용) """
+    return get_store(sheet).version
+
+def _updated_first_row(response):
+    """ append_rows 응답의 updatedRange(예: "'시트1'!A101:H102")에서 첫 행 번호 """
+    try:
+        match = re.search(r"![A-Z]+(\d+)", response["updates"]["updatedRange"])
+        return int(match.group(1)) if match else None
+    except (KeyError, TypeError):
+        return None
+
+def apply_appended_rows(sheet, rows, response):
+    """ 시트에 추가된 행을 공유 사본과 인덱스에 바로 반영(write-through)하고 버전을 올리는 함수
+    추가된 위치가 로컬 사본 바로 다음이 아니면(다른 곳에서 추가한 행이 있으면) 다음 조회 때 증분 동기화 """
+    state = _get_record_sync(sheet)
+    first_row = _updated_first_row(response)
+    with state.lock:
+        if (state.row_count and state.width and first_row == state.row_count + 1
+                and all(len(_strip_row(r)) <= state.width for r in rows)):
+            new_rows = [[str(v) for v in r] + [""] * (state.width - len(r)) for r in rows]
+            _append_synced(state, new_rows)
+            state.daily.add_rows(new_rows)
+            _save_daily(sheet_key(sheet), state.daily)
+            state.version += 1
+            METRICS.incr("records.write_through")
+            return True
+        state.stale = True
+        return False
+
+def clear_attendance_cache(full=False):
+    """출퇴근 기록이 갱신되었을 때 캐시를 강제로 비우는 함수
+    기본은 다음 조회 때 증분 동기화, full=True면 전체 다시 받아오기"""
+    for state in list(_get_sync_registry().values()):
+        state.stale = True
+        if full:
+            state.force_full = True
+
+# --- 저장소 선택 ---
+# secrets의 storage_backend: "sheets"(기본, 구글 시트가 원본) / "sqlite" / "memory"
+# sqlite/memory를 쓰면 구글 시트는 sheets_mirror(기본 true) 설정에 따라 백그라운드로 복제만 됨
+class SheetStore(AttendanceStore):
+    """ 증분 동기화된 구글 시트 로컬 사본을 저장소 인터페이스로 감싼 객체 """
+    def __init__(self, sheet):
+        self.sheet = sheet
+
+    @property
+    def version(self):
+        return sync_records(self.sheet).version
+
+    def append_events(self, rows):
+        rows = [list(r) for r in rows]
+        apply_appended_rows(self.sheet, rows, self.sheet.append_rows(rows))
+
+    def refresh(self):
+        sync_records(self.sheet, force=True)
+
+@st.cache_resource
+def _get_local_store(backend, path):
+    if backend == "memory":
+        return MemoryStore()
+    return SQLiteStore(path)
+
+@st.cache_resource
+def _get_seed_registry():
+    return set(), threading.Lock()
+
+def _seed_from_sheet(store, sheet, path):
+    """ sqlite 저장소에 처음 한 번만 시트 기록을 가져옴 (NN 작업과 세션이 동시에 불러도 한 번) """
+    seeded, lock = _get_seed_registry()
+    if path in seeded:
+        return
+    with lock:
+        if path in seeded:
+            return
+        if not store.is_seeded():
+            data = sheet.get_all_values()
+            store.seed([r for r in data[1:] if len(r) >= 3])
+        seeded.add(path)
+
+def get_store(sheet):
+    """ 설정된 기본 저장소. sqlite 저장소는 처음 한 번 시트 기록을 가져옴 """
+    backend = _secret("storage_backend", "sheets")
+    if backend not in ("sqlite", "memory"):
+        return SheetStore(sheet)
+    lab = lab_of(sheet)
+    default_path = "attendance.db" if lab == DEFAULT_LAB else f"attendance_{lab}.db"
+    path = lab_secret(lab, "sqlite_path", default_path)
+    store = _get_local_store(backend, path)
+    if backend == "sqlite":
+        _seed_from_sheet(store, sheet, path)
+    return store
+
+def sheets_mirror_enabled():
+    return bool(_secret("sheets_mirror", True))
+
+@st.cache_resource
+def _get_local_daily_registry():
+    return {}
+
+def get_daily_table(sheet):
+    """ 기본 저장소의 일별 상태 표. 시트가 원본이면 동기화와 함께 갱신되고,
+    로컬 저장소가 원본이면 마지막으로 반영한 이후 추가된 기록만 읽어 갱신 """
+    store = get_store(sheet)
+    if isinstance(store, SheetStore):
+        return sync_records(sheet).daily
+    registry = _get_local_daily_registry()
+    source = f"local:{sheet_key(sheet)}"
+    if source not in registry:
+        registry.setdefault(source, (threading.Lock(), _load_daily(source)))
+    lock, table = registry[source]
+    with lock:
+        version = store.version
+        if version == table.source_version:
+            return table
+        changes = store.events_since(table.source_version) if table.source_version < version else None
+        if changes is None:
+            # 저장소가 초기화되었거나 증분 조회를 지원하지 않으면 처음부터 다시 계산
+            METRICS.incr("daily.rebuild")
+            table.clear()
+            changes = store.events_since(0) or (version, store.query())
+        table.add_rows(changes[1])
+        table.source_version = changes[0]
+        _save_daily(source, table)
+    return table
+
+@st.cache_resource
+def _get_frame_cache():
+    return {}
+
+def get_records_frame(sheet):
+    """ 전체 기록의 records_frame. 데이터 버전별로 한 번만 파싱해 모든 세션이 공유 (읽기 전용) """
+    store = get_store(sheet)
+    cache = _get_frame_cache()
+    key = sheet_key(sheet)
+    version = store.version
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        METRICS.incr("frame.hit")
+        return cached[1]
+    METRICS.incr("frame.build")
+    if isinstance(store, SheetStore):
+        # 공유 사본의 배열을 그대로 쓰는 뷰 (다시 파싱/복사하지 않음)
+        df = columns_frame(sync_records(sheet).columns)
+    else:
+        df = records_frame([HEADER] + store.query())
+    cache[key] = (version, df)
+    return df
+
+def load_records_frame(sheet, start=None, end=None):
+    """ 캐시된 records_frame에서 기간('YYYY-MM-DD', 양 끝 포함) 내 기록만 골라 반환 (읽기 전용)
+    보관된 달이 기간에 포함되면 해당 달의 보관 시트만 함께 읽음 """
+    df = get_records_frame(sheet)
+    archived = [get_archive_frame(sheet, y, m) for y, m in archived_months_in_range(sheet, start, end)]
+    if archived:
+        df = pd.concat(archived + [df], ignore_index=True)
+        df["name"] = df["name"].astype("category")
+        df["type"] = df["type"].astype("category")
+    mask = pd.Series(True, index=df.index)
+    if start:
+        mask &= df['date'] >= pd.Timestamp(start)
+    if end:
+        mask &= df['date'] <= pd.Timestamp(end)
+    return df[mask]
+
+# --- 출결 가능 장소 ---
+# labs 설정 없이 쓰는 기본 연구실은 sites가 없으면 기존 연구실 한 곳(반경 100m)만 사용.
+# 그 밖의 연구실은 sites가 없거나 잘못되었으면 다른 연구실 장소로 대신하지 않고 출결을 받지 않음
+LAB_NAME = "SCP-LAB"
+LAB_LAT = 37.456461
+LAB_LON = 126.952096
+ALLOWED_RADIUS_M = 100
+
+@st.cache_resource
+def _build_geofence(lab):
+    """ 설정 오류는 ValueError (캐시되지 않으므로 설정을 고치면 다음 실행에서 다시 읽음) """
+    sites = lab_secret(lab, "sites")
+    if not sites:
+        if lab == DEFAULT_LAB:
+            return Geofence([Site(LAB_NAME, LAB_LAT, LAB_LON, ALLOWED_RADIUS_M)])
+        raise ValueError(f"{lab_title(lab)}의 출결 가능 장소(sites) 설정이 없습니다.")
     try:
-        # 캐싱된 함수 사용
-        all_records = get_cached_records(sheet)
-        kst = pytz.timezone('Asia/Seoul')
-        today_date = datetime.now(kst).strftime('%Y-%m-%d')
-        for row in all_records:
-            # row 구조: [timestamp, name, type, lat,lon, distance]
-            if len(row) < 3: continue
-            timestamp_str = row[0]
-            record_name = row[1]
-            record_type = row[2]
-            if timestamp_str.startswith(today_date) and record_name == name and record_type in ["출근", "지각"]:
+        return Geofence.from_config(sites)
+    except Exception as e:
+        raise ValueError(f"{lab_title(lab)}의 출결 가능 장소(sites) 설정을 읽지 못했습니다: {e}") from e
+
+def get_geofence(lab=None):
+    """ 연구실의 출결 가능 장소 (연구실별로 한 번 만들어 공유). 설정이 없거나 잘못되었으면 ValueError """
+    return _build_geofence(lab or current_lab())
+
+def locate_user(lat, lon, lab=None):
+    """ 현재 위치 판정 결과: {'lat', 'lon', 'site'(속한 장소 이름 또는 None), 'nearest', 'distance'} """
+    with timed("geofence.locate"):
+        site, ref, distance = get_geofence(lab).locate(lat, lon)
+    return {'lat': lat, 'lon': lon, 'site': site.name if site else None, 'nearest': ref.name, 'distance': distance}
+
+def location_cell(location):
+    """ 기록 행의 위치 칸 값 (속한 장소 이름 포함) """
+    return format_location(location['lat'], location['lon'], location['site'])
+
+# --- 출결 이벤트 기록 (로컬 저널 + 백그라운드 시트 반영) ---
+JOURNAL_PATH = os.environ.get("ATTENDANCE_JOURNAL_PATH", "attendance_journal.db")
+FLUSH_BATCH_SIZE = 50
+FLUSH_LINGER_SEC = 0.5      # 같은 시각에 몰린 이벤트를 한 번에 보내기 위해 잠시 모으는 시간
+FLUSH_IDLE_SEC = 30         # 깨우는 신호가 없어도 남은 이벤트를 다시 시도하는 주기
+FLUSH_BACKOFF_MAX_SEC = 60
+RECONCILE_TAIL_ROWS = 10 * FLUSH_BATCH_SIZE  # 반영 여부를 확인할 때 대조하는 시트 끝 행 수
+
+@st.cache_resource
+def get_journal():
+    return EventJournal(JOURNAL_PATH)
+
+class JournalFlusher:
+    """ 저널에 쌓인 이벤트를 모아서 append_rows로 시트에 반영하는 백그라운드 작업
+    실패는 quota.classify_error의 분류(할당량 래퍼와 같은 재시도 정책)를 따른다.
+      REJECTED(429)        래퍼가 재시도하고도 실패한 경우. 반영되지 않은 것이 확실하므로 기다렸다가 다시 보냄
+      PERMANENT(4xx)       다시 보내도 실패하므로 보류(dead letter). 여러 건이면 한 건씩 보내 원인만 보류
+      TRANSIENT/UNKNOWN    시트에 추가되었을 수 있으므로 다시 보내기 전에 시트 끝을 읽어 이미 있는 행은 반영 완료 처리 """
+    def __init__(self, sheet, journal):
+        self.sheet = sheet
+        self.journal = journal
+        self.key = sheet_key(sheet)
+        self.wake = threading.Event()
+        self.backoff = 1
+        self.in_doubt = None    # 반영 여부를 모르는 배치 (ids, rows)
+        self.isolate = 0        # 한 건씩 보낼 남은 이벤트 수 (영구 오류가 난 배치에서 원인 이벤트를 찾는 중)
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"journal-flush-{self.key}")
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wake.wait(timeout=FLUSH_IDLE_SEC)
+            self.wake.clear()
+            time.sleep(FLUSH_LINGER_SEC)
+            try:
+                while self._flush_once():
+                    pass
+            except Exception as e:
+                # 저널/로컬 사본 오류(database is locked 등)로 스레드가 멈추지 않도록 기다렸다가 다시 시도
+                METRICS.incr("journal.flush_errors")
+                print(f"Error in journal flush: {e}")
+                self._sleep_backoff()
+                self.wake.set()
+
+    def _sleep_backoff(self):
+        time.sleep(self.backoff + random.uniform(0, self.backoff))
+        self.backoff = min(self.backoff * 2, FLUSH_BACKOFF_MAX_SEC)
+
+    def _flush_once(self):
+        """ 배치 하나를 반영. 더 처리할 이벤트가 남아 있으면 True """
+        if self.in_doubt is not None:
+            try:
+                self._reconcile()
+            except Exception as e:
+                print(f"Error reconciling journal: {e}")
+                self._sleep_backoff()
                 return True
+        batch = self.journal.pending(self.key, 1 if self.isolate else FLUSH_BATCH_SIZE)
+        if not batch:
+            return False
+        ids = [event_id for event_id, _ in batch]
+        rows = [row for _, row in batch]
+        try:
+            response = self.sheet.append_rows(rows)
+        except Exception as e:
+            print(f"Error flushing journal ({len(ids)} events): {e}")
+            self.journal.mark_failed(ids, str(e))
+            self._on_error(ids, rows, e)
+            return True
+        self.backoff = 1
+        self.isolate = max(0, self.isolate - 1)
+        try:
+            # 공유 사본에 먼저 반영한 뒤 대기 목록에서 제거해야 확인 함수에서 기록이 잠시 사라지지 않음
+            apply_appended_rows(self.sheet, rows, response)
+            self.journal.mark_flushed(self.key, ids)
+        except Exception:
+            # 시트에는 이미 추가되었으므로 다시 보내기 전에 시트와 대조
+            self.in_doubt = (ids, rows)
+            raise
+        return True
+
+    def _on_error(self, ids, rows, error):
+        failure = classify_error(error)
+        if failure == REJECTED:
+            self._sleep_backoff()
+        elif failure == PERMANENT:
+            if len(ids) > 1:
+                self.isolate = len(ids)
+                return
+            METRICS.incr("journal.dead_letters")
+            self.journal.mark_dead(self.key, ids, str(error))
+            self.isolate = max(0, self.isolate - 1)
+        else:
+            self.in_doubt = (ids, rows)
+            self._sleep_backoff()
+
+    def _reconcile(self):
+        """ 반영 여부를 모르는 배치 중 이미 시트에 있는 이벤트는 반영 완료로 표시 (나머지는 다시 보냄)
+        보낸 뒤 시트 행 수가 바뀌었을 수 있으므로(보관, 직접 수정) 보내기 전의 행 번호를 쓰지 않고
+        새로 동기화한 로컬 사본의 마지막 행들과 (시각, 이름, 상태)로 대조 """
+        ids, rows = self.in_doubt
+        state = sync_records(self.sheet, force=True)
+        with state.lock:
+            columns = state.columns
+            n = len(columns)
+            tail = columns.rows(range(max(0, n - max(RECONCILE_TAIL_ROWS, 2 * len(rows))), n))
+        remaining = {}
+        for r in tail:
+            key = _event_identity(r)
+            remaining[key] = remaining.get(key, 0) + 1
+        found = []
+        for event_id, row in zip(ids, rows):
+            key = _event_identity(row)
+            if remaining.get(key):
+                remaining[key] -= 1
+                found.append(event_id)
+        if found:
+            METRICS.incr("journal.reconciled", len(found))
+            self.journal.mark_flushed(self.key, found)
+        self.in_doubt = None
+
+def _event_identity(row):
+    """ 반영 여부 대조용 (시각, 이름, 상태) """
+    return tuple(str(v).strip() for v in row[:3])
+
+@st.cache_resource
+def _get_flusher_registry():
+    return {}, threading.Lock()
+
+def _get_flusher(sheet):
+    registry, lock = _get_flusher_registry()
+    key = sheet_key(sheet)
+    with lock:
+        flusher = registry.get(key)
+        if flusher is None or not flusher.thread.is_alive():
+            flusher = registry[key] = JournalFlusher(sheet, get_journal())
+        return flusher
+
+def _queue_for_sheet(sheet, rows, event_key=None):
+    """ 저널에 이벤트를 추가하고 반영 작업을 깨움. event_key가 이미 기록된 키면 False """
+    journal = get_journal()
+    added = True
+    for row in rows:
+        added = journal.append(sheet_key(sheet), row, event_key) is not None and added
+    _get_flusher(sheet).wake.set()
+    return added
+
+def resume_journal_flush(sheet):
+    """ 반영 대기 중인 이벤트가 남아 있으면 반영 작업을 시작 (재시작 전에 반영하지 못한 이벤트) """
+    if get_journal().pending_count(sheet_key(sheet)):
+        _get_flusher(sheet).wake.set()
+
+# --- 출결 이벤트 중복 방지 ---
+# 두 번 누르기, 기록 직후 화면이 바뀌기 전의 재클릭, 같은 사용자의 두 세션이 동시에 누른 경우가
+# 모두 한 번의 기록이 되도록 (사용자, 날짜, 이벤트 종류)별 멱등성 키로 직렬화한다.
+# 키 잠금 안에서 일별 상태 표(시트 기록)와 반영 대기 중인 저널 이벤트를 확인하고, 저널의 키 제약은
+# 시트에 반영되기 전인 이벤트만 지킨다 (지운 기록은 다시 남길 수 있음).
+# 잠금은 키 해시로 나눈 여러 개를 써서 다른 사용자의 기록은 서로 기다리지 않는다.
+EVENT_SLOTS = {"출근": "in", "지각": "in", "퇴근": "out", "조퇴": "out", "결근": "absent"}
+EVENT_LOCK_STRIPES = 64
+
+def event_key(row):
+    """ 기록 행의 멱등성 키 'YYYY-MM-DD|이름|종류' (출근/지각, 퇴근/조퇴는 같은 종류) """
+    return f"{str(row[0])[:10]}|{row[1]}|{EVENT_SLOTS.get(row[2], row[2])}"
+
+@st.cache_resource
+def _get_event_locks():
+    return [threading.Lock() for _ in range(EVENT_LOCK_STRIPES)]
+
+def _event_lock(sheet, key):
+    return _get_event_locks()[hash((sheet_key(sheet), key)) % EVENT_LOCK_STRIPES]
+
+def _already_recorded(sheet, row):
+    """ 같은 날 같은 종류의 기록(반영 대기 중인 것 포함)이 이미 있는지 """
+    slot = EVENT_SLOTS.get(row[2], row[2])
+    try:
+        types = get_day_types(sheet, row[1], str(row[0])[:10])
+    except Exception as e:
+        # 기록을 읽지 못해도 출결은 남길 수 있도록 저널의 키 제약에만 맡김
+        print(f"Error checking duplicate event: {e}")
         return False
+    return any(EVENT_SLOTS.get(t, t) == slot for t in types)
+
+def record_event(sheet, row):
+    """ 출결 이벤트를 기록하고 바로 반환. 같은 날 같은 종류의 기록이 이미 있으면 기록하지 않고 False
+    시트가 원본이면 로컬 저널에 커밋 후 백그라운드에서 모아서 반영,
+    로컬 저장소가 원본이면 저장소에 바로 기록하고 시트에는 저널을 통해 복제 """
+    key = event_key(row)
+    with timed("record_event"), _event_lock(sheet, key):
+        if _already_recorded(sheet, row):
+            METRICS.incr("records.duplicate_suppressed")
+            return False
+        store = get_store(sheet)
+        if isinstance(store, SheetStore):
+            # 저널의 키 제약이 다른 프로세스에서 동시에 들어온 (아직 반영 전인) 기록까지 막음
+            if not _queue_for_sheet(sheet, [row], key):
+                METRICS.incr("records.duplicate_suppressed")
+                return False
+        else:
+            store.append_events([row])
+            if sheets_mirror_enabled():
+                _queue_for_sheet(sheet, [row], key)
+    mark_once("first_record_event")
+    return True
+
+def error_message(error):
+    """ 사용자에게 보여줄 오류 안내 (자세한 내용은 서버 로그에 남김) """
+    if is_quota_error(error):
+        return "지금 요청이 많아 구글 시트 처리가 늦어지고 있습니다. 잠시 후 다시 시도해주세요."
+    if is_network_error(error):
+        return "구글 시트에 연결하지 못했습니다. 네트워크 상태를 확인한 뒤 다시 시도해주세요."
+    return "처리 중 문제가 발생했습니다. 잠시 후 다시 시도하고, 계속되면 관리자에게 문의해주세요."
+
+def today_str():
+    """ 오늘 날짜(KST 기준) 'YYYY-MM-DD' 문자열 """
+    return datetime.now(KST).strftime('%Y-%m-%d')
+
+def get_day_types(sheet, name, date_str=None):
+    """ 특정 사용자가 해당 날짜(기본: 오늘)에 남긴 상태(type) 집합. 일별 상태 표에서 O(1) 조회
+    아직 시트에 반영되지 않은 저널 이벤트도 포함 """
+    date_str = date_str or today_str()
+    # 저널을 먼저 읽어야 반영 직후(일별 상태 표 갱신 전) 이벤트가 빠지지 않음
+    pending = get_journal().pending_types(sheet_key(sheet), date_str, name)
+    return set(get_daily_table(sheet).types(name, date_str)) | pending
+
+def check_is_clocked_in(sheet, name):
+    """ 특정 사용자가 오늘 날짜(KST 기준)에 '출근' 기록을 남겼는지 확인하는 함수 """
+    try:
+        types = get_day_types(sheet, name)
+        return "출근" in types or "지각" in types
     except Exception as e:
         print(f"Error checking attendance: {e}")
         return False
@@ -50,18 +817,8 @@ def check_is_clocked_in(sheet, name):
 def check_is_clocked_out(sheet, name):
     """ 특정 사용자가 오늘 날짜(KST 기준)에 '퇴근' 또는 '조퇴' 기록을 남겼는지 확인하는 함수 """
     try:
-        all_records = get_cached_records(sheet)
-        kst = pytz.timezone('Asia/Seoul')
-        today_date = datetime.now(kst).strftime('%Y-%m-%d')
-        for row in all_records:
-            if len(row) < 3:
-                continue
-            timestamp_str = row[0]
-            record_name = row[1]
-            record_type = row[2]
-            if timestamp_str.startswith(today_date) and record_name == name and record_type in ["퇴근", "조퇴"]:
-                return True
-        return False
+        types = get_day_types(sheet, name)
+        return "퇴근" in types or "조퇴" in types
     except Exception as e:
         print(f"Error checking clocked out: {e}")
         return False
@@ -69,18 +826,321 @@ def check_is_clocked_out(sheet, name):
 def check_is_absent_today(sheet, name):
     """ 특정 사용자가 오늘 날짜(KST 기준)에 '결근' 기록을 남겼는지 확인하는 함수 """
     try:
-        all_records = get_cached_records(sheet)
-        kst = pytz.timezone('Asia/Seoul')
-        today_date = datetime.now(kst).strftime('%Y-%m-%d')
-        for row in all_records:
-            if len(row) < 3:
-                continue
-            timestamp_str = row[0]
-            record_name = row[1]
-            record_type = row[2]
-            if timestamp_str.startswith(today_date) and record_name == name and record_type == "결근":
-                return True
-        return False
+        return "결근" in get_day_types(sheet, name)
     except Exception as e:
         print(f"Error checking absent: {e}")
         return False
+
+NN_WINDOW_DAYS = 30
+
+def _nn_row(date_str, user, record_type):
+    """ 출근NN은 18:00 / 지각사유, 퇴근NN은 23:59 / 조퇴사유 칸에 '사유없음' 기록 """
+    if record_type == "출근NN":
+        return [f"{date_str} 18:00:00", user, "출근NN", "", "", "", "사유없음", ""]
+    return [f"{date_str} 23:59:00", user, "퇴근NN", "", "", "사유없음", "", ""]
+
+def process_nn_records(sheet, all_users):
+    """ 최근 30일(평일) 중 출근/퇴근 기록이 빠진 날에 출근NN/퇴근NN 기록을 만들어 한 번에 추가하는 함수
+    추가한 기록 수를 반환 """
+    now_kst = datetime.now(KST)
+    # 아직 시트에 반영되지 않은 저널 이벤트도 기록된 것으로 봄 (빠진 날로 판단해 NN을 잘못 추가하지 않도록)
+    pending = [row for _, row in get_journal().pending(sheet_key(sheet))]
+    gaps = get_daily_table(sheet).nn_gaps(all_users, now_kst, NN_WINDOW_DAYS, pending)
+    nn_records = [_nn_row(d, u, t) for d, u, t in gaps]
+    if nn_records:
+        # 기록 하나당 API 호출 1회가 되지 않도록 한 번에 추가
+        store = get_store(sheet)
+        store.append_events(nn_records)
+        if not isinstance(store, SheetStore) and sheets_mirror_enabled():
+            _queue_for_sheet(sheet, nn_records)
+    return len(nn_records)
+
+# --- NN 기록 보충 작업 ---
+# 하루 1회(18시 이후 당일 기록 확인을 위해 한 번 더) 백그라운드에서 실행
+NN_CHECK_INTERVAL_SEC = 600
+
+class NNBackfillJob:
+    """ 프로세스 전체에서 공유하는 시트별 NN 보충 작업 상태 """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.thread = None
+        self.last_slot = None   # 마지막으로 실행한 (날짜, 18시 이후 여부)
+        self.last_count = 0
+
+@st.cache_resource
+def _get_nn_jobs():
+    return {}, threading.Lock()
+
+def _get_nn_job(sheet):
+    """ 시트(연구실)별 NN 보충 작업 상태 """
+    jobs, lock = _get_nn_jobs()
+    with lock:
+        return jobs.setdefault(sheet_key(sheet), NNBackfillJob())
+
+def _nn_slot(now_kst):
+    return (now_kst.date(), now_kst.hour >= 18)
+
+def run_nn_backfill(sheet, all_users, force=False):
+    """ 잠금을 잡고 NN 기록을 보충하는 함수. 이번 구간에 이미 실행했거나 다른 곳에서 실행 중이면 None 반환 """
+    job = _get_nn_job(sheet)
+    slot = _nn_slot(datetime.now(KST))
+    if not force and job.last_slot == slot:
+        return None
+    if not job.lock.acquire(blocking=False):
+        return None
+    try:
+        if not force and job.last_slot == slot:
+            return None
+        # 직전 실행에서 추가한 기록까지 반영된 최신 데이터로 판단해야 중복 기록이 생기지 않음
+        get_store(sheet).refresh()
+        job.last_count = process_nn_records(sheet, all_users)
+        job.last_slot = slot
+        return job.last_count
+    finally:
+        job.lock.release()
+
+def _nn_backfill_loop(sheet, all_users):
+    while True:
+        try:
+            ran = run_nn_backfill(sheet, all_users) is not None
+            # 하루 작업이 실행된 뒤 닫힌 달 보관 (secrets의 auto_archive = true 인 경우)
+            if ran and lab_secret(lab_of(sheet), "auto_archive", False):
+                archive_closed_months(sheet)
+        except Exception as e:
+            print(f"Error in NN backfill: {e}")
+        time.sleep(NN_CHECK_INTERVAL_SEC)
+
+def start_nn_scheduler(sheet, all_users):
+    """ NN 보충 작업 스레드를 (시트마다 프로세스당 한 번) 시작하는 함수 """
+    job = _get_nn_job(sheet)
+    with job.start_lock:
+        if job.thread is not None and job.thread.is_alive():
+            return
+        job.thread = threading.Thread(
+            target=_nn_backfill_loop, args=(sheet, list(all_users)), daemon=True,
+            name=f"nn-backfill-{lab_of(sheet)}"
+        )
+        job.thread.start()
+
+# --- 지난 달 보관 (월별 워크시트) ---
+# NN 보충 범위(30일)보다 이전에 끝난 달은 더 이상 바뀌지 않으므로 'archive_YYYY-MM' 시트로 옮기고
+# 원본 시트에는 최근 기간만 남긴다. 보관 시트는 바뀌지 않으므로 한 번 읽으면 계속 캐시.
+ARCHIVE_PREFIX = "archive_"
+ARCHIVE_LIST_TTL_SEC = 600
+
+def archive_title(year, month):
+    return f"{ARCHIVE_PREFIX}{year:04d}-{month:02d}"
+
+def is_month_closed(year, month, today):
+    """ 해당 월의 마지막 날이 NN 보충 범위보다 이전이면 닫힌 달 """
+    _, last_day = calendar.monthrange(year, month)
+    return (today - datetime(year, month, last_day).date()).days > NN_WINDOW_DAYS
+
+class ArchiveCache:
+    """ 보관 시트 목록(주기적으로 갱신)과 보관 월별 기록(영구 캐시) """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.months = {}        # spreadsheet_id -> (조회 시각, {(년, 월): 제목})
+        self.rows = {}          # (spreadsheet_id, 년, 월) -> 헤더를 뺀 행 목록
+        self.frames = {}        # (spreadsheet_id, 년, 월) -> records_frame
+
+@st.cache_resource
+def _get_archive_cache():
+    return ArchiveCache()
+
+def list_archived_months(sheet, refresh=False):
+    """ 보관된 (년, 월) -> 워크시트 제목 """
+    cache = _get_archive_cache()
+    cached = cache.months.get(sheet.spreadsheet_id)
+    if not refresh and cached and time.monotonic() - cached[0] < ARCHIVE_LIST_TTL_SEC:
+        return cached[1]
+    months = {}
+    for ws in sheet.spreadsheet.worksheets():
+        match = re.fullmatch(rf"{ARCHIVE_PREFIX}(\d{{4}})-(\d{{2}})", ws.title)
+        if match:
+            months[(int(match.group(1)), int(match.group(2)))] = ws.title
+    cache.months[sheet.spreadsheet_id] = (time.monotonic(), months)
+    return months
+
+def archived_months_in_range(sheet, start=None, end=None):
+    """ 기간('YYYY-MM-DD')에 걸치는 보관 월 목록. 시작일이 없으면 전체 """
+    start_key = tuple(int(x) for x in start[:7].split("-")) if start else (0, 0)
+    end_key = tuple(int(x) for x in end[:7].split("-")) if end else (9999, 12)
+    return sorted(ym for ym in list_archived_months(sheet) if start_key <= ym <= end_key)
+
+def _archive_rows(sheet, year, month):
+    cache = _get_archive_cache()
+    key = (sheet.spreadsheet_id, year, month)
+    if key not in cache.rows:
+        ws = sheet.spreadsheet.worksheet(archive_title(year, month))
+        cache.rows[key] = ws.get_all_values()[1:]
+    return cache.rows[key]
+
+def get_archive_frame(sheet, year, month):
+    """ 보관 월의 records_frame (바뀌지 않으므로 영구 캐시) """
+    cache = _get_archive_cache()
+    key = (sheet.spreadsheet_id, year, month)
+    if key not in cache.frames:
+        cache.frames[key] = records_frame([HEADER] + _archive_rows(sheet, year, month))
+    return cache.frames[key]
+
+def archive_closed_months(sheet, today=None):
+    """ 원본 시트에서 닫힌 달의 기록을 월별 보관 시트로 옮기는 함수. 옮긴 (년-월: 행 수)를 반환
+    보관 시트에 먼저 기록한 뒤 원본에서 지우므로, 중간에 실패해도 다시 실행하면 이어서 처리됨 """
+    cache = _get_archive_cache()
+    today = today or datetime.now(KST).date()
+    with cache.lock:
+        # 행 번호로 지우고 원본 문자열 그대로 옮겨야 하므로 시트에서 바로 읽은 최신 값 기준
+        data = sheet.get_all_values()
+        if len(data) < 2:
+            return {}
+        header = data[0]
+        by_month = {}   # (년, 월) -> [(시트 행 번호, 행)]
+        for row_no, row in enumerate(data[1:], start=2):
+            match = re.match(r"(\d{4})-(\d{2})-\d{2}", row[0])
+            if not match:
+                continue
+            ym = (int(match.group(1)), int(match.group(2)))
+            if is_month_closed(*ym, today):
+                by_month.setdefault(ym, []).append((row_no, row))
+        if not by_month:
+            return {}
+
+        existing = list_archived_months(sheet, refresh=True)
+        for (year, month), items in sorted(by_month.items()):
+            rows = [row for _, row in items]
+            if (year, month) in existing:
+                # 이전 실행에서 보관까지만 되고 삭제가 안 된 행은 다시 추가하지 않음
+                ws = sheet.spreadsheet.worksheet(existing[(year, month)])
+                already = {}
+                for r in ws.get_all_values()[1:]:
+                    already[tuple(_strip_row(r))] = already.get(tuple(_strip_row(r)), 0) + 1
+                missing = []
+                for r in rows:
+                    k = tuple(_strip_row(r))
+                    if already.get(k):
+                        already[k] -= 1
+                    else:
+                        missing.append(r)
+                if missing:
+                    ws.append_rows(missing)
+            else:
+                ws = sheet.spreadsheet.add_worksheet(
+                    title=archive_title(year, month), rows=len(rows) + 1, cols=len(header))
+                ws.update([header] + rows, "A1")
+            cache.rows.pop((sheet.spreadsheet_id, year, month), None)
+            cache.frames.pop((sheet.spreadsheet_id, year, month), None)
+
+        # 원본에서 옮긴 행 삭제: 아래쪽 구간부터 한 번의 batch_update로 (새로 추가되는 행 위치와 무관)
+        row_nos = sorted(row_no for items in by_month.values() for row_no, _ in items)
+        ranges = []
+        for row_no in row_nos:
+            if ranges and ranges[-1][1] == row_no - 1:
+                ranges[-1][1] = row_no
+            else:
+                ranges.append([row_no, row_no])
+        sheet.spreadsheet.batch_update({"requests": [
+            {"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS",
+                                           "startIndex": lo - 1, "endIndex": hi}}}
+            for lo, hi in reversed(ranges)
+        ]})
+        clear_attendance_cache(full=True)
+        list_archived_months(sheet, refresh=True)
+        METRICS.incr("archive.rows", len(row_nos))
+        return {f"{y:04d}-{m:02d}": len(items) for (y, m), items in sorted(by_month.items())}
+
+# --- 기간 리포트 (월별 결과 메모이즈) ---
+class ReportCache:
+    """ 월별 리포트 결과. 닫힌 달은 영구 보관, 진행 중인 달은 데이터 버전이 같을 때만 재사용 """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.closed = {}    # (sheet_key, 년, 월) -> 결과
+        self.open = {}      # (sheet_key, 년, 월) -> (버전, 결과)
+
+@st.cache_resource
+def _get_report_cache():
+    return ReportCache()
+
+def get_month_result(sheet, year, month, today=None):
+    """ 월별 (현황 표, 건수). 닫힌 달은 한 번 계산하면 다시 계산하지 않음 """
+    cache = _get_report_cache()
+    today = today or datetime.now(KST).date()
+    key = (sheet_key(sheet), year, month)
+    closed = is_month_closed(year, month, today)
+    if closed and key in cache.closed:
+        METRICS.incr("report.closed_hit")
+        return cache.closed[key]
+    version = get_records_version(sheet)
+    if not closed and key in cache.open and cache.open[key][0] == version:
+        METRICS.incr("report.open_hit")
+        return cache.open[key][1]
+    METRICS.incr("report.build")
+    table = get_daily_table(sheet)
+    if (isinstance(get_store(sheet), SheetStore) and (year, month) not in table.archived
+            and (year, month) in list_archived_months(sheet)):
+        # 보관된 달은 처음 한 번만 보관 시트를 읽어 일별 상태 표에 넣어 둠
+        table.replace_month(year, month, _archive_rows(sheet, year, month), archived=True)
+        _save_daily(sheet_key(sheet), table)
+    result = daily_month_result(table, year, month)
+    with cache.lock:
+        if closed:
+            cache.closed[key] = result
+        else:
+            cache.open[key] = (version, result)
+    return result
+
+def available_months(sheet, today=None):
+    """ 조회 가능한 (년, 월) 목록: 가장 오래된 보관 월 또는 기록부터 이번 달까지 """
+    today = today or datetime.now(KST).date()
+    candidates = list(list_archived_months(sheet))
+    candidates += get_daily_table(sheet).months()
+    current = (today.year, today.month)
+    start = min(candidates + [current])
+    return month_range(start, current)
+
+def get_range_report(sheet, start, end):
+    """ (년, 월) start~end 기간의 (사용자별 요약, [(월 이름, 현황 표)]) """
+    results = [(ym, get_month_result(sheet, *ym)) for ym in month_range(start, end)]
+    monthly = [(f"{y:04d}-{m:02d}", rep_df) for (y, m), (rep_df, _) in results if not rep_df.empty]
+    return build_range_summary(results), monthly
+
+@st.cache_data(max_entries=24, show_spinner=False)
+def export_report(_sheet, source, start, end, version):
+    """ (시트, 기간, 데이터 버전)별로 엑셀 파일을 메모이즈. 한 달이면 기존 형식, 여러 달이면 요약 + 월별 시트
+    _sheet는 캐시 키에 들어가지 않으므로 source(sheet_key)로 연구실을 구분 """
+    summary, monthly = get_range_report(_sheet, start, end)
+    return range_workbook_bytes(summary, monthly, tuple(start) == tuple(end))
+
+# --- 연구실별 오늘 현황 (관리자) ---
+def _lab_today(lab):
+    sheet = get_sheet(lab)
+    store = get_store(sheet)
+    if isinstance(store, SheetStore):
+        sync_records(sheet)
+    users = get_user_names(lab)
+    date_str = today_str()
+    types = [get_day_types(sheet, name, date_str) for name in users]
+    return {
+        "연구실": lab_title(lab),
+        "인원": len(users),
+        "출근": sum(1 for t in types if "출근" in t or "지각" in t),
+        "지각": sum(1 for t in types if "지각" in t),
+        "퇴근": sum(1 for t in types if "퇴근" in t or "조퇴" in t),
+        "결근": sum(1 for t in types if "결근" in t),
+        "반영 대기": get_journal().pending_count(sheet_key(sheet)),
+    }
+
+def lab_overview(labs=None):
+    """ 모든 연구실의 오늘 출결 현황 행 목록. 연구실 시트는 스레드 풀에서 동시에 읽음 """
+    labs = list(labs if labs is not None else get_labs())
+    with timed("labs.overview", labs=len(labs)):
+        results = _map_labs(_lab_today, labs)
+    rows = []
+    for lab in labs:
+        result = results.get(lab)
+        if isinstance(result, Exception) or result is None:
+            rows.append({"연구실": lab_title(lab), "오류": str(result)})
+        else:
+            rows.append(result)
+    return rows
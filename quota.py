@@ -0,0 +1,264 @@
+import random
+import re
+import threading
+import time
+
+from instrumentation import METRICS, InstrumentedWorksheet, log_event
+
+# --- 구글 시트 API 할당량 관리 ---
+# Sheets API는 (서비스 계정별) 분당 읽기/쓰기 요청 수 제한이 있고, 넘으면 429를 돌려준다.
+# 읽기/쓰기 토큰 버킷을 프로세스 전체(모든 세션)가 함께 쓰고, 동시에 들어온 append_rows는 한 번의 호출로 합친다.
+#
+# 재시도 정책 (QuotaLimiter와 저널 반영 작업(modules.JournalFlusher)이 classify_error 하나로 함께 따름)
+#   REJECTED   429             처리되지 않은 것이 확실. 읽기/쓰기 모두 지터를 넣은 지수 백오프로 다시 시도
+#   TRANSIENT  5xx/408/네트워크 읽기는 다시 시도. 쓰기는 실제로 반영되었을 수 있으므로 여기서 다시 보내지 않고
+#                               호출한 쪽이 시트를 확인한 뒤에만 다시 보냄 (저널은 시트 끝과 대조)
+#   PERMANENT  그 밖의 4xx      다시 보내도 실패. 재시도하지 않음 (저널은 해당 이벤트를 보류)
+#   UNKNOWN    그 밖의 예외     재시도하지 않음. 쓰기는 TRANSIENT처럼 반영 여부를 확인
+
+REJECTED = "rejected"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+UNKNOWN = "unknown"
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SEC = 1.0
+BACKOFF_MAX_SEC = 32.0
+
+READ_METHODS = {"get_all_values", "get_values", "get", "batch_get", "worksheets", "worksheet"}
+WRITE_METHODS = {"append_row", "append_rows", "update", "delete_rows", "batch_update", "add_worksheet"}
+
+class TokenBucket:
+    """ 분당 rate개, 최대 burst개까지 모아 둘 수 있는 토큰 버킷 (스레드 안전) """
+    def __init__(self, rate_per_min, burst):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """ 토큰을 얻을 때까지 기다림. 기다린 시간(초)을 반환 """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self):
+        """ 429를 받으면 남은 토큰을 비움 (다른 세션도 잠시 쉬도록) """
+        with self.lock:
+            self.tokens = min(self.tokens, 0.0)
+
+class QuotaLimiter:
+    """ 서비스 계정 하나의 읽기/쓰기 토큰 버킷 """
+    def __init__(self, read_per_min=60, write_per_min=60, burst=10):
+        self.buckets = {
+            "read": TokenBucket(read_per_min, burst),
+            "write": TokenBucket(write_per_min, burst),
+        }
+
+    def call(self, kind, func, *args, **kwargs):
+        """ 토큰을 얻은 뒤 func 호출. 재시도 가능한 오류는 지수 백오프(full jitter)로 다시 시도 """
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            if waited:
+                METRICS.incr(f"sheets.throttled.{kind}")
+                METRICS.observe(f"sheets.throttle.{kind}", waited * 1000)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                failure = classify_error(e)
+                attempt += 1
+                retry = failure == REJECTED or (kind == "read" and failure == TRANSIENT)
+                if not retry or attempt >= MAX_ATTEMPTS:
+                    raise
+                if failure == REJECTED:
+                    bucket.penalize()
+                delay = retry_after(e) or random.uniform(0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** attempt))
+                METRICS.incr(f"sheets.retries.{status or 'network'}")
+                log_event("sheets_retry", quota=kind, status=status, attempt=attempt, delay=round(delay, 2))
+                time.sleep(delay)
+
+def error_status(error):
+    """ gspread APIError 등의 HTTP 상태 코드 (없으면 None) """
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def classify_error(error):
+    """ 실패 종류: REJECTED / TRANSIENT / PERMANENT / UNKNOWN (위 재시도 정책 참고) """
+    status = error_status(error)
+    if status == 429:
+        return REJECTED
+    if status is not None and (status >= 500 or status == 408):
+        return TRANSIENT
+    if status is not None and 400 <= status < 500:
+        return PERMANENT
+    if is_network_error(error):
+        return TRANSIENT
+    return UNKNOWN
+
+def retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return min(BACKOFF_MAX_SEC, float(response.headers.get("Retry-After")))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def is_network_error(error):
+    from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+    return isinstance(error, (ConnectionError, TimeoutError, RequestsConnectionError, Timeout))
+
+def is_quota_error(error):
+    return error_status(error) == 429
+
+# --- append 합치기 ---
+_RANGE_RE = re.compile(r"^(?:(.*)!)?([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$")
+
+class _PendingAppend:
+    __slots__ = ("rows", "kwargs", "done", "response", "error")
+
+    def __init__(self, rows, kwargs):
+        self.rows = rows
+        self.kwargs = kwargs
+        self.done = False
+        self.response = None
+        self.error = None
+
+def _split_response(response, offset, count):
+    """ 합쳐서 보낸 append_rows 응답에서 offset번째 행부터 count개 행에 해당하는 응답 """
+    try:
+        match = _RANGE_RE.match(response["updates"]["updatedRange"])
+    except (KeyError, TypeError):
+        match = None
+    if not match:
+        return response
+    title, first_col, first_row, last_col = match.group(1), match.group(2), int(match.group(3)), match.group(4)
+    start = first_row + offset
+    rng = f"{first_col}{start}:{last_col or first_col}{start + count - 1}"
+    updates = dict(response["updates"], updatedRange=f"{title}!{rng}" if title else rng, updatedRows=count)
+    return dict(response, updates=updates)
+
+class AppendCoalescer:
+    """ 동시에 들어온 append_rows 요청을 한 번의 호출로 합침 (group commit)
+    보내는 중인 요청이 없으면 바로 보내고, 있으면 그동안 쌓인 요청을 다음 한 번에 모아서 보냄 """
+    def __init__(self, send):
+        self.send = send
+        self.cond = threading.Condition()
+        self.pending = []
+        self.sending = False
+
+    def append_rows(self, rows, **kwargs):
+        entry = _PendingAppend([list(r) for r in rows], kwargs)
+        with self.cond:
+            self.pending.append(entry)
+            METRICS.gauge("sheets.append_queue_depth", sum(len(p.rows) for p in self.pending))
+            while self.sending and not entry.done:
+                self.cond.wait()
+            if not entry.done:
+                # 대기 중이던 요청을 모두 가져가서 대표로 보냄
+                self.sending = True
+                batch, self.pending = self.pending, []
+                METRICS.gauge("sheets.append_queue_depth", 0)
+        if not entry.done:
+            try:
+                self._send_batch(batch)
+            finally:
+                with self.cond:
+                    self.sending = False
+                    self.cond.notify_all()
+        if entry.error is not None:
+            raise entry.error
+        return entry.response
+
+    def _send_batch(self, batch):
+        # 같은 옵션(kwargs)끼리 순서대로 묶어서 보냄
+        groups = []
+        for entry in batch:
+            if groups and groups[-1][0].kwargs == entry.kwargs:
+                groups[-1].append(entry)
+            else:
+                groups.append([entry])
+        for group in groups:
+            rows = [r for entry in group for r in entry.rows]
+            METRICS.observe("sheets.append_batch_rows", len(rows))
+            if len(group) > 1:
+                METRICS.incr("sheets.append_coalesced", len(group) - 1)
+            try:
+                response = self.send(rows, **group[0].kwargs)
+            except Exception as e:
+                response = None
+                for entry in group:
+                    entry.error = e
+            offset = 0
+            for entry in group:
+                if response is not None:
+                    entry.response = _split_response(response, offset, len(entry.rows))
+                offset += len(entry.rows)
+                entry.done = True
+
+class QuotaWorksheet:
+    """ 워크시트 API 호출을 할당량 버킷과 재시도, append 합치기를 거쳐 보내는 래퍼 """
+    def __init__(self, worksheet, limiter):
+        self._worksheet = worksheet
+        self._limiter = limiter
+        self._appends = AppendCoalescer(lambda rows, **kw: limiter.call("write", worksheet.append_rows, rows, **kw))
+
+    @property
+    def spreadsheet(self):
+        return QuotaSpreadsheet(self._worksheet.spreadsheet, self._limiter)
+
+    def append_rows(self, values, **kwargs):
+        return self._appends.append_rows(values, **kwargs)
+
+    def append_row(self, values, **kwargs):
+        return self._appends.append_rows([values], **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._worksheet, name)
+        kind = "read" if name in READ_METHODS else "write" if name in WRITE_METHODS else None
+        if kind is None:
+            return attr
+        return lambda *args, **kwargs: self._limiter.call(kind, attr, *args, **kwargs)
+
+    def __repr__(self):
+        return f"QuotaWorksheet({self._worksheet!r})"
+
+class QuotaSpreadsheet:
+    """ 스프레드시트 단위 호출(워크시트 목록/추가, batch_update)용 래퍼
+    돌려주는 워크시트도 계측/할당량 래퍼로 감쌈 """
+    def __init__(self, spreadsheet, limiter):
+        self._spreadsheet = spreadsheet
+        self._limiter = limiter
+
+    def _wrap(self, worksheet):
+        return QuotaWorksheet(InstrumentedWorksheet(worksheet), self._limiter)
+
+    def worksheets(self, *args, **kwargs):
+        return [self._wrap(ws) for ws in self._limiter.call("read", self._spreadsheet.worksheets, *args, **kwargs)]
+
+    def worksheet(self, title):
+        return self._wrap(self._limiter.call("read", self._spreadsheet.worksheet, title))
+
+    def add_worksheet(self, *args, **kwargs):
+        return self._wrap(self._limiter.call("write", self._spreadsheet.add_worksheet, *args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._spreadsheet, name)
+        kind = "read" if name in READ_METHODS else "write" if name in WRITE_METHODS else None
+        if kind is None:
+            return attr
+        return lambda *args, **kwargs: self._limiter.call(kind, attr, *args, **kwargs)
@@ -0,0 +1,141 @@
+"""출결 현황 엑셀 일괄 생성 (브라우저/Streamlit 없이 실행)
+
+구글 시트에서 내려받은 CSV/XLSX 파일이나 로컬 SQLite 저장소를 읽어
+기록 화면에서 받는 것과 같은 월별 엑셀 파일을 여러 달에 대해 한 번에 만든다.
+달마다 별도 프로세스에서 계산한다.
+
+    python report_cli.py 출결기록.csv --months 2025-03:2026-02 --output-dir reports
+    python report_cli.py attendance.db --all --combined 연간현황.xlsx
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# 계측 로그(JSON 줄)가 출력에 섞이지 않도록 기본은 끔
+os.environ.setdefault("ATTENDANCE_METRICS_LOG", "off")
+
+from daily import DailyTable, parse_timestamp  # noqa: E402
+from reports import (  # noqa: E402
+    build_range_summary, daily_month_result, month_range, report_workbook_bytes, write_report_workbook,
+)
+from storage import HEADER, SQLiteStore, normalize_row  # noqa: E402
+
+def _cell_text(value):
+    """ XLSX 셀 값을 시트에서 내려받은 문자열 형식으로 """
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+def read_rows(path):
+    """ 입력 파일의 기록 행 목록 (헤더 제외). .csv / .xlsx / .db(.sqlite) """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+    elif ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        rows = [[_cell_text(v) for v in r] for r in wb.worksheets[0].iter_rows(values_only=True)]
+        wb.close()
+    elif ext in (".db", ".sqlite", ".sqlite3"):
+        return SQLiteStore(path).query()
+    else:
+        raise ValueError(f"지원하지 않는 입력 형식입니다: {path} (.csv, .xlsx, .db)")
+    if rows and rows[0] and rows[0][0].strip() == HEADER[0]:
+        rows = rows[1:]
+    return [normalize_row(r) for r in rows if len(r) >= 3 and any(r)]
+
+def split_by_month(rows):
+    """ (년, 월) -> 그 달의 행 목록. 타임스탬프가 잘못된 행은 제외 """
+    months = {}
+    for row in rows:
+        dt = parse_timestamp(row[0])
+        if dt is not None:
+            months.setdefault((dt.year, dt.month), []).append(row)
+    return months
+
+def parse_month(text):
+    year, month = text.strip().split("-")
+    return int(year), int(month)
+
+def parse_months(spec):
+    """ '2025-03', '2025-03,2025-05', '2025-03:2025-08' (쉼표로 여러 개) """
+    months = set()
+    for part in spec.split(","):
+        if ":" in part:
+            start, end = part.split(":")
+            months.update(month_range(parse_month(start), parse_month(end)))
+        elif part.strip():
+            months.add(parse_month(part))
+    return sorted(months)
+
+def build_month(args):
+    """ 작업 프로세스: 한 달치 행으로 (년, 월, 현황 표, 건수, 엑셀 bytes) 계산 """
+    year, month, rows = args
+    table = DailyTable()
+    table.add_rows(rows)
+    rep_df, counts = daily_month_result(table, year, month)
+    data = report_workbook_bytes(rep_df) if not rep_df.empty else None
+    return year, month, rep_df, counts, data
+
+def run(args):
+    started = time.perf_counter()
+    by_month = split_by_month(read_rows(args.input))
+    if args.all or not args.months:
+        months = sorted(by_month)
+    else:
+        months = parse_months(args.months)
+    if not months:
+        print("생성할 달이 없습니다.", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(y, m, by_month.get((y, m), [])) for y, m in months]
+    workers = args.workers or min(len(jobs), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(build_month, jobs))
+    else:
+        results = [build_month(job) for job in jobs]
+
+    written = []
+    for year, month, rep_df, counts, data in results:
+        if data is None:
+            print(f"{year}-{month:02d}: 기록 없음", file=sys.stderr)
+            continue
+        path = os.path.join(args.output_dir, f"출결현황_{year}_{month}월.xlsx")
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append(path)
+
+    if args.combined:
+        results_by_month = [((y, m), (rep_df, counts)) for y, m, rep_df, counts, _ in results]
+        monthly = [(f"{y:04d}-{m:02d}", rep_df) for (y, m), (rep_df, _) in results_by_month if not rep_df.empty]
+        summary = build_range_summary(results_by_month)
+        with open(args.combined, "wb") as f:
+            f.write(write_report_workbook([("요약", summary)] + monthly))
+        written.append(args.combined)
+
+    for path in written:
+        print(path)
+    print(f"{len(months)}개월, {time.perf_counter() - started:.2f}초 (작업 프로세스 {workers}개)", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="출결 현황 엑셀 일괄 생성 (Streamlit 없이 실행)")
+    parser.add_argument("input", help="기록 파일 (.csv / .xlsx 내보내기 또는 SQLite 저장소 .db)")
+    parser.add_argument("--months", help="대상 달: 2025-03, 2025-03,2025-05 또는 2025-03:2026-02")
+    parser.add_argument("--all", action="store_true", help="기록이 있는 모든 달 (기본값)")
+    parser.add_argument("--output-dir", default="reports", help="월별 엑셀 파일을 저장할 폴더")
+    parser.add_argument("--combined", help="요약 + 월별 시트를 담은 엑셀 파일 경로 (선택)")
+    parser.add_argument("--workers", type=int, default=0, help="작업 프로세스 수 (기본: CPU 수, 1이면 순차 실행)")
+    return run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+from datetime import datetime
+from io import BytesIO
+
+from columnar import NAT, EventColumns
+from instrumentation import lazy_import
+
+# --- 출결 기록 표 / 월간 리포트 / 엑셀 내보내기 ---
+# Streamlit 없이도 쓸 수 있도록 분리한 리포트 계산 (앱과 report_cli.py가 함께 사용)
+# pandas는 처음 사용할 때 불러옴
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# --- 기록 표 ---
+REASON_COLUMNS = ["early_reason", "late_reason", "absent_reason"]
+FRAME_COLUMNS = ["dt", "name", "type", "site", "lat", "lon", "distance", *REASON_COLUMNS, "date", "year", "month"]
+
+def records_frame(data):
+    """ get_all_values() 결과(헤더 포함)를 파싱된 DataFrame으로 변환하는 함수 (columns_frame 참고) """
+    return columns_frame(EventColumns.from_rows(data[1:] if data else []))
+
+def columns_frame(columns):
+    """ EventColumns를 DataFrame으로. 시각/좌표/거리 열은 배열을 복사하지 않는 뷰
+    컬럼: dt/date(datetime64[s]), name/type/site(category), lat/lon/distance(float32),
+    early_reason/late_reason/absent_reason(빈 값/'nan'/'none'은 결측), year, month.
+    타임스탬프가 잘못된 행은 제외. 다른 스레드가 추가하는 중에도 열 길이가 맞도록 스냅숏에서 읽음 """
+    columns = columns.snapshot()
+    ts = columns.ts
+    if not len(ts):
+        return pd.DataFrame({c: pd.Series(dtype="datetime64[s]" if c in ("dt", "date") else object)
+                             for c in FRAME_COLUMNS})
+    dt = ts.view("datetime64[s]")
+    data = {
+        "dt": dt,
+        "name": pd.Categorical.from_codes(columns.user, categories=columns.names),
+        "type": pd.Categorical.from_codes(columns.type, categories=columns.type_names),
+        "site": pd.Categorical.from_codes(columns.site, categories=columns.site_names),
+        "lat": columns.lat,
+        "lon": columns.lon,
+        "distance": columns.distance,
+    }
+    reason_rows, *reasons = columns.reason_table()
+    for col, values in zip(REASON_COLUMNS, reasons):
+        out = np.full(len(ts), np.nan, dtype=object)
+        out[reason_rows] = [v or np.nan for v in values]
+        data[col] = out
+    data["date"] = dt.astype("datetime64[D]").astype("datetime64[s]")
+    data["year"] = (dt.astype("datetime64[Y]").view("int64") + 1970).astype("int16")
+    data["month"] = (dt.astype("datetime64[M]").view("int64") % 12 + 1).astype("int8")
+    df = pd.DataFrame(data, copy=False)
+    valid = ts != NAT
+    if not valid.all():
+        df = df[valid].reset_index(drop=True)
+    return df
+
+# --- 월간 출결 현황 리포트 ---
+def month_weekdays(year, month):
+    """ 해당 월의 평일(월~금) 날짜 목록 """
+    return [d.date() for d in pd.bdate_range(datetime(year, month, 1), periods=31) if d.month == month]
+
+COUNT_COLUMNS = {"absent": "결근", "late": "지각", "early": "조퇴"}
+
+def _status_text(counts):
+    return ("결근:" + counts["absent"].astype(str) + ", 지각:" + counts["late"].astype(str)
+            + ", 조퇴:" + counts["early"].astype(str))
+
+def month_result_from_days(users, days, year, month):
+    """ 사용자 목록과 일별 표(컬럼 name, date, status, absent, late, early)로 (출결 현황 표, 건수)를 만드는 함수 """
+    if not users:
+        return pd.DataFrame(), pd.DataFrame(columns=list(COUNT_COLUMNS))
+    weekdays = month_weekdays(year, month)
+    day_cols = [f"{d.day}일" for d in weekdays]
+
+    counts = days.groupby("name")[list(COUNT_COLUMNS)].sum().reindex(users, fill_value=0)
+    summary = _status_text(counts)
+    grid = days.pivot(index="name", columns="date", values="status")
+    grid = grid.reindex(index=users, columns=pd.to_datetime(weekdays)).fillna("")
+    grid.columns = day_cols
+
+    report = pd.concat([pd.Series(users, index=users, name="이름"), summary.rename("현황"), grid], axis=1)
+    return report.reset_index(drop=True), counts
+
+def daily_month_result(table, year, month):
+    """ 일별 상태 표(DailyTable)에서 해당 월의 (출결 현황 표, 건수)를 만드는 함수 """
+    users, days = table.month_summary(year, month)
+    days = pd.DataFrame(days, columns=["name", "date", "status", "absent", "late", "early"])
+    days["date"] = pd.to_datetime(days["date"])
+    return month_result_from_days(users, days, year, month)
+
+# --- 기간 리포트 ---
+def month_range(start, end):
+    """ (년, 월) start부터 end까지(포함)의 (년, 월) 목록 """
+    months = []
+    year, month = start
+    while (year, month) <= tuple(end):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def build_range_summary(results):
+    """ [((년, 월), (현황 표, 건수))] -> 사용자별 기간 합계와 월별 현황 표 """
+    frames = {f"{y:04d}-{m:02d}": counts for (y, m), (_, counts) in results if not counts.empty}
+    if not frames:
+        return pd.DataFrame()
+    total = pd.concat(frames.values()).groupby(level=0).sum()
+    users = sorted(total.index)
+    summary = pd.DataFrame({"이름": users})
+    for col, label in COUNT_COLUMNS.items():
+        summary[label] = total[col].reindex(users).astype(int).to_numpy()
+    for label, counts in frames.items():
+        summary[label] = _status_text(counts).reindex(users).fillna("").to_numpy()
+    return summary
+
+# --- 엑셀 내보내기 ---
+REPORT_SHEET_NAME = '출결현황'
+
+def _report_styles():
+    """ 셀마다 스타일 객체를 만들지 않도록 워크북에 등록해 공유하는 스타일 (헤더, 흰색 행, 회색 행) """
+    from openpyxl.styles import Alignment, Border, NamedStyle, PatternFill, Side
+    thin = Side(style='thin')
+    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header = NamedStyle(name="report_header", border=thin_border)
+    body_alignment = Alignment(wrap_text=True, vertical='top')
+    white = NamedStyle(name="report_white", border=thin_border, alignment=body_alignment,
+                       fill=PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid'))
+    gray = NamedStyle(name="report_gray", border=thin_border, alignment=body_alignment,
+                      fill=PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid'))
+    return header, white, gray
+
+def write_report_workbook(sheets):
+    """ [(시트 이름, 표)]를 시트별로 write-only(스트리밍) 모드로 써서 엑셀 파일(bytes)로 만드는 함수 """
+    # openpyxl은 엑셀 다운로드 때만 필요하므로 여기서 불러옴
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    wb = Workbook(write_only=True)
+    styles = _report_styles()
+    for style in styles:
+        wb.add_named_style(style)
+    header, white, gray = (style.name for style in styles)
+
+    for sheet_name, rep_df in sheets:
+        ws = wb.create_sheet(sheet_name)
+        ws.column_dimensions['A'].width = 20
+        ws.column_dimensions['B'].width = 25
+        for col in range(3, len(rep_df.columns) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = 35
+
+        def styled_row(values, style):
+            cells = []
+            for value in values:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.style = style
+                cells.append(cell)
+            return cells
+
+        ws.append(styled_row(rep_df.columns, header))
+        # 헤더가 1행이므로 짝수 행은 흰색, 홀수 행은 회색
+        for idx, values in enumerate(rep_df.itertuples(index=False), start=2):
+            ws.append(styled_row(values, white if idx % 2 == 0 else gray))
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def report_workbook_bytes(rep_df, sheet_name=REPORT_SHEET_NAME):
+    """ 출결 현황 표 하나를 엑셀 파일(bytes)로 만드는 함수 """
+    return write_report_workbook([(sheet_name, rep_df)])
+
+def range_workbook_bytes(summary, monthly, single_month):
+    """ 기간 리포트 엑셀 파일. 한 달이면 기존 형식(시트 하나), 여러 달이면 요약 + 월별 시트 """
+    if single_month and len(monthly) == 1:
+        return report_workbook_bytes(monthly[0][1])
+    return write_report_workbook([("요약", summary)] + monthly)
@@ -0,0 +1,191 @@
+import bisect
+import sqlite3
+import threading
+
+# --- 출결 기록 저장소 ---
+# 행 형식은 구글 시트와 동일: [timestamp, name, type, loc, distance, early_reason, late_reason, absent_reason]
+# 날짜 조건은 'YYYY-MM-DD' 문자열 (start, end 모두 포함)
+
+HEADER = ["타임스탬프", "이름", "상태", "위치", "거리", "조퇴사유", "지각사유", "결근사유"]
+ROW_WIDTH = len(HEADER)
+
+def normalize_row(row):
+    """ 시트 스키마 폭(8칸)에 맞춘 문자열 행 """
+    row = ["" if v is None else str(v) for v in row][:ROW_WIDTH]
+    return row + [""] * (ROW_WIDTH - len(row))
+
+class AttendanceStore:
+    """ 출결 기록 저장소 인터페이스 """
+    # 기록이 바뀔 때마다 달라지는 값 (캐시 키로 사용)
+    version = 0
+
+    def append_events(self, rows):
+        raise NotImplementedError
+
+    def query(self, name=None, start=None, end=None):
+        """ 조건에 맞는 기록을 시간순으로 반환 """
+        raise NotImplementedError
+
+    def list_users(self):
+        raise NotImplementedError
+
+    def day_types(self, name, date_str):
+        """ 해당 날짜에 사용자가 남긴 상태(type) 집합 """
+        return {row[2] for row in self.query(name, date_str, date_str)}
+
+    def refresh(self):
+        """ 외부에서 바뀌었을 수 있는 기록을 다시 읽어오는 함수 (필요한 저장소만 구현) """
+
+    def events_since(self, version):
+        """ version 이후 추가된 (새 버전, 기록 목록(추가 순서)). 지원하지 않으면 None """
+        return None
+
+class MemoryStore(AttendanceStore):
+    """ 테스트/벤치마크용 메모리 저장소. (이름, 날짜) 인덱스와 정렬된 날짜 목록 유지 """
+    def __init__(self, rows=()):
+        self._lock = threading.Lock()
+        self._by_day = {}       # 날짜 -> 행 목록
+        self._by_user_day = {}  # (이름, 날짜) -> 행 목록
+        self._dates = []
+        self._log = []          # 추가 순서대로의 행 (버전 = 행 수)
+        self.version = 0
+        if rows:
+            self.append_events(rows)
+
+    def append_events(self, rows):
+        with self._lock:
+            for row in rows:
+                row = normalize_row(row)
+                date_str = row[0][:10]
+                if date_str not in self._by_day:
+                    bisect.insort(self._dates, date_str)
+                self._by_day.setdefault(date_str, []).append(row)
+                self._by_user_day.setdefault((row[1], date_str), []).append(row)
+                self._log.append(row)
+            self.version = len(self._log)
+
+    def query(self, name=None, start=None, end=None):
+        with self._lock:
+            lo = bisect.bisect_left(self._dates, start) if start else 0
+            hi = bisect.bisect_right(self._dates, end) if end else len(self._dates)
+            dates = self._dates[lo:hi]
+            if name is None:
+                rows = [r for d in dates for r in self._by_day[d]]
+            else:
+                rows = [r for d in dates for r in self._by_user_day.get((name, d), [])]
+        return sorted(rows, key=lambda r: r[0])
+
+    def list_users(self):
+        with self._lock:
+            return sorted({name for name, _ in self._by_user_day})
+
+    def events_since(self, version):
+        with self._lock:
+            return len(self._log), list(self._log[version:])
+
+class SQLiteStore(AttendanceStore):
+    """ (name, date) 인덱스를 둔 SQLite 저장소 """
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                date TEXT NOT NULL,
+                name TEXT NOT NULL,
+                type TEXT NOT NULL,
+                location TEXT NOT NULL DEFAULT '',
+                distance TEXT NOT NULL DEFAULT '',
+                early_reason TEXT NOT NULL DEFAULT '',
+                late_reason TEXT NOT NULL DEFAULT '',
+                absent_reason TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_events_name_date ON events (name, date)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_events_date ON events (date)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @property
+    def version(self):
+        # 기록은 추가만 되므로 마지막 id가 데이터 버전
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def append_events(self, rows):
+        rows = [normalize_row(r) for r in rows]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO events (ts, date, name, type, location, distance, early_reason, late_reason, absent_reason)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(r[0], r[0][:10], *r[1:]) for r in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # 열린 트랜잭션을 남기면 이후의 BEGIN이 모두 실패함
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def query(self, name=None, start=None, end=None):
+        where, params = [], []
+        if name is not None:
+            where.append("name = ?")
+            params.append(name)
+        if start:
+            where.append("date >= ?")
+            params.append(start)
+        if end:
+            where.append("date <= ?")
+            params.append(end)
+        sql = ("SELECT ts, name, type, location, distance, early_reason, late_reason, absent_reason FROM events"
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY ts, id")
+        with self._lock:
+            return [list(r) for r in self._conn.execute(sql, params)]
+
+    def list_users(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT name FROM events ORDER BY name")]
+
+    def events_since(self, version):
+        # version은 마지막으로 읽은 id
+        sql = ("SELECT id, ts, name, type, location, distance, early_reason, late_reason, absent_reason"
+               " FROM events WHERE id > ? ORDER BY id")
+        with self._lock:
+            rows = self._conn.execute(sql, (version,)).fetchall()
+        return (rows[-1][0] if rows else version), [list(r[1:]) for r in rows]
+
+    def _is_seeded(self):
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+            return True
+        # 가져오기 표시를 남기기 전부터 쓰던 저장소는 기록이 있으면 가져온 것으로 봄
+        return self._conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() is not None
+
+    def is_seeded(self):
+        """ 처음 한 번의 기존 기록 가져오기(seed)를 이미 마쳤는지 """
+        with self._lock:
+            return self._is_seeded()
+
+    def seed(self, rows):
+        """ 아직 가져오지 않았다면 기존 기록을 넣고 완료 표시를 남김 (기록이 없어도 표시).
+        여러 프로세스가 동시에 호출해도 한 번만 들어가도록 쓰기 트랜잭션 안에서 다시 확인. 넣었으면 True """
+        rows = [normalize_row(r) for r in rows]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._is_seeded():
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.executemany(
+                    "INSERT INTO events (ts, date, name, type, location, distance, early_reason, late_reason, absent_reason)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(r[0], r[0][:10], *r[1:]) for r in rows],
+                )
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seeded', ?)", (str(len(rows)),))
+                self._conn.execute("COMMIT")
+                return True
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
@@ -0,0 +1,181 @@
+"""기준(원래) 구현: 기록 화면의 월간 현황 계산
+
+처음 버전 app.py의 월간 리포트 코드를 Streamlit 부분만 빼고 그대로 옮겨 와서,
+새 리포트 경로(일별 상태 표, 열 단위 저장소)의 결과와 비교하는 데 쓴다.
+원래 코드는 sort_values('dt')(불안정 정렬)로 정렬하므로 타임스탬프가 같은 기록끼리는 순서가 정해지지 않는다.
+"""
+import calendar
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+HEADER = ["타임스탬프", "이름", "상태", "위치", "거리", "조퇴사유", "지각사유", "결근사유"]
+TYPES = ["출근", "지각", "퇴근", "조퇴", "결근", "출근NN", "퇴근NN"]
+REASONS = ["", "[업무] 외근", "병원", "nan", "None", "개인 사정"]
+
+def baseline_month_frame(data, year, month):
+    """ 원래 구현의 월별 기록 표 (시각순 정렬, 불안정 정렬) """
+    headers = data[0]
+    df = pd.DataFrame(data[1:], columns=headers)
+    df['dt'] = pd.to_datetime(df[headers[0]], errors='coerce')
+    df = df.dropna(subset=['dt'])
+    mask_month = (df['dt'].dt.year == year) & (df['dt'].dt.month == month)
+    return df[mask_month].copy().sort_values('dt')
+
+def baseline_month_report(data, year, month):
+    """ 원래 구현의 월간 출결 현황 표 (이름, 현황, 평일별 출결) """
+    headers = data[0]
+    col_name = headers[1]
+    col_type = headers[2]
+    month_df = baseline_month_frame(data, year, month)
+    all_users = sorted(month_df[col_name].unique())
+
+    _, last_day = calendar.monthrange(year, month)
+    valid_date_cols = []
+    valid_dates = []
+
+    for d in range(1, last_day + 1):
+        curr_date = datetime(year, month, d).date()
+        if curr_date.weekday() < 5: # 0(월)~4(금)
+            valid_dates.append(curr_date)
+            valid_date_cols.append(f"{d}일")
+
+    report_data = []
+
+    for u in all_users:
+        u_df = month_df[month_df[col_name] == u]
+        late_cnt = early_cnt = absent_cnt = 0
+        day_status_map = {}
+        u_df['date_obj'] = u_df['dt'].dt.date
+        grouped = u_df.groupby('date_obj')
+        for d_date, grp in grouped:
+            types = grp[col_type].unique()
+            parts = []
+            in_time = out_time = ""
+            notes = []
+            has_work = False
+            has_in_nn = has_out_nn = False
+            if "출근" in types:
+                in_time = grp[grp[col_type]=="출근"]['dt'].min().strftime("%H:%M")
+                has_work = True
+            elif "출근NN" in types:
+                in_time = "NN"
+                has_in_nn = True
+                has_work = True
+            if "지각" in types:
+                late_rows = grp[grp[col_type]=="지각"]
+                is_excused = False
+                reason_txt = ""
+                for _, r in late_rows.iterrows():
+                    if len(r) > 6:
+                        r_val = str(r.iloc[6]) if pd.notna(r.iloc[6]) else ""
+                        reason_txt = r_val
+                        if "[업무]" in r_val:
+                            is_excused = True
+                if not reason_txt or reason_txt.lower() in ["nan","none",""]:
+                    reason_txt = "사유없음"
+                if not is_excused:
+                    late_cnt += 1
+                in_time = grp[grp[col_type]=="지각"]['dt'].min().strftime("%H:%M")
+                notes.append(f"지각({reason_txt})" if not is_excused else f"지각(업무:{reason_txt})")
+                has_work = True
+            if "퇴근" in types:
+                out_time = grp[grp[col_type]=="퇴근"]['dt'].max().strftime("%H:%M")
+            elif "퇴근NN" in types:
+                out_time = "NN"
+                has_out_nn = True
+            if "조퇴" in types:
+                early_rows = grp[grp[col_type]=="조퇴"]
+                is_excused = False
+                reason_txt = ""
+                for _, r in early_rows.iterrows():
+                    if len(r) > 5:
+                        r_val = str(r.iloc[5]) if pd.notna(r.iloc[5]) else ""
+                        reason_txt = r_val
+                        if "[업무]" in r_val:
+                            is_excused = True
+                if not reason_txt or reason_txt.lower() in ["nan","none",""]:
+                    reason_txt = "사유없음"
+                if not is_excused:
+                    early_cnt += 1
+                out_time = grp[grp[col_type]=="조퇴"]['dt'].max().strftime("%H:%M")
+                notes.append(f"조퇴({reason_txt})" if not is_excused else f"조퇴(업무:{reason_txt})")
+            if "결근" in types:
+                absent_cnt += 1
+                abs_rows = grp[grp[col_type]=="결근"]
+                reason_txt = ""
+                if not abs_rows.empty:
+                    r = abs_rows.iloc[0]
+                    if len(r) > 7:
+                        reason_txt = str(r.iloc[7]) if pd.notna(r.iloc[7]) else ""
+                if not reason_txt or reason_txt.lower() in ["nan","none",""]:
+                    reason_txt = "사유없음"
+                notes.append(f"결근({reason_txt})")
+            if has_in_nn:
+                late_cnt += 1
+                nn_reason = ""
+                nn_rows = grp[grp[col_type]=="출근NN"]
+                if not nn_rows.empty:
+                    r = nn_rows.iloc[0]
+                    if len(r) > 6:
+                        nn_reason = str(r.iloc[6]) if pd.notna(r.iloc[6]) else "사유없음"
+                if not nn_reason or nn_reason.lower() in ["nan","none",""]:
+                    nn_reason = "사유없음"
+                notes.insert(0, f"지각({nn_reason})")
+            if has_out_nn:
+                early_cnt += 1
+                nn_reason = ""
+                nn_rows = grp[grp[col_type]=="퇴근NN"]
+                if not nn_rows.empty:
+                    r = nn_rows.iloc[0]
+                    if len(r) > 5:
+                        nn_reason = str(r.iloc[5]) if pd.notna(r.iloc[5]) else "사유없음"
+                if not nn_reason or nn_reason.lower() in ["nan","none",""]:
+                    nn_reason = "사유없음"
+                notes.append(f"조퇴({nn_reason})")
+            if has_in_nn and has_out_nn:
+                late_cnt -= 1
+                early_cnt -= 1
+                absent_cnt += 1
+                notes = ["결근(사유없음)"]
+            if in_time:
+                parts.append(f"출근: {in_time}")
+            if out_time:
+                parts.append(f"퇴근: {out_time}")
+            elif has_work and "결근" not in types and not has_out_nn:
+                parts.append("퇴근: NN")
+            if notes:
+                parts.append(", ".join(notes))
+            day_status_map[d_date] = ", ".join(parts)
+        row = {
+            "이름": u,
+            "현황": f"결근:{absent_cnt}, 지각:{late_cnt}, 조퇴:{early_cnt}"
+        }
+        for d_date, d_col in zip(valid_dates, valid_date_cols):
+            row[d_col] = day_status_map.get(d_date, "")
+
+        report_data.append(row)
+
+    return pd.DataFrame(report_data)
+
+def generate_rows(seed, users=("B", "A", "C", "D/x"), days=70, end=datetime(2026, 10, 18), unique=True):
+    """ 임의 순서의 출결 기록 (헤더 포함). unique면 타임스탬프가 모두 다름. 잘못된 타임스탬프 행도 섞음 """
+    rng = random.Random(seed)
+    rows, seen = [], set()
+    for k in range(days):
+        day = end - timedelta(days=k)
+        for user in users:
+            if rng.random() < 0.3:
+                continue
+            for _ in range(rng.randint(1, 3)):
+                ts = day.replace(hour=rng.randint(7, 23), minute=rng.randint(0, 59), second=rng.randint(0, 59))
+                ts = ts.strftime('%Y-%m-%d %H:%M:%S')
+                if unique and ts in seen:
+                    continue
+                seen.add(ts)
+                rows.append([ts, user, rng.choice(TYPES), "37.45,126.95", "3.0m",
+                             rng.choice(REASONS), rng.choice(REASONS), rng.choice(REASONS)])
+    rng.shuffle(rows)
+    rows.insert(rng.randint(0, len(rows)), ["잘못된 값", "A", "출근", "", "", "", "", ""])
+    return [list(HEADER)] + rows
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# 앱 모듈은 저장소 최상위에 있으므로 테스트에서 바로 import할 수 있게 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ATTENDANCE_METRICS_LOG", "off")
+# 저널/일별 상태 파일이 작업 디렉터리에 생기지 않도록 modules import 전에 지정
+_tmp_dir = tempfile.mkdtemp()
+os.environ.setdefault("ATTENDANCE_JOURNAL_PATH", os.path.join(_tmp_dir, "journal.db"))
+os.environ.setdefault("ATTENDANCE_DAILY_PATH", os.path.join(_tmp_dir, "daily.db"))
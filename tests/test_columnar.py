@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from baseline import HEADER, baseline_month_frame, generate_rows
+from columnar import EventColumns
+from reports import columns_frame
+
+MONTHS = [(2026, 8), (2026, 9), (2026, 10)]
+REASON_COLUMNS = [("early_reason", 5), ("late_reason", 6), ("absent_reason", 7)]
+
+def clean_reason(value):
+    return "" if str(value).lower() in ("nan", "none", "") else str(value)
+
+def month_bounds(year, month):
+    end = pd.Timestamp(year, month, 1) + pd.offsets.MonthEnd(0)
+    return f"{year:04d}-{month:02d}-01", end.strftime("%Y-%m-%d")
+
+@pytest.mark.parametrize("seed", range(12))
+def test_frame_matches_baseline_on_unique_timestamps(seed):
+    data = generate_rows(seed)
+    df = columns_frame(EventColumns.from_rows(data[1:]))
+    for year, month in MONTHS:
+        expected = baseline_month_frame(data, year, month)
+        actual = df[(df["year"] == year) & (df["month"] == month)].sort_values("dt", kind="stable")
+        assert list(actual["dt"]) == list(expected["dt"])
+        assert list(actual["name"].astype(str)) == list(expected["이름"])
+        assert list(actual["type"].astype(str)) == list(expected["상태"])
+        for column, index in REASON_COLUMNS:
+            assert [clean_reason(v) for v in actual[column]] == [clean_reason(v) for v in expected[HEADER[index]]]
+
+@pytest.mark.parametrize("seed", range(6))
+def test_select_matches_baseline_user_rows(seed):
+    data = generate_rows(seed)
+    columns = EventColumns.from_rows(data[1:])
+    for year, month in MONTHS:
+        expected = baseline_month_frame(data, year, month)
+        for name in sorted(expected["이름"].unique()):
+            rows = columns.rows(columns.select(name, *month_bounds(year, month)))
+            user = expected[expected["이름"] == name]
+            # 좌표/거리는 float32로 보관하므로 문자열 형식만 다를 수 있어 비교에서 제외
+            assert [[r[0], r[1], r[2], r[5], r[6], r[7]] for r in rows] == \
+                user[[HEADER[i] for i in (0, 1, 2, 5, 6, 7)]].values.tolist()
+
+def test_tied_timestamps_keep_sheet_order():
+    # 원래 구현(불안정 정렬)은 같은 시각 기록의 순서가 정해지지 않지만 열 단위 저장소는 시트 순서를 유지
+    rows = [["2026-10-14 18:30:00", "A", "조퇴", "", "", "병원", "", ""],
+            ["2026-10-14 09:00:00", "A", "출근", "", "", "", "", ""],
+            ["2026-10-14 18:30:00", "A", "조퇴", "", "", "[업무] 외근", "", ""]]
+    columns = EventColumns.from_rows(rows)
+    assert [r[5] for r in columns.rows(columns.select("A"))] == ["", "병원", "[업무] 외근"]
+    df = columns_frame(columns).sort_values("dt", kind="stable")
+    assert [clean_reason(v) for v in df["early_reason"]] == ["", "병원", "[업무] 외근"]
+
+def test_snapshot_is_not_affected_by_later_extend():
+    data = generate_rows(0)
+    columns = EventColumns.from_rows(data[1:100])
+    snapshot = columns.snapshot()
+    before = snapshot.select("A")
+    columns.extend(data[100:] * 3)
+    assert len(snapshot) == 99 and all(len(getattr(snapshot, f)) == 99 for f, _ in EventColumns._fields)
+    assert list(snapshot.select("A")) == list(before)
+    assert len(columns) == 99 + 3 * (len(data) - 100)
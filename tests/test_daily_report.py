@@ -0,0 +1,49 @@
+import random
+
+import pandas as pd
+import pytest
+
+from baseline import HEADER, baseline_month_report, generate_rows
+from daily import DailyTable
+from reports import daily_month_result
+
+MONTHS = [(2026, 8), (2026, 9), (2026, 10)]
+
+def build_table(rows, seed):
+    """ 앞 절반은 한 번에, 나머지는 임의 크기로 나눠 추가 (증분 동기화와 같은 경로) """
+    table = DailyTable()
+    half = len(rows) // 2
+    table.replace_from(rows[:half])
+    rng = random.Random(seed)
+    i = half
+    while i < len(rows):
+        j = i + rng.randint(1, 5)
+        table.add_rows(rows[i:j])
+        i = j
+    return table
+
+def assert_same_report(expected, actual):
+    pd.testing.assert_frame_equal(expected.astype(object), actual.astype(object), check_dtype=False)
+
+@pytest.mark.parametrize("seed", range(12))
+def test_month_report_matches_baseline_on_unique_timestamps(seed):
+    data = generate_rows(seed)
+    table = build_table(data[1:], seed)
+    for year, month in MONTHS:
+        report, _ = daily_month_result(table, year, month)
+        assert_same_report(baseline_month_report(data, year, month), report)
+
+def test_tied_timestamps_follow_sheet_order():
+    # 같은 시각의 지각 기록이 둘이면 원래 구현은 불안정 정렬 때문에 어느 사유가 남을지 정해지지 않는다.
+    # 일별 상태 표는 시트 순서(나중에 추가된 행)를 따른다.
+    data = [list(HEADER),
+            ["2026-10-14 10:30:00", "A", "지각", "", "", "", "병원", ""],
+            ["2026-10-14 10:30:00", "A", "지각", "", "", "", "[업무] 외근", ""]]
+    table = DailyTable()
+    table.replace_from(data[1:])
+    report, counts = daily_month_result(table, 2026, 10)
+    assert report.loc[0, "14일"] == "출근: 10:30, 퇴근: NN, 지각(업무:[업무] 외근)"
+    assert counts.loc["A", "late"] == 0
+    baseline = baseline_month_report(data, 2026, 10)
+    assert baseline.loc[0, "14일"] in {"출근: 10:30, 퇴근: NN, 지각(업무:병원)",
+                                      "출근: 10:30, 퇴근: NN, 지각(업무:[업무] 외근)"}
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from daily import DailyTable
+
+def nn_row(ts, name, record_type):
+    return [ts, name, record_type, "", "", "", "", ""]
+
+def test_nn_gaps_treat_pending_rows_as_recorded():
+    table = DailyTable()
+    table.add_rows([nn_row("2026-10-14 09:00:00", "A", "출근")])
+    now = datetime(2026, 10, 16, 12, 0)
+    assert table.nn_gaps(["A"], now, 30) == [("2026-10-14", "A", "퇴근NN")]
+    # 퇴근이 아직 시트에 반영되지 않고 저널에만 있으면 빠진 날이 아님
+    pending = [nn_row("2026-10-14 18:30:00", "A", "퇴근")]
+    assert table.nn_gaps(["A"], now, 30, pending) == []
+
+def test_nn_gaps_for_days_only_in_pending_rows():
+    table = DailyTable()
+    now = datetime(2026, 10, 16, 12, 0)
+    pending = [nn_row("2026-10-15 09:00:00", "A", "출근")]
+    assert table.nn_gaps(["A"], now, 30, pending) == [("2026-10-15", "A", "퇴근NN")]
+    assert table.days == {}
+
+def test_full_sync_without_data_rows_drops_every_day():
+    table = DailyTable()
+    table.add_rows([nn_row("2026-10-14 09:00:00", "A", "출근")])
+    table.replace_from([])
+    assert table.types("A", "2026-10-14") == frozenset()
+    assert ("A", "2026-10-14") in table.removed
+
+def test_full_sync_drops_deleted_days_before_first_live_date():
+    table = DailyTable()
+    table.add_rows([nn_row("2026-09-01 09:00:00", "A", "출근"), nn_row("2026-10-14 09:00:00", "A", "출근")])
+    table.replace_from([nn_row("2026-10-14 09:00:00", "A", "출근")])
+    assert table.types("A", "2026-09-01") == frozenset()
+    assert table.types("A", "2026-10-14") == {"출근"}
+
+def test_full_sync_keeps_archived_months():
+    table = DailyTable()
+    table.replace_month(2026, 8, [nn_row("2026-08-03 09:00:00", "A", "출근")], archived=True)
+    table.replace_from([nn_row("2026-10-14 09:00:00", "A", "출근")])
+    assert table.types("A", "2026-08-03") == {"출근"}
+    assert table.months() == [(2026, 8), (2026, 10)]
@@ -0,0 +1,77 @@
+import pytest
+from geopy.distance import geodesic
+
+from geofence import GRID_DEG, Geofence, Site, _cell, approx_distance_m, geodesic_m
+
+# 격자 칸 경계(0.01도 배수) 위에 중심이 있는 장소: 경계 상자가 네 칸에 걸침
+CORNER = (37.45, 126.95)
+
+def offset(point, meters, bearing):
+    dest = geodesic(meters=meters).destination(point, bearing)
+    return dest.latitude, dest.longitude
+
+def test_site_straddling_grid_cells_is_indexed_in_every_cell():
+    fence = Geofence([Site("corner", *CORNER, radius_m=100)])
+    cells = {cell for cell, sites in fence._grid.items() if sites}
+    base = _cell(CORNER[0] - GRID_DEG / 2, CORNER[1] - GRID_DEG / 2)
+    assert cells == {(base[0] + dr, base[1] + dc) for dr in (0, 1) for dc in (0, 1)}
+
+@pytest.mark.parametrize("bearing", [0, 45, 90, 135, 180, 225, 270, 315])
+def test_points_just_inside_and_outside_radius_across_cell_boundaries(bearing):
+    fence = Geofence([Site("corner", *CORNER, radius_m=100)])
+    inside = offset(CORNER, 99.0, bearing)
+    outside = offset(CORNER, 101.0, bearing)
+    site, ref, distance = fence.locate(*inside)
+    assert site is not None and site.name == "corner" and ref is site
+    assert distance == pytest.approx(99.0, abs=0.01)
+    site, ref, distance = fence.locate(*outside)
+    assert site is None and ref.name == "corner"
+    assert distance == pytest.approx(101.0, abs=0.01)
+
+def test_overlapping_sites_pick_the_closest_center():
+    east = offset(CORNER, 60, 90)
+    fence = Geofence([Site("west", *CORNER, radius_m=100), Site("east", *east, radius_m=100)])
+    site, _, _ = fence.locate(*offset(CORNER, 40, 90))
+    assert site.name == "east"
+    site, _, _ = fence.locate(*offset(CORNER, 20, 90))
+    assert site.name == "west"
+
+def test_polygon_containment_near_edges():
+    # 격자 경계(37.45, 126.95)를 가로지르는 약 110m x 90m 사각형
+    polygon = [[37.4495, 126.9495], [37.4505, 126.9495], [37.4505, 126.9505], [37.4495, 126.9505]]
+    fence = Geofence([Site("hall", polygon=polygon)])
+    for lat, lon in [(37.4496, 126.9496), (37.4504, 126.9504), (37.4496, 126.9504), (37.45, 126.95)]:
+        assert fence.match(lat, lon)[0] is not None
+    # 경계 상자 여유(5m) 안이지만 다각형 밖인 점
+    for lat, lon in [(37.44948, 126.9500), (37.4500, 126.95052)]:
+        site = fence.match(lat, lon)[0]
+        assert site is None
+        assert fence.sites[0].in_bbox(lat, lon)
+
+def test_concave_polygon():
+    # ㄷ자 건물: 오목한 부분은 밖
+    polygon = [[37.0, 127.0], [37.0, 127.003], [37.001, 127.003], [37.001, 127.002],
+               [37.0003, 127.002], [37.0003, 127.001], [37.001, 127.001], [37.001, 127.0]]
+    fence = Geofence([Site("ㄷ", polygon=polygon)])
+    assert fence.match(37.0001, 127.0015)[0] is not None
+    assert fence.match(37.0008, 127.0005)[0] is not None
+    assert fence.match(37.0008, 127.0015)[0] is None
+
+def test_nearest_site_fallback_outside_every_site():
+    near = offset(CORNER, 1500, 0)
+    far = offset(CORNER, 5000, 180)
+    fence = Geofence([Site("near", *near, radius_m=50), Site("far", *far, radius_m=50)])
+    site, ref, distance = fence.locate(*CORNER)
+    assert site is None and ref.name == "near"
+    assert distance == pytest.approx(geodesic_m(near, CORNER))
+    assert distance == pytest.approx(approx_distance_m(*CORNER, *near), rel=0.01)
+
+def test_from_config_validates_sites():
+    fence = Geofence.from_config([{"lat": 37.0, "lon": 127.0, "radius_m": 10}])
+    assert fence.sites[0].name == "site1"
+    with pytest.raises(ValueError):
+        Geofence.from_config([{"name": "x", "lat": 37.0, "lon": 127.0}])
+    with pytest.raises(ValueError):
+        Geofence.from_config([{"name": "x", "polygon": [[37.0, 127.0], [37.1, 127.0]]}])
+    with pytest.raises(ValueError):
+        Geofence.from_config([])
@@ -0,0 +1,31 @@
+from journal import EventJournal
+
+ROW = ["2026-10-14 09:00:00", "A", "출근", "", "", "", "", ""]
+
+def test_event_key_blocks_duplicates_only_until_flushed(tmp_path):
+    journal = EventJournal(str(tmp_path / "journal.db"))
+    first = journal.append("s", ROW, "2026-10-14|A|in")
+    assert first is not None
+    assert journal.append("s", ROW, "2026-10-14|A|in") is None
+    assert journal.append("other", ROW, "2026-10-14|A|in") is not None
+    journal.mark_flushed("s", [first])
+    # 반영된 뒤(예: 관리자가 시트에서 행을 지운 뒤)에는 같은 키로 다시 기록할 수 있음
+    assert journal.append("s", ROW, "2026-10-14|A|in") is not None
+
+def test_dead_letter_releases_key_and_leaves_pending(tmp_path):
+    journal = EventJournal(str(tmp_path / "journal.db"))
+    event_id = journal.append("s", ROW, "k")
+    journal.mark_dead("s", [event_id], "404")
+    assert journal.pending_count("s") == 0
+    assert journal.dead_count() == 1
+    assert journal.append("s", ROW, "k") is not None
+
+def test_reopen_releases_keys_of_flushed_events(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = EventJournal(path)
+    event_id = journal.append("s", ROW, "k")
+    # 키를 해제하지 않던 이전 버전의 저널
+    journal._conn.execute("UPDATE events SET flushed_at = 1 WHERE id = ?", (event_id,))
+    reopened = EventJournal(path)
+    assert reopened.pending_count("s") == 0
+    assert reopened.append("s", ROW, "k") is not None
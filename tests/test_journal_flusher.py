@@ -0,0 +1,126 @@
+import pytest
+
+import modules
+from benchmark import FakeWorksheet
+from instrumentation import METRICS
+from journal import EventJournal
+from storage import HEADER
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Response(status_code)
+
+class FlakySheet(FakeWorksheet):
+    """ append_rows가 정해 둔 순서대로 실패하는 메모리 워크시트. 이름이 'bad'인 행은 항상 400
+    failures 항목: 상태 코드(반영되지 않음) 또는 ("applied", 상태 코드, 지울 행 수)(반영된 뒤 실패) """
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.failures = []
+        self.sent = []
+
+    def append_rows(self, rows, **kwargs):
+        self.sent.append([r[1] for r in rows])
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, tuple):
+                _, status, shrink = failure
+                super().append_rows(rows, **kwargs)
+                # 보낸 뒤 보관 등으로 시트 앞쪽 행이 지워진 경우
+                del self.rows[1:1 + shrink]
+                raise HTTPError(status)
+            raise HTTPError(failure)
+        if any(r[1] == "bad" for r in rows):
+            raise HTTPError(400)
+        return super().append_rows(rows, **kwargs)
+
+def event(name, ts="2026-10-14 09:00:00"):
+    return [ts, name, "출근", "", "", "", "", ""]
+
+@pytest.fixture
+def flusher(tmp_path, monkeypatch):
+    # 백그라운드 스레드는 깨우지 않고 테스트에서 _flush_once를 직접 호출
+    monkeypatch.setattr(modules, "FLUSH_IDLE_SEC", 3600)
+    monkeypatch.setattr(modules.JournalFlusher, "_sleep_backoff", lambda self: None)
+    sheet = FlakySheet([HEADER] + [event(f"old{i}", f"2026-10-01 09:00:0{i}") for i in range(5)])
+    modules.sync_records(sheet)
+    return modules.JournalFlusher(sheet, EventJournal(str(tmp_path / "journal.db")))
+
+def queue(flusher, *names):
+    for name in names:
+        flusher.journal.append(flusher.key, event(name))
+
+def drain(flusher):
+    for _ in range(50):
+        if not flusher._flush_once():
+            return
+    raise AssertionError("journal did not drain")
+
+def appended(flusher):
+    return [r[1] for r in flusher.sheet.rows[1:] if not r[1].startswith("old")]
+
+def counter(name):
+    return METRICS.snapshot()["counters"].get(name, 0)
+
+def test_batch_is_sent_once_and_applied_to_local_copy(flusher):
+    queue(flusher, "a", "b")
+    drain(flusher)
+    assert flusher.sheet.sent == [["a", "b"]]
+    assert flusher.journal.pending_count(flusher.key) == 0
+    assert modules.get_daily_table(flusher.sheet).types("a", "2026-10-14") == {"출근"}
+
+def test_permanent_error_isolates_and_dead_letters_only_the_bad_event(flusher):
+    queue(flusher, "a", "bad", "c")
+    drain(flusher)
+    assert appended(flusher) == ["a", "c"]
+    assert flusher.sheet.sent == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+    assert [row[1] for _, _, row, _, _ in flusher.journal.dead_letters()] == ["bad"]
+    assert flusher.journal.pending_count(flusher.key) == 0
+
+def test_rejected_batch_is_resent_without_reconcile(flusher):
+    flusher.sheet.failures = [429]
+    queue(flusher, "a")
+    drain(flusher)
+    assert appended(flusher) == ["a"]
+    assert flusher.sheet.sent == [["a"], ["a"]]
+
+def test_ambiguous_failure_that_was_not_applied_is_resent(flusher):
+    flusher.sheet.failures = [503]
+    queue(flusher, "a", "b")
+    drain(flusher)
+    assert appended(flusher) == ["a", "b"]
+    assert len(flusher.sheet.sent) == 2
+
+def test_ambiguous_failure_that_was_applied_is_reconciled(flusher):
+    reconciled = counter("journal.reconciled")
+    flusher.sheet.failures = [("applied", 503, 0)]
+    queue(flusher, "a", "b")
+    drain(flusher)
+    assert appended(flusher) == ["a", "b"]
+    assert flusher.sheet.sent == [["a", "b"]]
+    assert counter("journal.reconciled") - reconciled == 2
+    assert flusher.journal.pending_count(flusher.key) == 0
+
+def test_reconcile_after_the_sheet_shrank(flusher):
+    # 보낸 뒤 앞쪽 행 3개가 지워져 보내기 전 행 번호로는 추가된 행을 찾을 수 없는 경우
+    flusher.sheet.failures = [("applied", 503, 3)]
+    queue(flusher, "a", "b")
+    drain(flusher)
+    assert appended(flusher) == ["a", "b"]
+    assert flusher.sheet.sent == [["a", "b"]]
+    assert modules.get_daily_table(flusher.sheet).types("old0", "2026-10-01") == frozenset()
+
+def test_partially_applied_batch_resends_only_missing_events(flusher):
+    flusher.sheet.failures = [("applied", 503, 0)]
+    queue(flusher, "a", "b")
+    flusher._flush_once()
+    # 시트에는 a만 남은 상태에서 대조 (b는 다시 보냄)
+    del flusher.sheet.rows[-1]
+    drain(flusher)
+    assert appended(flusher) == ["a", "b"]
+    assert flusher.sheet.sent == [["a", "b"], ["b"]]
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+import quota
+from quota import PERMANENT, REJECTED, TRANSIENT, UNKNOWN, AppendCoalescer, QuotaLimiter, classify_error
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Response(status_code)
+
+class Flaky:
+    """ 앞의 호출들은 주어진 오류를 내고 그다음부터 "ok"를 돌려주는 함수 """
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(quota, "BACKOFF_BASE_SEC", 0)
+    return QuotaLimiter(read_per_min=60000, write_per_min=60000, burst=100)
+
+def test_classify_error():
+    assert classify_error(HTTPError(429)) == REJECTED
+    assert classify_error(HTTPError(503)) == TRANSIENT
+    assert classify_error(HTTPError(408)) == TRANSIENT
+    assert classify_error(ConnectionError("reset")) == TRANSIENT
+    assert classify_error(HTTPError(404)) == PERMANENT
+    assert classify_error(ValueError("?")) == UNKNOWN
+
+@pytest.mark.parametrize("kind", ["read", "write"])
+def test_rejected_calls_are_retried(limiter, kind):
+    func = Flaky(HTTPError(429), HTTPError(429))
+    assert limiter.call(kind, func) == "ok"
+    assert func.calls == 3
+
+def test_transient_reads_are_retried(limiter):
+    func = Flaky(HTTPError(503), ConnectionError("reset"))
+    assert limiter.call("read", func) == "ok"
+    assert func.calls == 3
+
+@pytest.mark.parametrize("error", [HTTPError(503), ConnectionError("reset"), ValueError("?")])
+def test_ambiguous_writes_are_not_retried(limiter, error):
+    # 실제로 반영되었을 수 있으므로 다시 보내지 않고 호출한 쪽(저널)이 시트와 대조
+    func = Flaky(error)
+    with pytest.raises(type(error)):
+        limiter.call("write", func)
+    assert func.calls == 1
+
+def test_permanent_errors_are_not_retried(limiter):
+    func = Flaky(HTTPError(400))
+    with pytest.raises(HTTPError):
+        limiter.call("read", func)
+    assert func.calls == 1
+
+def test_retries_stop_after_max_attempts(limiter):
+    func = Flaky(*[HTTPError(429)] * quota.MAX_ATTEMPTS)
+    with pytest.raises(HTTPError):
+        limiter.call("write", func)
+    assert func.calls == quota.MAX_ATTEMPTS
+
+class BlockingSend:
+    """ 첫 호출은 release될 때까지 붙잡아 두어 그동안 들어온 append를 다음 호출로 모이게 함 """
+    def __init__(self, error=None):
+        self.first = threading.Event()
+        self.release = threading.Event()
+        self.batches = []
+        self.next_row = 2
+        self.error = error
+
+    def __call__(self, rows, **kwargs):
+        self.batches.append([r[0] for r in rows])
+        if len(self.batches) == 1:
+            self.first.set()
+            self.release.wait(5)
+        elif self.error is not None:
+            raise self.error
+        start, self.next_row = self.next_row, self.next_row + len(rows)
+        return {"updates": {"updatedRange": f"'시트1'!A{start}:H{self.next_row - 1}", "updatedRows": len(rows)}}
+
+def run_coalesced(send, coalescer, row_groups):
+    """ 첫 요청을 보내는 동안 나머지 요청을 대기열에 쌓은 뒤 풀어 줌. 요청별 (응답, 오류) """
+    results = {}
+
+    def worker(i, rows):
+        try:
+            results[i] = (coalescer.append_rows(rows), None)
+        except Exception as e:
+            results[i] = (None, e)
+
+    threads = [threading.Thread(target=worker, args=(0, row_groups[0]))]
+    threads[0].start()
+    assert send.first.wait(5)
+    for i, rows in enumerate(row_groups[1:], start=1):
+        threads.append(threading.Thread(target=worker, args=(i, rows)))
+        threads[-1].start()
+    deadline = time.monotonic() + 5
+    while sum(len(p.rows) for p in coalescer.pending) < sum(len(g) for g in row_groups[1:]):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    send.release.set()
+    for t in threads:
+        t.join(5)
+    return results
+
+def test_coalesced_appends_split_the_response():
+    send = BlockingSend()
+    coalescer = AppendCoalescer(send)
+    results = run_coalesced(send, coalescer, [[["a"]], [["b"], ["c"]], [["d"]]])
+    # 대기 중이던 두 요청은 한 번의 호출로 합쳐짐 (요청 순서는 스레드 시작 순서에 따름)
+    assert len(send.batches) == 2 and sorted(send.batches[1]) == ["b", "c", "d"]
+    assert results[0][0]["updates"]["updatedRange"] == "'시트1'!A2:H2"
+    ranges = {}
+    for i in (1, 2):
+        response, error = results[i]
+        assert error is None
+        ranges[i] = response["updates"]["updatedRange"]
+        assert response["updates"]["updatedRows"] == (2 if i == 1 else 1)
+    if send.batches[1][0] == "b":
+        assert ranges == {1: "'시트1'!A3:H4", 2: "'시트1'!A5:H5"}
+    else:
+        assert ranges == {1: "'시트1'!A4:H5", 2: "'시트1'!A3:H3"}
+
+def test_coalesced_append_error_reaches_every_caller():
+    send = BlockingSend(error=HTTPError(503))
+    coalescer = AppendCoalescer(send)
+    results = run_coalesced(send, coalescer, [[["a"]], [["b"]], [["c"]]])
+    assert results[0][1] is None
+    assert isinstance(results[1][1], HTTPError) and results[1][1] is results[2][1]
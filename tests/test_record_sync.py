@@ -0,0 +1,62 @@
+import modules
+from benchmark import FakeWorksheet
+from instrumentation import METRICS
+from storage import HEADER
+
+def event(name, ts, record_type="출근"):
+    return [ts, name, record_type, "", "", "", "", ""]
+
+def make_sheet():
+    sheet = FakeWorksheet([HEADER] + [event(n, f"2026-10-14 09:00:0{i}") for i, n in enumerate("abc")])
+    modules.sync_records(sheet)
+    return sheet
+
+def local_rows(sheet):
+    state = modules.sync_records(sheet)
+    return state.columns.rows()
+
+def fallbacks():
+    return METRICS.snapshot()["counters"].get("records.resync_fallback", 0)
+
+def test_appended_rows_are_fetched_incrementally():
+    sheet = make_sheet()
+    before = fallbacks()
+    sheet.rows.append(event("d", "2026-10-14 09:00:09"))
+    state = modules.sync_records(sheet, force=True)
+    assert sheet.calls == {"get_all_values": 1, "get_values": 1}
+    assert fallbacks() == before
+    assert state.row_count == 5
+    assert local_rows(sheet) == sheet.rows[1:]
+    assert state.daily.types("d", "2026-10-14") == {"출근"}
+
+def test_deleted_tail_row_forces_full_resync():
+    sheet = make_sheet()
+    before = fallbacks()
+    del sheet.rows[-1]
+    state = modules.sync_records(sheet, force=True)
+    assert fallbacks() == before + 1
+    assert sheet.calls["get_all_values"] == 2
+    assert state.row_count == 3
+    assert local_rows(sheet) == sheet.rows[1:]
+    assert state.daily.types("c", "2026-10-14") == frozenset()
+
+def test_edited_tail_row_forces_full_resync():
+    sheet = make_sheet()
+    before = fallbacks()
+    sheet.rows[-1] = event("c", "2026-10-14 09:00:02", "지각")
+    sheet.rows.append(event("d", "2026-10-14 09:00:09"))
+    state = modules.sync_records(sheet, force=True)
+    assert fallbacks() == before + 1
+    assert local_rows(sheet) == sheet.rows[1:]
+    assert state.daily.types("c", "2026-10-14") == {"지각"}
+
+def test_row_deleted_above_tail_with_new_rows_forces_full_resync():
+    # 중간 행이 지워지고 같은 수만큼 추가되면 기준 행 위치에 다른 행이 오므로 감지됨
+    sheet = make_sheet()
+    before = fallbacks()
+    del sheet.rows[1]
+    sheet.rows.append(event("d", "2026-10-14 09:00:09"))
+    state = modules.sync_records(sheet, force=True)
+    assert fallbacks() == before + 1
+    assert local_rows(sheet) == sheet.rows[1:]
+    assert state.daily.types("a", "2026-10-14") == frozenset()